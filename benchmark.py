@@ -0,0 +1,340 @@
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from src.data_processing.data_preparation import prepare_data
+from src.data_processing.feature_engineering import run_feature_pipeline
+from src.data_processing.synthetic import generate_raw_sheets
+from src.analysis.event_analysis import run_event_analysis_pipeline
+from src.analysis.hourly_analysis import run_hourly_analysis_pipeline
+from src.analysis.daily_analysis import run_daily_analysis_pipeline
+from src.visualization.plots import generate_visualizations
+from src.visualization.dashboard import build_manufacturing_dashboard
+from src.pipeline.context import PipelineContext
+from src.pipeline.feature_store import get_feature_store
+from src.pipeline.instrumentation import get_recorder
+
+from main import BASE_DIR, OUTPUT_DIR, STAGES, STORAGE_FORMAT
+
+
+"""
+Scaling benchmark of the pipeline stages.
+
+For every scale (number of downtime events) a synthetic dataset is
+generated (src/data_processing/synthetic.py) and the stage functions of
+main.py run one after another on it, in their DAG order, without the
+stage cache. Per stage the benchmark records:
+- wall_sec        elapsed time
+- cpu_sec         CPU time of the process and its finished children
+                  (process pool workers)
+- py_peak_mb      peak of Python-level allocations (tracemalloc), which
+                  includes numpy / pandas buffers
+- rss_peak_mb     peak resident set size of the process so far
+                  (monotonic; the first stage to raise it owns the growth)
+
+Each scale runs in a fresh process, so peaks of one scale never leak
+into the next. Results go to a JSON file with the run metadata and the
+instrumented steps of every scale (src/pipeline/instrumentation.py:
+builders and analyses with their rows and bytes).
+
+Sizes beyond Excel's row limit cannot go through a workbook, so the
+generated sheets are handed to prepare_data directly; Excel parsing
+itself is therefore not part of the prepare_data timing.
+
+Usage:
+    python benchmark.py --scales 1e4 1e5 1e6
+    python benchmark.py --scales 1e7 --stages prepare_data features --in-memory
+"""
+
+
+DEFAULT_SCALES = [10 ** 4, 10 ** 5, 10 ** 6]
+BENCHMARK_DIR = os.path.join(OUTPUT_DIR, 'benchmarks')
+
+
+def _rss_peak_mb() -> float:
+    # ru_maxrss is in KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 ** 2 if sys.platform == 'darwin' else peak / 1024
+
+
+def _cpu_sec() -> float:
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return time.process_time() + children.ru_utime + children.ru_stime
+
+
+def _measure(func, trace_alloc: bool, **kwargs) -> dict:
+    if trace_alloc:
+        tracemalloc.reset_peak()
+
+    wall = time.perf_counter()
+    cpu = _cpu_sec()
+    func(**kwargs)
+    wall = time.perf_counter() - wall
+    cpu = _cpu_sec() - cpu
+
+    result = {
+        'wall_sec': round(wall, 4),
+        'cpu_sec': round(cpu, 4),
+        'rss_peak_mb': round(_rss_peak_mb(), 1),
+    }
+    if trace_alloc:
+        result['py_peak_mb'] = round(tracemalloc.get_traced_memory()[1] / 1024 ** 2, 1)
+    return result
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=BASE_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# =========================================================
+# ONE SCALE
+# =========================================================
+def run_scale(
+    n_events: int,
+    workdir: str,
+    seed: int = 0,
+    stages=None,
+    persist: bool = True,
+    storage_format: str = STORAGE_FORMAT,
+    max_workers: int = None,
+    trace_alloc: bool = True,
+) -> dict:
+    """
+    Generates n_events of synthetic data and runs the selected stages
+    (default: all of main.STAGES) on it. Returns the per-stage metrics.
+    """
+    stages = stages or STAGES
+
+    cleaned_dir = os.path.join(workdir, 'cleaned')
+    featured_dir = os.path.join(workdir, 'featured')
+    tables_dir = os.path.join(workdir, 'tables')
+    fig_dir = os.path.join(workdir, 'figures')
+    html_path = os.path.join(workdir, 'docs', 'index.html')
+
+    context = PipelineContext(persist=persist)
+    get_recorder().reset()
+
+    if trace_alloc:
+        tracemalloc.start()
+
+    sheets = {}
+    generated = _measure(
+        lambda: sheets.update(generate_raw_sheets(n_events, seed=seed)),
+        trace_alloc,
+    )
+    rows = {key: len(df) for key, df in sheets.items()}
+
+    analysis = dict(featured_dir=featured_dir, output_dir=tables_dir, context=context)
+
+    stage_calls = {
+        'prepare_data': (prepare_data, dict(
+            raw_excel_path=None, cleaned_dir=cleaned_dir, context=context,
+            storage_format=storage_format, raw_sheets=sheets,
+        )),
+        'features': (run_feature_pipeline, dict(
+            cleaned_dir=cleaned_dir, featured_dir=featured_dir, context=context,
+            storage_format=storage_format, max_workers=max_workers,
+        )),
+        'event_analysis': (run_event_analysis_pipeline, analysis),
+        'hourly_analysis': (run_hourly_analysis_pipeline, analysis),
+        'daily_analysis': (run_daily_analysis_pipeline, analysis),
+        'visualizations': (generate_visualizations, dict(
+            featured_dir=featured_dir, tables_dir=tables_dir, fig_dir=fig_dir,
+            context=context, max_workers=max_workers,
+        )),
+        'dashboard': (build_manufacturing_dashboard, dict(
+            featured_dir=featured_dir, tables_dir=tables_dir,
+            output_html_path=html_path, context=context,
+        )),
+    }
+
+    results = {'generate': generated}
+    for name in STAGES:
+        if name not in stages:
+            continue
+        func, kwargs = stage_calls[name]
+        print(f"\n===== [{n_events:,} events] {name} =====")
+        results[name] = _measure(func, trace_alloc, **kwargs)
+        if name == 'prepare_data':
+            # the sheets are consumed by prepare_data
+            sheets.clear()
+
+    if trace_alloc:
+        tracemalloc.stop()
+
+    return {
+        'n_events': n_events,
+        'rows': rows,
+        'stages': results,
+        'total_wall_sec': round(sum(r['wall_sec'] for r in results.values()), 4),
+        'feature_store': get_feature_store().summary(),
+        'steps': get_recorder().report()['spans'],
+    }
+
+
+# =========================================================
+# SUITE
+# =========================================================
+def run_benchmark(
+    scales=None,
+    seed: int = 0,
+    stages=None,
+    persist: bool = True,
+    storage_format: str = STORAGE_FORMAT,
+    max_workers: int = None,
+    trace_alloc: bool = True,
+    workdir: str = None,
+    output_path: str = None,
+) -> dict:
+    """
+    Runs every scale in its own process and writes the results as JSON.
+    """
+    scales = scales or DEFAULT_SCALES
+    started = datetime.now()
+
+    report = {
+        'started': started.isoformat(timespec='seconds'),
+        'git_commit': _git_commit(),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'seed': seed,
+        'persist': persist,
+        'storage_format': storage_format,
+        'trace_alloc': trace_alloc,
+        'runs': [],
+    }
+
+    root = workdir or tempfile.mkdtemp(prefix='downtime_benchmark_')
+
+    try:
+        for n_events in scales:
+            scale_dir = os.path.join(root, f"events_{n_events}")
+            # a fresh process per scale: peak memory is per scale
+            with ProcessPoolExecutor(
+                max_workers=1, mp_context=multiprocessing.get_context('spawn')
+            ) as pool:
+                run = pool.submit(
+                    run_scale, n_events, scale_dir,
+                    seed=seed, stages=stages, persist=persist,
+                    storage_format=storage_format, max_workers=max_workers,
+                    trace_alloc=trace_alloc,
+                ).result()
+            report['runs'].append(run)
+    finally:
+        if workdir is None:
+            shutil.rmtree(root, ignore_errors=True)
+
+    output_path = output_path or os.path.join(
+        BENCHMARK_DIR, f"benchmark_{started:%Y%m%d_%H%M%S}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    with open(output_path, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print_report(report)
+    print(f"\nSaved: {output_path}")
+    return report
+
+
+def print_report(report: dict):
+    print("\n===== Benchmark =====")
+    print(f"{'events':>12}  {'stage':<16}{'wall s':>10}{'cpu s':>10}{'py peak MB':>12}{'rss MB':>10}")
+    for run in report['runs']:
+        for name, r in run['stages'].items():
+            print(
+                f"{run['n_events']:>12,}  {name:<16}{r['wall_sec']:>10.2f}{r['cpu_sec']:>10.2f}"
+                f"{r.get('py_peak_mb', float('nan')):>12.1f}{r['rss_peak_mb']:>10.1f}"
+            )
+        print(f"{run['n_events']:>12,}  {'total':<16}{run['total_wall_sec']:>10.2f}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Time and memory-profile the pipeline stages on synthetic data"
+    )
+    parser.add_argument(
+        "--scales",
+        nargs="+",
+        type=lambda value: int(float(value)),
+        default=DEFAULT_SCALES,
+        help="numbers of downtime events, e.g. 1e4 1e5 1e6 (default: 1e4 1e5 1e6)",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="generator seed (default: 0)")
+    parser.add_argument(
+        "--stages",
+        nargs="+",
+        choices=STAGES,
+        default=None,
+        help="stages to run (default: all; later stages need the earlier ones)",
+    )
+    parser.add_argument(
+        "--in-memory",
+        action="store_true",
+        help="hand tables between stages in memory only (no table files)",
+    )
+    parser.add_argument(
+        "--storage-format",
+        choices=["csv", "parquet", "feather"],
+        default=STORAGE_FORMAT,
+        help=f"format of the cleaned / featured tables (default: {STORAGE_FORMAT})",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="feature builders / plot workers run in parallel (default: CPU count)",
+    )
+    parser.add_argument(
+        "--no-trace-alloc",
+        action="store_true",
+        help="skip tracemalloc (lower overhead, no py_peak_mb)",
+    )
+    parser.add_argument(
+        "--workdir",
+        default=None,
+        help="keep the generated tables and outputs here (default: temporary, removed)",
+    )
+    parser.add_argument(
+        "--output",
+        default=None,
+        help="JSON results path (default: outputs/benchmarks/benchmark_<timestamp>.json)",
+    )
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    run_benchmark(
+        scales=args.scales,
+        seed=args.seed,
+        stages=args.stages,
+        persist=not args.in_memory,
+        storage_format=args.storage_format,
+        max_workers=args.workers,
+        trace_alloc=not args.no_trace_alloc,
+        workdir=args.workdir,
+        output_path=args.output,
+    )
@@ -1,11 +1,32 @@
+import argparse
 import os
 from src.data_processing.data_preparation import prepare_data
-from src.data_processing.feature_engineering import run_feature_pipeline
+from src.data_processing.feature_engineering import (
+    STATE_FILE,
+    run_feature_pipeline,
+    run_incremental_feature_pipeline,
+)
+from src.data_processing.numeric import numeric_parse_report
+from src.data_processing.storage import table_memory_report, table_path
 from src.analysis.event_analysis import run_event_analysis_pipeline
 from src.analysis.hourly_analysis import run_hourly_analysis_pipeline
 from src.analysis.daily_analysis import run_daily_analysis_pipeline
-from src.visualization.plots import generate_visualizations
-from src.visualization.dashboard import build_manufacturing_dashboard
+from src.visualization.plots import (
+    FIGURE_FORMATS,
+    PLOTS,
+    figure_path,
+    generate_visualizations,
+)
+from src.visualization.dashboard import (
+    VIEWS,
+    build_manufacturing_dashboard,
+    view_path,
+)
+from src.pipeline.cache import ALL_STAGES, StageCache
+from src.pipeline.context import PipelineContext
+from src.pipeline.feature_store import configure_feature_store, get_feature_store
+from src.pipeline.instrumentation import get_recorder
+from src.pipeline.scheduler import EXECUTORS, DagNode, run_dag
 
 
 BASE_DIR  = os.path.dirname(os.path.abspath(__file__))
@@ -16,51 +37,405 @@ DOCS_DIR  = os.path.join(BASE_DIR, 'docs')
 RAW_EXCEL_PATH  = os.path.join(DATA_DIR, 'raw', 'dataset.xlsx')
 CLEANED_DIR     = os.path.join(DATA_DIR, 'cleaned')
 FEATURED_DIR    = os.path.join(DATA_DIR, 'featured')
+CACHE_DIR       = os.path.join(DATA_DIR, 'cache')
 
 FIGURES_PATH        = os.path.join(OUTPUT_DIR, 'figures')
 TABLES_PATH         = os.path.join(OUTPUT_DIR, 'tables')
 DASHBOARD_HTML_PATH = os.path.join(DOCS_DIR, 'index.html')
 
+STAGE_MANIFEST_PATH = os.path.join(CACHE_DIR, 'stage_manifest.json')
 
-def main():
+# Per-step timings / memory / rows / bytes of the last run, and the
+# merged cProfile stats written with --profile
+RUN_REPORT_PATH = os.path.join(OUTPUT_DIR, 'run_report.json')
+PROFILE_PATH    = os.path.join(OUTPUT_DIR, 'pipeline.prof')
 
-    prepare_data(
-        raw_excel_path=RAW_EXCEL_PATH,
-        cleaned_dir=CLEANED_DIR
-    )
+# Storage of data/cleaned and data/featured:
+# "csv", or "parquet" / "feather" for typed columnar files (requires pyarrow).
+# CSV_EXPORT writes an additional CSV copy next to typed files.
+STORAGE_FORMAT = 'csv'
+CSV_EXPORT     = False
 
-    run_feature_pipeline(
-        cleaned_dir=CLEANED_DIR,
-        featured_dir=FEATURED_DIR,
-    )
+# Static figures: 300 dpi PNG for reports, e.g. 100 dpi webp for previews
+FIGURE_DPI    = 300
+FIGURE_FORMAT = 'png'
 
-    run_event_analysis_pipeline(
-        featured_dir=FEATURED_DIR,
-        output_dir=TABLES_PATH,
-    )
+# Lazy dashboard: one JSON sidecar per view in docs/views, fetched on select
+DASHBOARD_LAZY = False
 
-    run_hourly_analysis_pipeline(
-        featured_dir=FEATURED_DIR,
-        output_dir=TABLES_PATH,
-    )
+# Duration / downtime-ratio percentiles from mergeable quantile sketches
+# streamed over the tables (1% relative error) instead of exact quantiles
+QUANTILE_SKETCH = False
+
+# Byte budget of the process-wide store of loaded tables (LRU eviction)
+FEATURE_STORE_MB = 512
+
+
+# -----------------------------
+# Stage inputs / outputs
+# -----------------------------
+CLEANED_TABLES = [
+    'downtime_cleaned',
+    'hourly_cleaned',
+    'daily_cleaned',
+    'processed_hourly_cleaned',
+]
+
+FEATURED_TABLES = [
+    'downtime_features',
+    'hourly_features',
+    'daily_features',
+    'event_hour_reconciliation',
+    'hour_day_reconciliation',
+]
+
+EVENT_ANALYSIS_TABLES = [
+    'downtime_duration_summary',
+    'downtime_duration_distribution',
+    'downtime_burst_summary',
+    'downtime_burst_episodes',
+    'downtime_burst_episode_summary',
+    'downtime_cube',
+]
+
+HOURLY_ANALYSIS_TABLES = [
+    'hourly_efficiency_summary',
+    'throughput_downtime_summary',
+    'hourly_downtime_density',
+]
+
+DAILY_ANALYSIS_TABLES = [
+    'daily_efficiency_summary',
+    'pause_ratio_summary',
+    'daily_operational_extremes',
+    'operational_stability_metrics',
+]
+
+
+STAGES = [
+    'prepare_data',
+    'features',
+    'event_analysis',
+    'hourly_analysis',
+    'daily_analysis',
+    'visualizations',
+    'dashboard',
+]
+
+
+def _stored(directory, names, storage_format=STORAGE_FORMAT):
+    return [table_path(directory, name, storage_format) for name in names]
+
+
+def _tables(names):
+    return _stored(TABLES_PATH, names, 'csv')
+
+
+def main(
+    persist: bool = True,
+    incremental: bool = False,
+    force=(),
+    max_workers: int = None,
+    executor: str = 'thread',
+    fig_dpi: int = FIGURE_DPI,
+    fig_format: str = FIGURE_FORMAT,
+    lazy_dashboard: bool = DASHBOARD_LAZY,
+    quantile_sketch: bool = QUANTILE_SKETCH,
+    feature_store_mb: int = FEATURE_STORE_MB,
+    profile: bool = False,
+    run_report_path: str = RUN_REPORT_PATH,
+):
+
+    # Tables read from disk are loaded once per process and shared by name
+    configure_feature_store(feature_store_mb * 1024 ** 2)
+
+    # Instrumented steps (stages, builders, analyses) are recorded as spans
+    recorder = get_recorder()
+    recorder.reset()
+    recorder.profile = profile
+
+    # Tables are handed between stages in memory; disk is an optional sink
+    context = PipelineContext(persist=persist)
+
+    # Stages whose inputs, parameters and code are unchanged are skipped.
+    # Skipping needs the outputs on disk, so in-memory runs execute everything.
+    cache = StageCache(STAGE_MANIFEST_PATH, force=force, enabled=persist)
+
+    storage_params = {
+        'storage_format': STORAGE_FORMAT,
+        'csv_export': CSV_EXPORT,
+    }
+
+    def _stage(name, func, kwargs, deps=(), **cache_args):
+        # DAG node running one cached pipeline stage
+        return DagNode(
+            name,
+            cache.run_stage,
+            kwargs=dict(name=name, func=func, kwargs=kwargs, **cache_args),
+            deps=deps,
+        )
+
+    nodes = []
+
+    nodes.append(_stage(
+        'prepare_data',
+        prepare_data,
+        dict(
+            raw_excel_path=RAW_EXCEL_PATH,
+            cleaned_dir=CLEANED_DIR,
+            cache_dir=CACHE_DIR,
+            context=context,
+            **storage_params,
+        ),
+        inputs=[RAW_EXCEL_PATH],
+        outputs=_stored(CLEANED_DIR, CLEANED_TABLES),
+        params=storage_params,
+    ))
 
-    run_daily_analysis_pipeline(
-        featured_dir=FEATURED_DIR,
-        output_dir=TABLES_PATH,
+    # Incremental mode only featurizes production dates not seen before
+    feature_pipeline = (
+        run_incremental_feature_pipeline if incremental else run_feature_pipeline
     )
 
-    generate_visualizations(
-        featured_dir=FEATURED_DIR,
-        tables_dir=TABLES_PATH,
-        fig_dir=FIGURES_PATH,
+    nodes.append(_stage(
+        'features',
+        feature_pipeline,
+        dict(
+            cleaned_dir=CLEANED_DIR,
+            featured_dir=FEATURED_DIR,
+            context=context,
+            max_workers=max_workers,
+            executor=executor,
+            **storage_params,
+        ),
+        deps=['prepare_data'],
+        inputs=_stored(CLEANED_DIR, CLEANED_TABLES),
+        outputs=(
+            _stored(FEATURED_DIR, FEATURED_TABLES)
+            + [os.path.join(FEATURED_DIR, STATE_FILE)]
+        ),
+        params=dict(storage_params, incremental=incremental),
+    ))
+
+    # The three analyses only read featured tables: they run in parallel
+    sketch_params = dict(quantile_sketch=quantile_sketch)
+
+    analysis_stages = [
+        ('event_analysis', run_event_analysis_pipeline, EVENT_ANALYSIS_TABLES, sketch_params),
+        ('hourly_analysis', run_hourly_analysis_pipeline, HOURLY_ANALYSIS_TABLES, sketch_params),
+        ('daily_analysis', run_daily_analysis_pipeline, DAILY_ANALYSIS_TABLES, {}),
+    ]
+
+    for name, pipeline, output_tables, params in analysis_stages:
+        nodes.append(_stage(
+            name,
+            pipeline,
+            dict(
+                featured_dir=FEATURED_DIR,
+                output_dir=TABLES_PATH,
+                context=context,
+                **params,
+            ),
+            deps=['features'],
+            inputs=_stored(FEATURED_DIR, FEATURED_TABLES),
+            outputs=_tables(output_tables),
+            params=params,
+        ))
+
+    analysis_names = [name for name, _, _, _ in analysis_stages]
+
+    nodes.append(_stage(
+        'visualizations',
+        generate_visualizations,
+        dict(
+            featured_dir=FEATURED_DIR,
+            tables_dir=TABLES_PATH,
+            fig_dir=FIGURES_PATH,
+            context=context,
+            dpi=fig_dpi,
+            fig_format=fig_format,
+            max_workers=max_workers,
+        ),
+        deps=analysis_names,
+        inputs=(
+            _stored(FEATURED_DIR, FEATURED_TABLES)
+            + _tables(EVENT_ANALYSIS_TABLES + HOURLY_ANALYSIS_TABLES + DAILY_ANALYSIS_TABLES)
+        ),
+        outputs=[figure_path(FIGURES_PATH, name, fig_format) for name in PLOTS],
+        params=dict(dpi=fig_dpi, fig_format=fig_format),
+    ))
+
+    nodes.append(_stage(
+        'dashboard',
+        build_manufacturing_dashboard,
+        dict(
+            featured_dir=FEATURED_DIR,
+            tables_dir=TABLES_PATH,
+            output_html_path=DASHBOARD_HTML_PATH,
+            context=context,
+            lazy=lazy_dashboard,
+        ),
+        deps=['event_analysis', 'hourly_analysis'],
+        inputs=(
+            _stored(FEATURED_DIR, FEATURED_TABLES)
+            + _tables(EVENT_ANALYSIS_TABLES + HOURLY_ANALYSIS_TABLES)
+        ),
+        outputs=[DASHBOARD_HTML_PATH] + (
+            [view_path(DASHBOARD_HTML_PATH, key) for key, _, _ in VIEWS]
+            if lazy_dashboard else []
+        ),
+        params=dict(lazy=lazy_dashboard),
+    ))
+
+    # Stages share the in-memory context, so they always run on threads;
+    # `executor` applies to the feature builders inside the features stage.
+    report = run_dag(nodes, max_workers=max_workers, executor='thread')
+    report.print_summary('Pipeline stages')
+    recorder.print_summary()
+
+    # In-memory size of the written tables before / after schema compaction
+    table_memory = table_memory_report()
+    if len(table_memory):
+        print("\n--- Table memory (MB) ---")
+        print(table_memory.assign(
+            before_mb=table_memory['before_bytes'] / 1024 ** 2,
+            after_mb=table_memory['after_bytes'] / 1024 ** 2,
+        )[['table', 'rows', 'before_mb', 'after_mb', 'saved_share']].round(3).to_string(index=False))
+
+    # Raw numeric cells prepare_data could not parse
+    numeric_parse = numeric_parse_report()
+    if numeric_parse['unparsed_rows'].any():
+        print("\n--- Unparsed numeric values ---")
+        print(numeric_parse[numeric_parse['unparsed_rows'] > 0].to_string(index=False))
+
+    print(f"Feature store: {get_feature_store().summary()}")
+
+    stages = {
+        name: {'status': status, 'wall_sec': round(report.duration(name), 4)}
+        for name, status in report.status.items()
+    }
+    path, total = report.critical_path()
+    recorder.write_run_report(
+        run_report_path,
+        stages=stages,
+        critical_path=dict(stages=path, wall_sec=round(total, 4)),
+        feature_store=get_feature_store().summary(),
+        table_memory=table_memory.to_dict(orient='records'),
+        numeric_parse=numeric_parse.to_dict(orient='records'),
     )
+    print(f"Run report: {run_report_path}")
+
+    if profile and recorder.write_profile(PROFILE_PATH):
+        print(f"Profile: {PROFILE_PATH} (python -m pstats {os.path.relpath(PROFILE_PATH, BASE_DIR)})")
+
+    return report
+
 
-    build_manufacturing_dashboard(
-        featured_dir=FEATURED_DIR,
-        tables_dir=TABLES_PATH,
-        output_html_path=DASHBOARD_HTML_PATH,
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Manufacturing downtime analytics pipeline"
     )
+    parser.add_argument(
+        "--in-memory",
+        action="store_true",
+        help="keep cleaned/featured/table outputs in memory only "
+             "(figures and dashboard are still written)",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="only compute features for production dates added since the "
+             "last run and append them to data/featured",
+    )
+    parser.add_argument(
+        "--force",
+        action="append",
+        default=[],
+        choices=STAGES + [ALL_STAGES],
+        metavar="STAGE",
+        help="rebuild STAGE even if its inputs are unchanged "
+             f"(repeatable; one of: {', '.join(STAGES + [ALL_STAGES])})",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="number of stages / feature builders run in parallel "
+             "(default: CPU count)",
+    )
+    parser.add_argument(
+        "--executor",
+        choices=list(EXECUTORS),
+        default="thread",
+        help="pool used by the feature builders (process needs persisted tables)",
+    )
+    parser.add_argument(
+        "--fig-dpi",
+        type=int,
+        default=FIGURE_DPI,
+        help=f"resolution of the static figures (default: {FIGURE_DPI})",
+    )
+    parser.add_argument(
+        "--fig-format",
+        choices=FIGURE_FORMATS,
+        default=FIGURE_FORMAT,
+        help=f"file format of the static figures (default: {FIGURE_FORMAT})",
+    )
+    parser.add_argument(
+        "--lazy-dashboard",
+        action="store_true",
+        default=DASHBOARD_LAZY,
+        help="write each dashboard view to docs/views/*.json and load it "
+             "on selection (page must be served over HTTP)",
+    )
+    parser.add_argument(
+        "--quantile-sketch",
+        action="store_true",
+        default=QUANTILE_SKETCH,
+        help="compute duration / downtime-ratio percentiles with streamed "
+             "quantile sketches (1%% relative error) instead of exact quantiles",
+    )
+    parser.add_argument(
+        "--feature-store-mb",
+        type=int,
+        default=FEATURE_STORE_MB,
+        help="memory budget of the shared store of loaded tables, least "
+             f"recently used tables are evicted first (default: {FEATURE_STORE_MB})",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="run the instrumented steps under cProfile and write the merged "
+             "stats to outputs/pipeline.prof",
+    )
+    parser.add_argument(
+        "--run-report",
+        default=RUN_REPORT_PATH,
+        metavar="PATH",
+        help="JSON report of per-step wall / CPU time, peak RSS, rows and "
+             "bytes (default: outputs/run_report.json)",
+    )
+    args = parser.parse_args()
+    if args.in_memory and args.executor == "process":
+        parser.error("--executor process needs persisted tables, not --in-memory")
+    return args
 
 
 if __name__ == '__main__':
-    main()
+    args = parse_args()
+    report = main(
+        persist=not args.in_memory,
+        incremental=args.incremental,
+        force=args.force,
+        max_workers=args.workers,
+        executor=args.executor,
+        fig_dpi=args.fig_dpi,
+        fig_format=args.fig_format,
+        lazy_dashboard=args.lazy_dashboard,
+        quantile_sketch=args.quantile_sketch,
+        feature_store_mb=args.feature_store_mb,
+        profile=args.profile,
+        run_report_path=args.run_report,
+    )
+    if report.failed:
+        raise SystemExit(1)
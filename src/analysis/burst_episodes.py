@@ -0,0 +1,175 @@
+import os
+import numpy as np
+import pandas as pd
+
+from src.data_processing.feature_engineering import BURST_GAP_SEC
+from src.data_processing.ingest import PARTITION_KEYS
+from src.data_processing.storage import read_table, write_table
+from src.pipeline.instrumentation import instrumented
+
+
+"""
+Burst episodes.
+
+An episode is a run of consecutive events of one partition where every
+event starts less than `gap` seconds after the previous one ended
+(the is_burst rule of downtime_features, with BURST_GAP_SEC as one of
+the thresholds). A new episode starts at every gap >= threshold, at the
+first event of a partition and after a missing gap.
+
+Episode ids are the running count of those breaks (a cumulative sum), and
+episode start / end / event count / downtime come from reductions over
+the contiguous runs (np.*.reduceat). All thresholds are evaluated over
+the same sorted event arrays, in O(n) per threshold without a groupby.
+"""
+
+
+BURST_GAP_THRESHOLDS_SEC = sorted({60, 120, BURST_GAP_SEC, 600, 1800})
+
+EPISODES_TABLE = "downtime_burst_episodes"
+EPISODE_SUMMARY_TABLE = "downtime_burst_episode_summary"
+
+
+def _sorted_events(df: pd.DataFrame) -> pd.DataFrame:
+    order = PARTITION_KEYS + ["downtime_start_ts"]
+    return df.sort_values(order, kind="stable").reset_index(drop=True)
+
+
+def _partition_starts(df: pd.DataFrame) -> np.ndarray:
+    return (~df.duplicated(PARTITION_KEYS)).to_numpy()
+
+
+def episode_breaks(df: pd.DataFrame, thresholds: list = None) -> np.ndarray:
+    """
+    (events x thresholds) bool matrix: True where an event opens a new
+    episode. df must be sorted by partition and start time.
+    """
+    thresholds = np.asarray(thresholds or BURST_GAP_THRESHOLDS_SEC, dtype="float64")
+    gap = df["gap_from_prev_sec"].astype("float64").to_numpy(na_value=np.nan)
+
+    # NaN gaps compare False, so they break as well
+    breaks = ~(gap[:, None] < thresholds[None, :])
+    breaks |= _partition_starts(df)[:, None]
+    return breaks
+
+
+def assign_episodes(df: pd.DataFrame, gap_sec: float = BURST_GAP_SEC) -> pd.Series:
+    """
+    Episode id (0, 1, ...) of every event for one gap threshold, aligned
+    with df. Ids run over the whole frame, so they are unique across
+    partitions.
+    """
+    ordered = df.sort_values(PARTITION_KEYS + ["downtime_start_ts"], kind="stable")
+    breaks = episode_breaks(ordered, [gap_sec])[:, 0]
+    ids = np.cumsum(breaks) - 1
+    return pd.Series(ids, index=ordered.index, name="burst_episode_id").reindex(df.index)
+
+
+def build_episodes(df: pd.DataFrame, thresholds: list = None) -> pd.DataFrame:
+    """
+    One row per (gap threshold, episode): partition, episode_id,
+    episode_start_ts, episode_end_ts, event_count, total_downtime_sec.
+    """
+    thresholds = thresholds or BURST_GAP_THRESHOLDS_SEC
+    events = _sorted_events(df)
+
+    starts = events["downtime_start_ts"].to_numpy()
+    ends = events["downtime_end_ts"].to_numpy()
+    duration = events["downtime_duration_sec"].astype("float64").to_numpy(na_value=np.nan)
+    duration = np.nan_to_num(duration, nan=0.0)
+
+    breaks = episode_breaks(events, thresholds)
+    episodes = []
+
+    for col, gap_sec in enumerate(thresholds):
+        # first row of every episode; runs are contiguous in sorted order
+        first_rows = np.flatnonzero(breaks[:, col])
+        if len(first_rows) == 0:
+            continue
+
+        episode = events.loc[first_rows, PARTITION_KEYS].reset_index(drop=True)
+        episode.insert(0, "gap_threshold_sec", gap_sec)
+        episode["episode_id"] = np.arange(len(first_rows))
+        episode["episode_start_ts"] = starts[first_rows]
+        # NaT ends are skipped by fmax
+        episode["episode_end_ts"] = np.fmax.reduceat(ends, first_rows)
+        episode["event_count"] = np.diff(np.append(first_rows, len(events)))
+        episode["total_downtime_sec"] = np.add.reduceat(duration, first_rows)
+
+        episodes.append(episode)
+
+    if not episodes:
+        return pd.DataFrame(columns=[
+            "gap_threshold_sec", *PARTITION_KEYS, "episode_id",
+            "episode_start_ts", "episode_end_ts", "event_count", "total_downtime_sec",
+        ])
+
+    return pd.concat(episodes, ignore_index=True)
+
+
+def summarize_episodes(episodes: pd.DataFrame) -> pd.DataFrame:
+    """
+    Per gap threshold: episode counts, burst episodes (2+ events) and the
+    share of events / downtime inside burst episodes.
+    """
+    burst = episodes["event_count"] > 1
+    in_burst = episodes.assign(
+        burst_episode=burst,
+        burst_events=episodes["event_count"].where(burst, 0),
+        burst_downtime_sec=episodes["total_downtime_sec"].where(burst, 0),
+        burst_span_sec=(
+            episodes["episode_end_ts"] - episodes["episode_start_ts"]
+        ).dt.total_seconds().where(burst),
+    )
+
+    summary = (
+        in_burst
+        .groupby("gap_threshold_sec")
+        .agg(
+            episode_count=("episode_id", "size"),
+            burst_episode_count=("burst_episode", "sum"),
+            event_count=("event_count", "sum"),
+            burst_event_count=("burst_events", "sum"),
+            total_downtime_sec=("total_downtime_sec", "sum"),
+            burst_downtime_sec=("burst_downtime_sec", "sum"),
+            max_burst_events=("burst_events", "max"),
+            mean_burst_span_sec=("burst_span_sec", "mean"),
+        )
+        .reset_index()
+    )
+
+    summary["burst_event_share"] = summary["burst_event_count"] / summary["event_count"]
+    summary["burst_downtime_share"] = (
+        summary["burst_downtime_sec"] / summary["total_downtime_sec"]
+    )
+
+    return summary
+
+
+@instrumented
+def analyze_burst_episodes(featured_dir: str, output_dir: str, context=None):
+    """
+    Burst episodes for every threshold in BURST_GAP_THRESHOLDS_SEC:
+    - downtime_burst_episodes: one row per threshold and episode
+    - downtime_burst_episode_summary: one row per threshold
+    """
+
+    os.makedirs(output_dir, exist_ok=True)
+
+    df = read_table(featured_dir, "downtime_features", context=context)
+
+    episodes = build_episodes(df)
+    summary = summarize_episodes(episodes)
+
+    episodes_path = write_table(episodes, output_dir, EPISODES_TABLE, context=context)
+    summary_path = write_table(summary, output_dir, EPISODE_SUMMARY_TABLE, context=context)
+
+    print("\n--- Burst Episodes Completed ---")
+    print(summary[[
+        "gap_threshold_sec", "episode_count", "burst_episode_count",
+        "burst_event_share", "burst_downtime_share",
+    ]])
+    if episodes_path:
+        print(f"Saved: {episodes_path}")
+    if summary_path:
+        print(f"Saved: {summary_path}")
@@ -1,6 +1,11 @@
 import os
 import pandas as pd
 
+from src.analysis.metrics import write_summaries
+from src.data_processing.storage import read_table, write_table
+from src.pipeline.context import PipelineContext
+from src.pipeline.instrumentation import instrumented
+
 
 """
 Daily operational performance analysis.
@@ -10,94 +15,43 @@ Focus:
 - Operational pause patterns
 - Identifying best vs worst performing days
 - Measuring stability of daily operations
+
+The metric / value summaries are declared in src/analysis/metrics.py.
 """
 
 
+DAILY_SUMMARIES = [
+    "daily_efficiency_summary",
+    "pause_ratio_summary",
+    "operational_stability_metrics",
+]
+
+
 # =========================================================
 # DAILY EFFICIENCY SUMMARY
 # =========================================================
-def analyze_daily_efficiency(featured_dir: str, output_dir: str):
-
-    os.makedirs(output_dir, exist_ok=True)
-
-    input_path = os.path.join(featured_dir, "daily_features.csv")
-    df = pd.read_csv(input_path, parse_dates=["date"])
-
-    summary = pd.DataFrame({
-        "metric": [
-            "mean_efficiency",
-            "median_efficiency",
-            "min_efficiency",
-            "max_efficiency",
-            "efficiency_std"
-        ],
-        "value": [
-            df["efficiency"].mean(),
-            df["efficiency"].median(),
-            df["efficiency"].min(),
-            df["efficiency"].max(),
-            df["efficiency"].std()
-        ]
-    })
-
-    output_path = os.path.join(
-        output_dir,
-        "daily_efficiency_summary.csv"
-    )
-
-    summary.to_csv(output_path, index=False)
-
-    print("\n--- Daily Efficiency Summary ---")
-    print(summary)
-    print(f"Saved: {output_path}")
+@instrumented
+def analyze_daily_efficiency(featured_dir: str, output_dir: str, context=None):
+    write_summaries(["daily_efficiency_summary"], featured_dir, output_dir, context)
 
 
 # =========================================================
 # PAUSE RATIO DISTRIBUTION
 # =========================================================
-def analyze_pause_behavior(featured_dir: str, output_dir: str):
-
-    os.makedirs(output_dir, exist_ok=True)
-
-    input_path = os.path.join(featured_dir, "daily_features.csv")
-    df = pd.read_csv(input_path, parse_dates=["date"])
-
-    pause_stats = pd.DataFrame({
-        "metric": [
-            "mean_pause_ratio",
-            "median_pause_ratio",
-            "max_pause_ratio",
-            "pause_ratio_std"
-        ],
-        "value": [
-            df["pause_ratio"].mean(),
-            df["pause_ratio"].median(),
-            df["pause_ratio"].max(),
-            df["pause_ratio"].std()
-        ]
-    })
-
-    output_path = os.path.join(
-        output_dir,
-        "pause_ratio_summary.csv"
-    )
-
-    pause_stats.to_csv(output_path, index=False)
-
-    print("\n--- Pause Behavior Analysis ---")
-    print(pause_stats)
-    print(f"Saved: {output_path}")
+@instrumented
+def analyze_pause_behavior(featured_dir: str, output_dir: str, context=None):
+    write_summaries(["pause_ratio_summary"], featured_dir, output_dir, context)
 
 
 # =========================================================
 # BEST VS WORST OPERATIONAL DAYS
 # =========================================================
-def analyze_operational_extremes(featured_dir: str, output_dir: str):
+@instrumented
+def analyze_operational_extremes(featured_dir: str, output_dir: str, context=None):
 
     os.makedirs(output_dir, exist_ok=True)
 
-    input_path = os.path.join(featured_dir, "daily_features.csv")
-    df = pd.read_csv(input_path, parse_dates=["date"])
+    df = read_table(featured_dir, "daily_features", context=context)
 
     best_day = df.loc[df["efficiency"].idxmax()]
     worst_day = df.loc[df["efficiency"].idxmin()]
@@ -113,59 +67,35 @@ def analyze_operational_extremes(featured_dir: str, output_dir: str):
         ]
     })
 
-    output_path = os.path.join(
-        output_dir,
-        "daily_operational_extremes.csv"
+    output_path = write_table(
+        extremes, output_dir, "daily_operational_extremes", context=context
     )
 
-    extremes.to_csv(output_path, index=False)
-
     print("\n--- Operational Extremes ---")
     print(extremes)
-    print(f"Saved: {output_path}")
+    if output_path:
+        print(f"Saved: {output_path}")
 
 
 # =========================================================
 # OPERATIONAL STABILITY
 # =========================================================
-def analyze_operational_stability(featured_dir: str, output_dir: str):
-
-    os.makedirs(output_dir, exist_ok=True)
-
-    input_path = os.path.join(featured_dir, "daily_features.csv")
-    df = pd.read_csv(input_path, parse_dates=["date"])
-
-    stability = pd.DataFrame({
-        "metric": [
-            "efficiency_volatility",
-            "pause_ratio_volatility"
-        ],
-        "value": [
-            df["efficiency"].std(),
-            df["pause_ratio"].std()
-        ]
-    })
-
-    output_path = os.path.join(
-        output_dir,
-        "operational_stability_metrics.csv"
-    )
-
-    stability.to_csv(output_path, index=False)
-
-    print("\n--- Operational Stability ---")
-    print(stability)
-    print(f"Saved: {output_path}")
+@instrumented
+def analyze_operational_stability(featured_dir: str, output_dir: str, context=None):
+    write_summaries(["operational_stability_metrics"], featured_dir, output_dir, context)
 
 
 # =========================================================
 # PIPELINE
 # =========================================================
-def run_daily_analysis_pipeline(featured_dir: str, output_dir: str):
+@instrumented
+def run_daily_analysis_pipeline(featured_dir: str, output_dir: str, context=None):
 
     print("\nStarting daily operational analysis...")
 
-    analyze_daily_efficiency(featured_dir, output_dir)
-    analyze_pause_behavior(featured_dir, output_dir)
-    analyze_operational_extremes(featured_dir, output_dir)
-    analyze_operational_stability(featured_dir, output_dir)
+    # daily_features is loaded once and shared by every analysis below
+    context = context if context is not None else PipelineContext()
+
+    # efficiency, pause and stability summaries share one fused pass
+    write_summaries(DAILY_SUMMARIES, featured_dir, output_dir, context)
+    analyze_operational_extremes(featured_dir, output_dir, context)
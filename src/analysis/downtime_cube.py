@@ -0,0 +1,301 @@
+import os
+import numpy as np
+import pandas as pd
+
+from src.data_processing.ingest import PARTITION_KEYS
+from src.data_processing.storage import read_table, write_table
+from src.pipeline.instrumentation import instrumented
+
+
+"""
+Downtime aggregate cube.
+
+One row per (date, hour, weekday, product_type_l) cell holding additive
+measures only:
+- downtime_sec_sum / downtime_event_count   (downtime events, by start hour)
+- efficiency_count / efficiency_sum   (hourly records)
+- efficiency_m2   (centered sum of squares of the cell's efficiencies)
+
+Counts and sums roll up as a plain groupby-sum over the cube;
+efficiency_m2 is merged across cells (Chan et al.) so the standard
+deviation never comes from raw sums of squares. Means and standard
+deviations are derived afterwards. Consumers (heatmaps, dashboard) slice and roll up the cube
+instead of regrouping the raw events.
+
+product_type_l comes from daily_features: each event / hour is assigned
+the production run of its line and date that started last before it (or
+the first run of the date for records before any run started).
+"""
+
+
+CUBE_TABLE = "downtime_cube"
+
+CUBE_DIMENSIONS = ["date", "hour", "weekday", "product_type_l"]
+
+CUBE_MEASURES = [
+    "downtime_sec_sum",
+    "downtime_event_count",
+    "efficiency_count",
+    "efficiency_sum",
+    "efficiency_m2",
+]
+
+# count column telling whether a cell carries data for a measure
+_MEASURE_SOURCE = {
+    "downtime_sec_sum": "downtime_event_count",
+    "downtime_event_count": "downtime_event_count",
+    "mean_downtime_sec": "downtime_event_count",
+    "efficiency_count": "efficiency_count",
+    "efficiency_sum": "efficiency_count",
+    "efficiency_m2": "efficiency_count",
+    "mean_efficiency": "efficiency_count",
+    "efficiency_std": "efficiency_count",
+}
+
+WEEKDAY_LABELS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+
+
+# =========================================================
+# BUILD
+# =========================================================
+def _assign_product_type(records: pd.DataFrame, ts_col: str, daily_df: pd.DataFrame) -> pd.Series:
+    """
+    product_type_l of the production run each record falls into.
+    Returned in the order of records.
+    """
+    by = [col for col in PARTITION_KEYS if col in records and col in daily_df] + ["date"]
+
+    runs = (
+        daily_df[by + ["production_start_ts", "product_type_l"]]
+        .dropna(subset=["date", "production_start_ts"])
+        .astype({col: str for col in by[:-1]})
+        .sort_values("production_start_ts", kind="stable")
+    )
+
+    left = records[by + [ts_col]].astype({col: str for col in by[:-1]})
+    left["_row"] = np.arange(len(left))
+    left = left.dropna(subset=["date", ts_col]).sort_values(ts_col, kind="stable")
+
+    product = pd.Series(pd.NA, index=np.arange(len(records)), dtype=runs["product_type_l"].dtype)
+
+    for direction in ("backward", "forward"):
+        matched = pd.merge_asof(
+            left,
+            runs,
+            left_on=ts_col,
+            right_on="production_start_ts",
+            by=by,
+            direction=direction
+        )
+        rows = matched["_row"].to_numpy()
+        missing = product.iloc[rows].isna().to_numpy()
+        product.iloc[rows[missing]] = matched["product_type_l"].to_numpy()[missing]
+
+    product.index = records.index
+    return product
+
+
+def build_cube(downtime_df: pd.DataFrame, hourly_df: pd.DataFrame, daily_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Aggregates downtime events and hourly efficiency into the cube.
+    """
+    events = pd.DataFrame({
+        "date": downtime_df["date"],
+        "hour": downtime_df["downtime_start_ts"].dt.hour,
+        "weekday": downtime_df["downtime_start_ts"].dt.dayofweek,
+        "product_type_l": _assign_product_type(downtime_df, "downtime_start_ts", daily_df),
+        "downtime_sec": downtime_df["downtime_duration_sec"],
+    }).dropna(subset=["date", "hour"])
+
+    event_cells = (
+        events
+        .groupby(CUBE_DIMENSIONS, dropna=False, observed=True)
+        .agg(
+            downtime_sec_sum=("downtime_sec", "sum"),
+            downtime_event_count=("downtime_sec", "size"),
+        )
+    )
+
+    efficiency = hourly_df["efficiency"]
+    hours = pd.DataFrame({
+        "date": hourly_df["date"],
+        "hour": hourly_df["timestamp_start"].dt.hour,
+        "weekday": hourly_df["timestamp_start"].dt.dayofweek,
+        "product_type_l": _assign_product_type(hourly_df, "timestamp_start", daily_df),
+        "efficiency": efficiency,
+    }).dropna(subset=["date", "hour"])
+
+    cells = hours.groupby(CUBE_DIMENSIONS, dropna=False, observed=True)
+    hours["efficiency_dev_sq"] = (hours["efficiency"] - cells["efficiency"].transform("mean")) ** 2
+
+    hour_cells = (
+        hours
+        .groupby(CUBE_DIMENSIONS, dropna=False, observed=True)
+        .agg(
+            efficiency_count=("efficiency", "count"),
+            efficiency_sum=("efficiency", "sum"),
+            efficiency_m2=("efficiency_dev_sq", "sum"),
+        )
+    )
+
+    cube = event_cells.join(hour_cells, how="outer")
+    cube[CUBE_MEASURES] = cube[CUBE_MEASURES].fillna(0)
+
+    cube = cube.reset_index()
+    cube["downtime_event_count"] = cube["downtime_event_count"].astype("int64")
+    cube["efficiency_count"] = cube["efficiency_count"].astype("int64")
+
+    return cube.sort_values(CUBE_DIMENSIONS, kind="stable").reset_index(drop=True)
+
+
+# =========================================================
+# SLICE / ROLL-UP
+# =========================================================
+def slice_cube(cube: pd.DataFrame, **filters) -> pd.DataFrame:
+    """
+    Cells matching every filter, e.g. slice_cube(cube, weekday=[0, 1], hour=9).
+    A filter value is a scalar, a list of values or a (start, end) slice
+    (inclusive) for range filters such as dates.
+    """
+    mask = pd.Series(True, index=cube.index)
+
+    for dim, value in filters.items():
+        if dim not in CUBE_DIMENSIONS:
+            raise ValueError(f"Unknown cube dimension '{dim}', expected one of {CUBE_DIMENSIONS}")
+
+        col = cube[dim]
+        if isinstance(value, slice):
+            if value.start is not None:
+                mask &= col >= value.start
+            if value.stop is not None:
+                mask &= col <= value.stop
+        elif isinstance(value, (list, tuple, set)):
+            mask &= col.isin(list(value))
+        else:
+            mask &= col == value
+
+    return cube[mask.fillna(False)]
+
+
+def _merged_m2(cube: pd.DataFrame, by: list):
+    """
+    efficiency_m2 of the cells merged over every dimension not in `by`
+    (Chan et al.): the cells' own m2 plus n_i * (mean_i - mean)^2, the
+    spread of each cell mean around the merged mean.
+    """
+    n = cube["efficiency_count"].astype("float64")
+    cell_mean = cube["efficiency_sum"] / n.where(n > 0)
+
+    if by:
+        groups = cube.groupby(by, dropna=False, observed=True)
+        mean = groups["efficiency_sum"].transform("sum") / groups["efficiency_count"].transform("sum")
+    else:
+        mean = cube["efficiency_sum"].sum() / cube["efficiency_count"].sum()
+
+    # cells without hourly records add nothing
+    m2 = cube["efficiency_m2"] + (n * (cell_mean - mean) ** 2).fillna(0)
+
+    if not by:
+        return m2.sum()
+
+    return cube[by].assign(efficiency_m2=m2).groupby(by, dropna=False, observed=True)["efficiency_m2"].sum()
+
+
+def rollup(cube: pd.DataFrame, by: list) -> pd.DataFrame:
+    """
+    Sums the counts and sums over every dimension not in `by`, merges
+    efficiency_m2 (Chan et al.) and derives
+    (when the cube holds the measures they need):
+    - mean_downtime_sec
+    - mean_efficiency
+    - efficiency_std (sample standard deviation)
+    """
+    by = list(by)
+    unknown = [dim for dim in by if dim not in CUBE_DIMENSIONS]
+    if unknown:
+        raise ValueError(f"Unknown cube dimensions {unknown}, expected some of {CUBE_DIMENSIONS}")
+
+    # column-pruned cubes only carry (and derive) the measures they hold
+    measures = [col for col in CUBE_MEASURES if col in cube.columns]
+    moments = {"efficiency_count", "efficiency_sum", "efficiency_m2"} <= set(measures)
+    if not moments and "efficiency_m2" in measures:
+        # m2 does not sum: it can only be merged with its counts and sums
+        measures.remove("efficiency_m2")
+
+    if by:
+        out = cube.groupby(by, dropna=False, observed=True)[measures].sum()
+    else:
+        # totals in int64 / float64: the stored measure dtypes may be too
+        # narrow for the sums
+        out = cube[measures].sum().to_frame().T.astype({
+            col: "int64" if pd.api.types.is_integer_dtype(cube[col]) else "float64"
+            for col in measures
+        })
+
+    if moments:
+        out["efficiency_m2"] = _merged_m2(cube, by)
+
+    if {"downtime_sec_sum", "downtime_event_count"} <= set(measures):
+        events = out["downtime_event_count"].where(out["downtime_event_count"] > 0)
+        out["mean_downtime_sec"] = out["downtime_sec_sum"] / events
+
+    if moments:
+        n = out["efficiency_count"].where(out["efficiency_count"] > 0)
+        out["mean_efficiency"] = out["efficiency_sum"] / n
+        out["efficiency_std"] = np.sqrt(out["efficiency_m2"] / (n - 1).where(n > 1))
+
+    return out.reset_index() if by else out.reset_index(drop=True)
+
+
+def pivot_cube(cube: pd.DataFrame, index: str, columns: str, measure: str) -> pd.DataFrame:
+    """
+    index x columns matrix of a (derived) measure, e.g. the
+    weekday x hour downtime heatmap.
+    Cells without data for the measure are left out, e.g. the downtime
+    grid spans the weekdays / hours in which downtime occurred.
+    """
+    if measure not in _MEASURE_SOURCE:
+        raise ValueError(f"Unknown cube measure '{measure}', expected one of {list(_MEASURE_SOURCE)}")
+
+    cells = cube[cube[_MEASURE_SOURCE[measure]] > 0]
+
+    return (
+        rollup(cells, [index, columns])
+        .pivot(index=index, columns=columns, values=measure)
+        .fillna(0)
+    )
+
+
+def weekday_hour_downtime(cube: pd.DataFrame) -> pd.DataFrame:
+    """
+    Total downtime seconds by weekday (Mon..Sun labels) x hour-of-day.
+    """
+    pivot = pivot_cube(cube, "weekday", "hour", "downtime_sec_sum")
+    pivot.index = [WEEKDAY_LABELS[int(day)] for day in pivot.index]
+    pivot.columns = pivot.columns.astype(int)
+    return pivot
+
+
+# =========================================================
+# ANALYSIS STAGE
+# =========================================================
+@instrumented
+def analyze_downtime_cube(featured_dir: str, output_dir: str, context=None):
+    """
+    Materializes the cube as outputs/tables/downtime_cube.
+    """
+
+    os.makedirs(output_dir, exist_ok=True)
+
+    downtime_df = read_table(featured_dir, "downtime_features", context=context)
+    hourly_df = read_table(featured_dir, "hourly_features", context=context)
+    daily_df = read_table(featured_dir, "daily_features", context=context)
+
+    cube = build_cube(downtime_df, hourly_df, daily_df)
+
+    output_path = write_table(cube, output_dir, CUBE_TABLE, context=context)
+
+    print("\n--- Downtime Cube Completed ---")
+    print(f"Cells: {len(cube)}")
+    if output_path:
+        print(f"Saved: {output_path}")
@@ -0,0 +1,265 @@
+import os
+import numpy as np
+import pandas as pd
+
+from src.data_processing.ingest import PARTITION_KEYS
+from src.data_processing.storage import find_table, read_table
+from src.pipeline.instrumentation import file_bytes, record_read, record_write
+
+
+"""
+Time-range index over downtime events.
+
+Answers, for any window [t0, t1) and optionally one (plant_id, line_id)
+partition:
+- how many events start in the window
+- how many events overlap the window
+- how many downtime seconds fall inside the window
+
+Each partition keeps its event starts and ends as two sorted int64
+arrays (milliseconds since the earliest start) with prefix sums. The
+prefix sums are split into two int64 limbs (high and low _LIMB_BITS bits
+of every value) and recombined as Python ints: a single int64 cumsum
+overflows around 10^8 events spanning a few years. Every
+query is a handful of searchsorted calls, O(log n), with no scan of
+downtime_features.
+
+Downtime seconds inside [t0, t1) are F(t1) - F(t0), where
+F(t) = sum(min(end, t)) - sum(min(start, t)) is the downtime before t;
+both sums come from the sorted arrays and their prefix sums.
+
+Events whose end is before their start (clock values wrapping past
+midnight) are indexed as zero-length events at their start.
+
+The index is persisted next to the table as downtime_index.npz and
+rebuilt whenever downtime_features changes (load_downtime_index).
+"""
+
+
+INDEX_FILE = "downtime_index.npz"
+SOURCE_TABLE = "downtime_features"
+
+_COLUMNS = PARTITION_KEYS + ["downtime_start_ms", "downtime_end_ms"]
+
+# exact for up to 2**31 events per partition (low limb sums stay < 2**63)
+_LIMB_BITS = 32
+_LIMB_MASK = (1 << _LIMB_BITS) - 1
+
+
+def _to_ms(values) -> np.ndarray:
+    return np.asarray(values, dtype="datetime64[ms]").view("int64")
+
+
+def _prefix_sums(values: np.ndarray) -> tuple:
+    # (high, low) limbs; cum[k] = sum of the first k values of each limb
+    return (
+        np.concatenate([[0], np.cumsum(values >> _LIMB_BITS)]),
+        np.concatenate([[0], np.cumsum(values & _LIMB_MASK)]),
+    )
+
+
+class _SortedIntervals:
+    """
+    Sorted starts / ends of one partition and their prefix sums.
+    """
+
+    def __init__(self, starts: np.ndarray, ends: np.ndarray):
+        self.starts = starts
+        self.ends = ends
+        self.start_cum = _prefix_sums(starts)
+        self.end_cum = _prefix_sums(ends)
+
+    def __len__(self):
+        return len(self.starts)
+
+    @staticmethod
+    def _sum_min(values: np.ndarray, cum: tuple, t: int) -> int:
+        # sum(min(v, t)) = (sum of v < t) + t * (count of v >= t)
+        k = int(np.searchsorted(values, t, side="left"))
+        high, low = cum
+        return (int(high[k]) << _LIMB_BITS) + int(low[k]) + t * (len(values) - k)
+
+    def downtime_before(self, t: int) -> int:
+        return (
+            self._sum_min(self.ends, self.end_cum, t)
+            - self._sum_min(self.starts, self.start_cum, t)
+        )
+
+    def count_starting(self, t0: int, t1: int) -> int:
+        started = np.searchsorted(self.starts, t1, side="left")
+        return max(int(started - np.searchsorted(self.starts, t0, side="left")), 0)
+
+    def count_overlapping(self, t0: int, t1: int) -> int:
+        # start < t1 and end > t0; events with end <= t0 all start before t1
+        started = np.searchsorted(self.starts, t1, side="left")
+        ended = np.searchsorted(self.ends, t0, side="right")
+        return max(int(started - ended), 0)
+
+
+class DowntimeIndex:
+
+    def __init__(self, origin_ms: int, partitions: dict):
+        """
+        origin_ms:  epoch milliseconds all stored values are relative to
+        partitions: (plant_id, line_id) → (sorted starts, sorted ends)
+        Use from_frame / load rather than calling this directly.
+        """
+        self.origin_ms = origin_ms
+        self._parts = {
+            part: _SortedIntervals(starts, ends)
+            for part, (starts, ends) in sorted(partitions.items())
+        }
+
+        all_starts = [starts for starts, _ in partitions.values()]
+        all_ends = [ends for _, ends in partitions.values()]
+        self._all = _SortedIntervals(
+            np.sort(np.concatenate(all_starts or [np.empty(0, "int64")])),
+            np.sort(np.concatenate(all_ends or [np.empty(0, "int64")])),
+        )
+
+    # -----------------------------------------------------
+    # Build / persist
+    # -----------------------------------------------------
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "DowntimeIndex":
+        """
+        Builds the index from downtime_features rows; rows without a
+        start or end timestamp are skipped.
+        """
+        df = df.dropna(subset=["downtime_start_ms", "downtime_end_ms"])
+
+        starts = df["downtime_start_ms"].to_numpy("int64")
+        ends = np.maximum(df["downtime_end_ms"].to_numpy("int64"), starts)
+
+        origin_ms = int(starts.min()) if len(starts) else 0
+        starts = starts - origin_ms
+        ends = ends - origin_ms
+
+        keys = df[PARTITION_KEYS].astype(str)
+        partitions = {}
+        for part, rows in keys.groupby(PARTITION_KEYS, sort=False).indices.items():
+            partitions[tuple(part)] = (np.sort(starts[rows]), np.sort(ends[rows]))
+
+        return cls(origin_ms, partitions)
+
+    def save(self, path: str, source_signature: tuple = ()):
+        parts = list(self._parts.items())
+        sizes = [len(intervals) for _, intervals in parts]
+
+        np.savez(
+            path,
+            origin_ms=np.int64(self.origin_ms),
+            partition_keys=np.array(PARTITION_KEYS),
+            partitions=np.array([part for part, _ in parts], dtype=str).reshape(len(parts), len(PARTITION_KEYS)),
+            offsets=np.concatenate([[0], np.cumsum(sizes)]).astype("int64"),
+            starts=np.concatenate([iv.starts for _, iv in parts] or [np.empty(0, "int64")]),
+            ends=np.concatenate([iv.ends for _, iv in parts] or [np.empty(0, "int64")]),
+            source=np.array([str(value) for value in source_signature]),
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "DowntimeIndex":
+        with np.load(path, allow_pickle=False) as data:
+            offsets = data["offsets"]
+            partitions = {
+                tuple(str(value) for value in part): (
+                    data["starts"][offsets[i]:offsets[i + 1]],
+                    data["ends"][offsets[i]:offsets[i + 1]],
+                )
+                for i, part in enumerate(data["partitions"])
+            }
+            return cls(int(data["origin_ms"]), partitions)
+
+    # -----------------------------------------------------
+    # Queries
+    # -----------------------------------------------------
+    @property
+    def partitions(self) -> list:
+        return list(self._parts)
+
+    def __len__(self):
+        return len(self._all)
+
+    def _intervals(self, partition) -> _SortedIntervals:
+        if partition is None:
+            return self._all
+
+        part = tuple(str(value) for value in partition)
+        if part not in self._parts:
+            raise KeyError(f"Unknown partition {part}, expected one of {self.partitions}")
+        return self._parts[part]
+
+    def _ms(self, t) -> int:
+        return int(_to_ms(pd.Timestamp(t).to_datetime64())) - self.origin_ms
+
+    def count_starting(self, t0, t1, partition: tuple = None) -> int:
+        """
+        Number of events starting in [t0, t1).
+        """
+        return self._intervals(partition).count_starting(self._ms(t0), self._ms(t1))
+
+    def count_overlapping(self, t0, t1, partition: tuple = None) -> int:
+        """
+        Number of events overlapping [t0, t1) (start < t1 and end > t0).
+        """
+        return self._intervals(partition).count_overlapping(self._ms(t0), self._ms(t1))
+
+    def downtime_seconds(self, t0, t1, partition: tuple = None) -> float:
+        """
+        Downtime seconds inside [t0, t1), events clipped to the window.
+        """
+        intervals = self._intervals(partition)
+        t0, t1 = self._ms(t0), self._ms(t1)
+        if t1 <= t0:
+            return 0.0
+        return (intervals.downtime_before(t1) - intervals.downtime_before(t0)) / 1000
+
+    def query(self, t0, t1, partition: tuple = None) -> dict:
+        """
+        All window statistics at once.
+        """
+        return {
+            "event_count": self.count_starting(t0, t1, partition),
+            "overlapping_event_count": self.count_overlapping(t0, t1, partition),
+            "downtime_sec": self.downtime_seconds(t0, t1, partition),
+        }
+
+
+# =========================================================
+# LOADING
+# =========================================================
+def _source_signature(path: str) -> tuple:
+    stat = os.stat(path)
+    return os.path.basename(path), stat.st_size, stat.st_mtime_ns
+
+
+def load_downtime_index(featured_dir: str, context=None) -> DowntimeIndex:
+    """
+    Index over featured downtime_features.
+
+    The persisted index is reused while it matches the stored table
+    (file name, size, mtime) and rebuilt and saved when it does not.
+    With a non-persisting context the table is indexed in memory.
+    """
+    if context is not None and not context.persist:
+        return DowntimeIndex.from_frame(
+            read_table(featured_dir, SOURCE_TABLE, columns=_COLUMNS, context=context)
+        )
+
+    signature = _source_signature(find_table(featured_dir, SOURCE_TABLE))
+    index_path = os.path.join(featured_dir, INDEX_FILE)
+
+    if os.path.exists(index_path):
+        with np.load(index_path, allow_pickle=False) as data:
+            stored = tuple(data["source"])
+            keys = list(data["partition_keys"])
+        if stored == tuple(str(value) for value in signature) and keys == PARTITION_KEYS:
+            record_read(nbytes=file_bytes(index_path))
+            return DowntimeIndex.load(index_path)
+
+    index = DowntimeIndex.from_frame(
+        read_table(featured_dir, SOURCE_TABLE, columns=_COLUMNS, context=context)
+    )
+    index.save(index_path, signature)
+    record_write(nbytes=file_bytes(index_path))
+    return index
@@ -1,40 +1,72 @@
 import os
 import pandas as pd
 
+from src.analysis.burst_episodes import analyze_burst_episodes
+from src.analysis.downtime_cube import analyze_downtime_cube
+from src.analysis.downtime_index import load_downtime_index
+from src.analysis.quantile_sketch import sketch_table
+from src.data_processing.storage import iter_table, read_table, write_table, write_table_chunks
+from src.pipeline.context import PipelineContext
+from src.pipeline.instrumentation import instrumented
+
 
 """
 Event-level downtime analysis:
 - Analyze how downtime durations are distributed
 - Identify long-tail (Pareto-like) behavior in downtime events
 - Produce clean analytical artifacts for visualization
+- Cluster events into burst episodes for several gap thresholds
+  (src/analysis/burst_episodes.py)
+- Materialize the downtime aggregate cube (src/analysis/downtime_cube.py)
+- Refresh the time-range index over the events (src/analysis/downtime_index.py)
 """
 
 
-def analyze_downtime_duration(featured_dir: str, output_dir: str):
+@instrumented
+def analyze_downtime_duration(
+    featured_dir: str,
+    output_dir: str,
+    context=None,
+    quantile_sketch: bool = False
+):
     """
     Analyzes downtime duration distribution and produces:
     A statistical summary table
     A clean distribution dataset for visualization
+
+    quantile_sketch=True computes the statistics from a QuantileSketch
+    streamed over the table (src/analysis/quantile_sketch.py) instead of
+    exact quantiles over the loaded column, and streams the distribution
+    dataset as well: memory is bounded by the sketch and one chunk.
     """
 
     os.makedirs(output_dir, exist_ok=True)
 
-    input_path = os.path.join(featured_dir, "downtime_features.csv")
-    df = pd.read_csv(input_path)
-
     duration_col = "downtime_duration_sec"
 
     # ---------------------------------------------------------
     # Core statistics
     # ---------------------------------------------------------
-    median_duration = df[duration_col].median()
-    mean_duration = df[duration_col].mean()
-    threshold_95 = df[duration_col].quantile(0.95)
-
-    long_event_share = (
-        df[df[duration_col] >= threshold_95][duration_col].sum()
-        / df[duration_col].sum()
-    )
+    if quantile_sketch:
+        sketch = sketch_table(
+            featured_dir, "downtime_features", [duration_col], context=context
+        )[duration_col]
+
+        median_duration = sketch.quantile(0.5)
+        mean_duration = sketch.mean()
+        threshold_95 = sketch.quantile(0.95)
+        long_event_share = sketch.sum_at_least(threshold_95) / sketch.sum
+    else:
+        df = read_table(featured_dir, "downtime_features", context=context)
+
+        median_duration = df[duration_col].median()
+        mean_duration = df[duration_col].mean()
+        threshold_95 = df[duration_col].quantile(0.95)
+
+        long_event_share = (
+            df[df[duration_col] >= threshold_95][duration_col].sum()
+            / df[duration_col].sum()
+        )
 
     # ---------------------------------------------------------
     # Summary table
@@ -54,36 +86,49 @@ def analyze_downtime_duration(featured_dir: str, output_dir: str):
         ]
     })
 
-    summary_output_path = os.path.join(
-        output_dir,
-        "downtime_duration_summary.csv"
+    summary_output_path = write_table(
+        summary_df, output_dir, "downtime_duration_summary", context=context
     )
-    summary_df.to_csv(summary_output_path, index=False)
 
     # ---------------------------------------------------------
     # Distribution dataset
     # ---------------------------------------------------------
-    distribution_df = df[
-        [
-            "downtime_duration_sec",
-            "is_burst"
-        ]
-    ].copy()
-
-    distribution_output_path = os.path.join(
-        output_dir,
-        "downtime_duration_distribution.csv"
-    )
-    distribution_df.to_csv(distribution_output_path, index=False)
+    distribution_columns = [
+        "downtime_duration_sec",
+        "is_burst"
+    ]
+
+    if quantile_sketch:
+        distribution_output_path = write_table_chunks(
+            iter_table(
+                featured_dir, "downtime_features",
+                columns=distribution_columns, context=context
+            ),
+            output_dir, "downtime_duration_distribution", context=context
+        )
+    else:
+        distribution_df = read_table(
+            featured_dir,
+            "downtime_features",
+            columns=distribution_columns,
+            context=context
+        ).copy()
+
+        distribution_output_path = write_table(
+            distribution_df, output_dir, "downtime_duration_distribution", context=context
+        )
 
     print("\n--- Downtime Duration Analysis Completed ---")
     print(f"Median duration (sec): {median_duration:.2f}")
     print(f"95th percentile (sec): {threshold_95:.2f}")
     print(f"Top 5% downtime share: {long_event_share:.2%}")
-    print(f"Saved: {summary_output_path}")
-    print(f"Saved: {distribution_output_path}")
+    if summary_output_path:
+        print(f"Saved: {summary_output_path}")
+    if distribution_output_path:
+        print(f"Saved: {distribution_output_path}")
 
-def analyze_burst_behavior(featured_dir: str, output_dir: str):
+@instrumented
+def analyze_burst_behavior(featured_dir: str, output_dir: str, context=None):
     """
     Analyzes burst vs non-burst downtime behavior.
 
@@ -95,8 +140,7 @@ def analyze_burst_behavior(featured_dir: str, output_dir: str):
 
     os.makedirs(output_dir, exist_ok=True)
 
-    input_path = os.path.join(featured_dir, "downtime_features.csv")
-    df = pd.read_csv(input_path)
+    df = read_table(featured_dir, "downtime_features", context=context)
 
     duration_col = "downtime_duration_sec"
 
@@ -116,29 +160,52 @@ def analyze_burst_behavior(featured_dir: str, output_dir: str):
         burst_summary["total_downtime_sec"] / total_downtime
     )
 
-    output_path = os.path.join(
-        output_dir,
-        "downtime_burst_summary.csv"
+    output_path = write_table(
+        burst_summary, output_dir, "downtime_burst_summary", context=context
     )
 
-    burst_summary.to_csv(output_path, index=False)
-
     print("\n--- Burst Analysis Completed ---")
     print(burst_summary)
-    print(f"Saved: {output_path}")
-
+    if output_path:
+        print(f"Saved: {output_path}")
 
-def run_event_analysis_pipeline(featured_dir: str, output_dir: str):
 
+@instrumented
+def run_event_analysis_pipeline(
+    featured_dir: str,
+    output_dir: str,
+    context=None,
+    quantile_sketch: bool = False
+):
 
     print("\nStarting event-level downtime analysis...")
 
+    # downtime_features is loaded once and shared by every analysis below
+    context = context if context is not None else PipelineContext()
+
     analyze_downtime_duration(
         featured_dir=featured_dir,
-        output_dir=output_dir
+        output_dir=output_dir,
+        context=context,
+        quantile_sketch=quantile_sketch
     )
     analyze_burst_behavior(
         featured_dir=featured_dir,
-        output_dir=output_dir
+        output_dir=output_dir,
+        context=context
     )
+    analyze_burst_episodes(
+        featured_dir=featured_dir,
+        output_dir=output_dir,
+        context=context
+    )
+    analyze_downtime_cube(
+        featured_dir=featured_dir,
+        output_dir=output_dir,
+        context=context
+    )
+
+    # persisted for ad-hoc window queries (load_downtime_index)
+    index = load_downtime_index(featured_dir, context=context)
+    print(f"\nDowntime index: {len(index)} events, {len(index.partitions)} partition(s)")
 
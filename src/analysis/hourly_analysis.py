@@ -2,6 +2,12 @@ import numpy as np
 import os
 import pandas as pd
 
+from src.analysis.metrics import SUMMARY_TABLES, THROUGHPUT_COLUMNS, write_summaries
+from src.analysis.quantile_sketch import QuantileSketch
+from src.data_processing.storage import iter_table, read_table, write_table
+from src.pipeline.context import PipelineContext
+from src.pipeline.instrumentation import instrumented
+
 
 """
 Hourly operational performance analysis.
@@ -11,106 +17,143 @@ Focus:
 - Zero-production window detection
 - Hourly efficiency decay patterns
 - Throughput volatility and cross-table consistency validation
+
+The metric / value summaries are declared in src/analysis/metrics.py.
 """
 
 
+HOURLY_SUMMARIES = [
+    "hourly_efficiency_summary",
+    "throughput_downtime_summary",
+]
+
+
 # =========================================================
 # HOURLY EFFICIENCY SUMMARY
 # =========================================================
-def analyze_hourly_efficiency(featured_dir: str, output_dir: str):
+@instrumented
+def analyze_hourly_efficiency(featured_dir: str, output_dir: str, context=None):
     """
     Produces a statistical summary of hourly efficiency values
     and identifies zero-operation windows.
     """
+    write_summaries(["hourly_efficiency_summary"], featured_dir, output_dir, context)
 
-    os.makedirs(output_dir, exist_ok=True)
 
-    input_path = os.path.join(featured_dir, "hourly_features.csv")
-    df = pd.read_csv(input_path, parse_dates=["date", "timestamp_start", "timestamp_end"])
+# =========================================================
+# THROUGHPUT VS DOWNTIME CORRELATION
+# =========================================================
+class _Comoments:
+    """
+    Count, means, centered sums of squares and co-moment of (x, y),
+    merged chunk by chunk (Chan et al.). Naive sums of squares cancel
+    catastrophically on long histories; centered ones stay exact enough.
+    """
 
-    summary = pd.DataFrame({
-        "metric": [
-            "mean_efficiency",
-            "median_efficiency",
-            "min_efficiency",
-            "max_efficiency",
-            "efficiency_std",
-            "zero_operation_hours",
-            "zero_operation_share",
-        ],
-        "value": [
-            df["efficiency"].mean(),
-            df["efficiency"].median(),
-            df["efficiency"].min(),
-            df["efficiency"].max(),
-            df["efficiency"].std(),
-            df["zero_operation_flag"].sum(),
-            df["zero_operation_flag"].mean(),
-        ]
-    })
+    def __init__(self):
+        self.n = 0
+        self.mean_x = self.mean_y = 0.0
+        self.m2_x = self.m2_y = self.c_xy = 0.0
 
-    output_path = os.path.join(output_dir, "hourly_efficiency_summary.csv")
-    summary.to_csv(output_path, index=False)
+    def add(self, x: np.ndarray, y: np.ndarray):
+        n_b = len(x)
+        if n_b == 0:
+            return
 
-    print("\n--- Hourly Efficiency Summary ---")
-    print(summary)
-    print(f"Saved: {output_path}")
+        mean_x, mean_y = x.mean(), y.mean()
+        dx, dy = x - mean_x, y - mean_y
 
+        n = self.n + n_b
+        delta_x = mean_x - self.mean_x
+        delta_y = mean_y - self.mean_y
+        weight = self.n * n_b / n
 
-# =========================================================
-# THROUGHPUT VS DOWNTIME CORRELATION
-# =========================================================
-def analyze_throughput_vs_downtime(featured_dir: str, output_dir: str):
+        self.m2_x += (dx * dx).sum() + delta_x * delta_x * weight
+        self.m2_y += (dy * dy).sum() + delta_y * delta_y * weight
+        self.c_xy += (dx * dy).sum() + delta_x * delta_y * weight
+        self.mean_x += delta_x * n_b / n
+        self.mean_y += delta_y * n_b / n
+        self.n = n
+
+
+def _streamed_throughput_stats(featured_dir: str, context=None) -> list:
+    """
+    Values of the throughput summary from one streamed pass over
+    hourly_features: merged co-moments for the correlation / mean / std
+    and QuantileSketches for the percentiles.
+    """
+    throughput = QuantileSketch()
+    downtime = QuantileSketch()
+    moments = _Comoments()
+
+    for chunk in iter_table(featured_dir, "hourly_features", columns=THROUGHPUT_COLUMNS, context=context):
+        chunk = chunk.dropna()
+        x = chunk["throughput_per_hour"].to_numpy(dtype="float64")
+        y = chunk["downtime_ratio"].to_numpy(dtype="float64")
+
+        throughput.add(x)
+        downtime.add(y)
+        moments.add(x, y)
+
+    n = moments.n
+    var_x = moments.m2_x / (n - 1) if n > 1 else np.nan
+    var_y = moments.m2_y / (n - 1) if n > 1 else np.nan
+    cov = moments.c_xy / (n - 1) if n > 1 else np.nan
+
+    threshold_75 = downtime.quantile(0.75)
+
+    return [
+        cov / np.sqrt(var_x * var_y),
+        moments.mean_x if n else np.nan,
+        throughput.quantile(0.5),
+        np.sqrt(var_x),
+        downtime.count_at_least(threshold_75),
+        threshold_75,
+    ]
+
+
+@instrumented
+def analyze_throughput_vs_downtime(
+    featured_dir: str,
+    output_dir: str,
+    context=None,
+    quantile_sketch: bool = False
+):
     """
     Computes the correlation between hourly throughput and downtime ratio.
     Identifies high-downtime / low-throughput windows.
-    """
-
-    os.makedirs(output_dir, exist_ok=True)
-
-    input_path = os.path.join(featured_dir, "hourly_features.csv")
-    df = pd.read_csv(input_path, parse_dates=["timestamp_start"])
 
-    analysis_df = df[
-        ["timestamp_start", "throughput_per_hour", "downtime_ratio", "production_gallons"]
-    ].dropna()
+    quantile_sketch=True streams the table once and takes the percentiles
+    from QuantileSketches (src/analysis/quantile_sketch.py).
+    """
 
-    correlation = analysis_df["throughput_per_hour"].corr(analysis_df["downtime_ratio"])
+    if not quantile_sketch:
+        write_summaries(["throughput_downtime_summary"], featured_dir, output_dir, context)
+        return
 
-    threshold_75 = analysis_df["downtime_ratio"].quantile(0.75)
-    high_downtime_df = analysis_df[analysis_df["downtime_ratio"] >= threshold_75]
+    os.makedirs(output_dir, exist_ok=True)
 
+    metrics = SUMMARY_TABLES["throughput_downtime_summary"]["metrics"]
     summary = pd.DataFrame({
-        "metric": [
-            "throughput_downtime_correlation",
-            "mean_throughput_per_hour",
-            "median_throughput_per_hour",
-            "throughput_std",
-            "high_downtime_hour_count",
-            "high_downtime_threshold_ratio",
-        ],
-        "value": [
-            correlation,
-            analysis_df["throughput_per_hour"].mean(),
-            analysis_df["throughput_per_hour"].median(),
-            analysis_df["throughput_per_hour"].std(),
-            len(high_downtime_df),
-            threshold_75,
-        ]
+        "metric": [metric for metric, _, _ in metrics],
+        "value": _streamed_throughput_stats(featured_dir, context)
     })
 
-    output_path = os.path.join(output_dir, "throughput_downtime_summary.csv")
-    summary.to_csv(output_path, index=False)
+    output_path = write_table(
+        summary, output_dir, "throughput_downtime_summary", context=context
+    )
 
     print("\n--- Throughput vs Downtime Analysis ---")
     print(summary)
-    print(f"Saved: {output_path}")
+    if output_path:
+        print(f"Saved: {output_path}")
 
 
 # =========================================================
 # HOURLY DOWNTIME DENSITY BY HOUR-OF-DAY
 # =========================================================
-def analyze_hourly_downtime_density(featured_dir: str, output_dir: str):
+@instrumented
+def analyze_hourly_downtime_density(featured_dir: str, output_dir: str, context=None):
     """
     Aggregates downtime ratio by hour-of-day to reveal
     intraday downtime density patterns.
@@ -118,8 +161,7 @@ def analyze_hourly_downtime_density(featured_dir: str, output_dir: str):
 
     os.makedirs(output_dir, exist_ok=True)
 
-    input_path = os.path.join(featured_dir, "hourly_features.csv")
-    df = pd.read_csv(input_path, parse_dates=["timestamp_start"])
+    df = read_table(featured_dir, "hourly_features", context=context)
 
     density_df = (
         df.groupby("hour")
@@ -133,23 +175,38 @@ def analyze_hourly_downtime_density(featured_dir: str, output_dir: str):
         .sort_values("hour")
     )
 
-    output_path = os.path.join(output_dir, "hourly_downtime_density.csv")
-    density_df.to_csv(output_path, index=False)
+    output_path = write_table(
+        density_df, output_dir, "hourly_downtime_density", context=context
+    )
 
     print("\n--- Hourly Downtime Density by Hour-of-Day ---")
     print(density_df)
-    print(f"Saved: {output_path}")
+    if output_path:
+        print(f"Saved: {output_path}")
 
 
 # =========================================================
 # PIPELINE
 # =========================================================
-def run_hourly_analysis_pipeline(featured_dir: str, output_dir: str):
+@instrumented
+def run_hourly_analysis_pipeline(
+    featured_dir: str,
+    output_dir: str,
+    context=None,
+    quantile_sketch: bool = False
+):
 
     print("\nStarting hourly operational analysis...")
 
-    analyze_hourly_efficiency(featured_dir, output_dir)
-    analyze_throughput_vs_downtime(featured_dir, output_dir)
-    analyze_hourly_downtime_density(featured_dir, output_dir)
+    # hourly_features is loaded once and shared by every analysis below
+    context = context if context is not None else PipelineContext()
+
+    if quantile_sketch:
+        analyze_hourly_efficiency(featured_dir, output_dir, context)
+        analyze_throughput_vs_downtime(featured_dir, output_dir, context, quantile_sketch)
+    else:
+        # both summaries over hourly_features share one fused pass
+        write_summaries(HOURLY_SUMMARIES, featured_dir, output_dir, context)
+    analyze_hourly_downtime_density(featured_dir, output_dir, context)
 
     print("Hourly analysis pipeline completed successfully.")
@@ -0,0 +1,190 @@
+import os
+import pandas as pd
+
+from src.data_processing.storage import read_table, write_table
+from src.pipeline.instrumentation import instrumented, span
+
+
+"""
+Declarative summary metrics.
+
+SUMMARY_TABLES lists every metric / value summary table: the featured
+table it reads, an optional row filter (dropna over columns) and its
+metrics as (metric name, column, statistic). Statistics:
+- mean, median, min, max, std, sum, count
+- pNN               NN-th percentile (exact quantile)
+- corr:<column>     Pearson correlation with another column
+- count_ge:<stat>   number of rows with column >= that statistic
+
+write_summaries fuses the requested tables: tables reading the same rows
+are computed together, every (column, statistic) pair is evaluated once
+(e.g. the daily efficiency std shared by the efficiency and stability
+summaries) and the plain statistics of a column come from a single
+aggregation call. The fused pass is recorded as a write_summaries span
+(reading the featured tables) with one span per summary table written.
+"""
+
+
+BASE_STATS = ["mean", "median", "min", "max", "std", "sum", "count"]
+
+THROUGHPUT_COLUMNS = ["timestamp_start", "throughput_per_hour", "downtime_ratio", "production_gallons"]
+
+SUMMARY_TABLES = {
+    "daily_efficiency_summary": {
+        "title": "Daily Efficiency Summary",
+        "source": "daily_features",
+        "metrics": [
+            ("mean_efficiency", "efficiency", "mean"),
+            ("median_efficiency", "efficiency", "median"),
+            ("min_efficiency", "efficiency", "min"),
+            ("max_efficiency", "efficiency", "max"),
+            ("efficiency_std", "efficiency", "std"),
+        ],
+    },
+    "pause_ratio_summary": {
+        "title": "Pause Behavior Analysis",
+        "source": "daily_features",
+        "metrics": [
+            ("mean_pause_ratio", "pause_ratio", "mean"),
+            ("median_pause_ratio", "pause_ratio", "median"),
+            ("max_pause_ratio", "pause_ratio", "max"),
+            ("pause_ratio_std", "pause_ratio", "std"),
+        ],
+    },
+    "operational_stability_metrics": {
+        "title": "Operational Stability",
+        "source": "daily_features",
+        "metrics": [
+            ("efficiency_volatility", "efficiency", "std"),
+            ("pause_ratio_volatility", "pause_ratio", "std"),
+        ],
+    },
+    "hourly_efficiency_summary": {
+        "title": "Hourly Efficiency Summary",
+        "source": "hourly_features",
+        "metrics": [
+            ("mean_efficiency", "efficiency", "mean"),
+            ("median_efficiency", "efficiency", "median"),
+            ("min_efficiency", "efficiency", "min"),
+            ("max_efficiency", "efficiency", "max"),
+            ("efficiency_std", "efficiency", "std"),
+            ("zero_operation_hours", "zero_operation_flag", "sum"),
+            ("zero_operation_share", "zero_operation_flag", "mean"),
+        ],
+    },
+    "throughput_downtime_summary": {
+        "title": "Throughput vs Downtime Analysis",
+        "source": "hourly_features",
+        "dropna": THROUGHPUT_COLUMNS,
+        "metrics": [
+            ("throughput_downtime_correlation", "throughput_per_hour", "corr:downtime_ratio"),
+            ("mean_throughput_per_hour", "throughput_per_hour", "mean"),
+            ("median_throughput_per_hour", "throughput_per_hour", "median"),
+            ("throughput_std", "throughput_per_hour", "std"),
+            ("high_downtime_hour_count", "downtime_ratio", "count_ge:p75"),
+            ("high_downtime_threshold_ratio", "downtime_ratio", "p75"),
+        ],
+    },
+}
+
+
+# =========================================================
+# ENGINE
+# =========================================================
+def _resolve(df: pd.DataFrame, column: str, stat: str, values: dict):
+    """
+    Value of a derived statistic, memoized in values[(column, stat)].
+    """
+    key = (column, stat)
+    if key in values:
+        return values[key]
+
+    if stat.startswith("p") and stat[1:].isdigit():
+        value = df[column].quantile(int(stat[1:]) / 100)
+    elif stat.startswith("corr:"):
+        value = df[column].corr(df[stat.split(":", 1)[1]])
+    elif stat.startswith("count_ge:"):
+        threshold = _resolve(df, column, stat.split(":", 1)[1], values)
+        value = int((df[column] >= threshold).sum())
+    else:
+        raise ValueError(f"Unknown statistic '{stat}' for column '{column}'")
+
+    values[key] = value
+    return value
+
+
+def _aggregate(df: pd.DataFrame, pairs: list) -> dict:
+    """
+    (column, stat) → value for every requested pair, each computed once.
+    """
+    plain = {}
+    for column, stat in pairs:
+        if stat in BASE_STATS and stat not in plain.setdefault(column, []):
+            plain[column].append(stat)
+
+    values = {}
+    for column, stats in plain.items():
+        aggregated = df[column].agg(stats)
+        for stat in stats:
+            values[(column, stat)] = aggregated[stat]
+
+    for column, stat in pairs:
+        _resolve(df, column, stat, values)
+
+    return values
+
+
+def compute_summaries(names: list, featured_dir: str, context=None) -> dict:
+    """
+    name → summary table (metric, value) for the requested SUMMARY_TABLES.
+    """
+    unknown = [name for name in names if name not in SUMMARY_TABLES]
+    if unknown:
+        raise ValueError(f"Unknown summary tables {unknown}, expected some of {list(SUMMARY_TABLES)}")
+
+    # tables reading the same rows are computed together
+    groups = {}
+    for name in names:
+        spec = SUMMARY_TABLES[name]
+        groups.setdefault((spec["source"], tuple(spec.get("dropna", ()))), []).append(name)
+
+    summaries = {}
+    for (source, dropna), members in groups.items():
+        df = read_table(featured_dir, source, context=context)
+        if dropna:
+            df = df[list(dropna)].dropna()
+
+        pairs = list(dict.fromkeys(
+            (column, stat)
+            for name in members
+            for _, column, stat in SUMMARY_TABLES[name]["metrics"]
+        ))
+        values = _aggregate(df, pairs)
+
+        for name in members:
+            metrics = SUMMARY_TABLES[name]["metrics"]
+            summaries[name] = pd.DataFrame({
+                "metric": [metric for metric, _, _ in metrics],
+                "value": [values[(column, stat)] for _, column, stat in metrics],
+            })
+
+    return {name: summaries[name] for name in names}
+
+
+@instrumented
+def write_summaries(names: list, featured_dir: str, output_dir: str, context=None):
+    """
+    Computes the requested summary tables in one fused pass and writes
+    them, each in its own span named after the table.
+    """
+
+    os.makedirs(output_dir, exist_ok=True)
+
+    for name, summary in compute_summaries(names, featured_dir, context).items():
+        with span(name):
+            output_path = write_table(summary, output_dir, name, context=context)
+
+        print(f"\n--- {SUMMARY_TABLES[name]['title']} ---")
+        print(summary)
+        if output_path:
+            print(f"Saved: {output_path}")
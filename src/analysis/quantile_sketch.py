@@ -0,0 +1,236 @@
+import math
+import numpy as np
+import pandas as pd
+
+from src.data_processing.storage import iter_table
+
+
+"""
+Mergeable quantile sketch for duration / ratio statistics.
+
+QuantileSketch is a log-bucket sketch (DDSketch): a value v > 0 falls into
+bucket i = ceil(log_gamma(v)) with gamma = (1 + a) / (1 - a), and every
+bucket keeps its count and its value sum. Negative values use a mirrored
+set of buckets, values with |v| < MIN_VALUE are counted as zero.
+
+Error guarantee: quantile(q) returns a value within a relative error of
+`relative_accuracy` (a, default 1%) of the data value of rank
+floor(q * (n - 1)) (exact quantiles interpolate between the two
+neighbouring ranks instead). The guarantee holds as long as no more than
+max_buckets buckets per sign are needed (a span of about 9 orders of
+magnitude at a = 1%); beyond that the smallest magnitudes are collapsed
+into one bucket and only their quantiles lose accuracy.
+
+Memory is bounded by max_buckets, independent of the number of values.
+add() takes chunks of any size and merge() adds bucket counts, so
+sketches built per chunk, partition or day combine into the sketch of
+the union, with the same guarantee.
+"""
+
+
+DEFAULT_RELATIVE_ACCURACY = 0.01
+DEFAULT_MAX_BUCKETS = 2048
+
+# |v| below this is counted as zero
+MIN_VALUE = 1e-9
+
+
+class _Store:
+    """
+    Sorted bucket indices with their counts and value sums (one sign).
+    """
+
+    def __init__(self):
+        self.keys = np.empty(0, dtype="int64")
+        self.counts = np.empty(0, dtype="int64")
+        self.sums = np.empty(0, dtype="float64")
+
+    def add(self, keys: np.ndarray, counts: np.ndarray, sums: np.ndarray, max_buckets: int):
+        all_keys = np.concatenate([self.keys, keys])
+        unique, inverse = np.unique(all_keys, return_inverse=True)
+
+        self.keys = unique
+        self.counts = np.bincount(
+            inverse, weights=np.concatenate([self.counts, counts]), minlength=len(unique)
+        ).astype("int64")
+        self.sums = np.bincount(
+            inverse, weights=np.concatenate([self.sums, sums]), minlength=len(unique)
+        )
+
+        if len(self.keys) > max_buckets:
+            # collapse the smallest magnitudes into the lowest kept bucket
+            cut = len(self.keys) - max_buckets + 1
+            self.counts = np.concatenate([[self.counts[:cut].sum()], self.counts[cut:]])
+            self.sums = np.concatenate([[self.sums[:cut].sum()], self.sums[cut:]])
+            self.keys = self.keys[cut - 1:]
+
+    def add_values(self, magnitudes: np.ndarray, log_gamma: float, max_buckets: int):
+        if len(magnitudes) == 0:
+            return
+        keys = np.ceil(np.log(magnitudes) / log_gamma).astype("int64")
+        unique, inverse = np.unique(keys, return_inverse=True)
+        self.add(
+            unique,
+            np.bincount(inverse, minlength=len(unique)),
+            np.bincount(inverse, weights=magnitudes, minlength=len(unique)),
+            max_buckets,
+        )
+
+    @property
+    def count(self) -> int:
+        return int(self.counts.sum())
+
+
+class QuantileSketch:
+
+    def __init__(
+        self,
+        relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY,
+        max_buckets: int = DEFAULT_MAX_BUCKETS
+    ):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError(f"relative_accuracy must be in (0, 1), got {relative_accuracy}")
+
+        self.relative_accuracy = relative_accuracy
+        self.max_buckets = max_buckets
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+
+        self._positive = _Store()
+        self._negative = _Store()
+        self._zero_count = 0
+
+    # -----------------------------------------------------
+    # Building
+    # -----------------------------------------------------
+    def add(self, values) -> "QuantileSketch":
+        """
+        Adds a chunk of values; NaN / NA are ignored.
+        """
+        values = pd.to_numeric(pd.Series(values), errors="coerce").to_numpy(
+            dtype="float64", na_value=np.nan
+        )
+        values = values[~np.isnan(values)]
+
+        magnitude = np.abs(values)
+        zero = magnitude < MIN_VALUE
+
+        self._zero_count += int(zero.sum())
+        self._positive.add_values(magnitude[~zero & (values > 0)], self._log_gamma, self.max_buckets)
+        self._negative.add_values(magnitude[~zero & (values < 0)], self._log_gamma, self.max_buckets)
+        return self
+
+    def merge(self, other: "QuantileSketch") -> "QuantileSketch":
+        """
+        Adds another sketch (same relative_accuracy) into this one.
+        """
+        if not math.isclose(other.gamma, self.gamma):
+            raise ValueError("Only sketches with the same relative_accuracy can be merged")
+
+        for mine, theirs in ((self._positive, other._positive), (self._negative, other._negative)):
+            mine.add(theirs.keys, theirs.counts, theirs.sums, self.max_buckets)
+        self._zero_count += other._zero_count
+        return self
+
+    # -----------------------------------------------------
+    # Queries
+    # -----------------------------------------------------
+    @property
+    def count(self) -> int:
+        return self._positive.count + self._negative.count + self._zero_count
+
+    @property
+    def sum(self) -> float:
+        return float(self._positive.sums.sum() - self._negative.sums.sum())
+
+    def mean(self) -> float:
+        return self.sum / self.count if self.count else np.nan
+
+    def _value(self, key: int) -> float:
+        # midpoint (in relative terms) of bucket (gamma^(key-1), gamma^key]
+        return 2 * self.gamma ** key / (self.gamma + 1)
+
+    def _ordered(self):
+        """
+        (values, counts, sums) of every bucket in ascending value order.
+        """
+        neg = self._negative
+        pos = self._positive
+        values = np.concatenate([
+            [-self._value(k) for k in neg.keys[::-1]],
+            [0.0],
+            [self._value(k) for k in pos.keys],
+        ])
+        counts = np.concatenate([neg.counts[::-1], [self._zero_count], pos.counts])
+        sums = np.concatenate([-neg.sums[::-1], [0.0], pos.sums])
+        return values, counts, sums
+
+    def quantile(self, q: float) -> float:
+        """
+        Estimate of the q-quantile, q in [0, 1] (NaN for an empty sketch).
+        """
+        if not 0 <= q <= 1:
+            raise ValueError(f"q must be in [0, 1], got {q}")
+        if self.count == 0:
+            return np.nan
+
+        values, counts, _ = self._ordered()
+        rank = math.floor(q * (self.count - 1))
+        return float(values[np.searchsorted(np.cumsum(counts), rank, side="right")])
+
+    def _bucket_value(self, value: float) -> float:
+        # representative of the bucket value falls into
+        if abs(value) < MIN_VALUE:
+            return 0.0
+        key = math.ceil(math.log(abs(value)) / self._log_gamma)
+        return math.copysign(self._value(key), value)
+
+    def _at_least(self, threshold: float):
+        values, counts, sums = self._ordered()
+        # the bucket of the threshold itself counts fully
+        keep = values >= self._bucket_value(threshold)
+        return counts[keep], sums[keep]
+
+    def count_at_least(self, threshold: float) -> int:
+        """
+        Number of values >= threshold, up to the values sharing the
+        threshold's bucket.
+        """
+        counts, _ = self._at_least(threshold)
+        return int(counts.sum())
+
+    def sum_at_least(self, threshold: float) -> float:
+        """
+        Sum of the values >= threshold, up to the values sharing the
+        threshold's bucket.
+        """
+        _, sums = self._at_least(threshold)
+        return float(sums.sum())
+
+
+# =========================================================
+# TABLE HELPERS
+# =========================================================
+def sketch_table(
+    directory: str,
+    name: str,
+    columns: list,
+    dropna: bool = False,
+    relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY,
+    context=None
+) -> dict:
+    """
+    column → QuantileSketch over a stored table, streamed chunk by chunk
+    (iter_table), so the table never has to fit in memory.
+    dropna=True skips rows with a missing value in any of the columns
+    (like DataFrame.dropna over the selection).
+    """
+    sketches = {col: QuantileSketch(relative_accuracy) for col in columns}
+
+    for chunk in iter_table(directory, name, columns=columns, context=context):
+        if dropna:
+            chunk = chunk.dropna()
+        for col in columns:
+            sketches[col].add(chunk[col])
+
+    return sketches
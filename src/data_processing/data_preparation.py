@@ -1,56 +1,300 @@
+import datetime
 import os
+import re
+import numpy as np
 import pandas as pd
 
+from src.data_processing.ingest import (
+    NUMERIC_DTYPES, SHEET_SCHEMAS, SHEETS, cast_numeric, load_raw_sheets, sheet_rows
+)
+from src.data_processing.intervals import to_epoch_ms
+from src.data_processing.numeric import normalize_numeric
+from src.data_processing.storage import write_table
+from src.pipeline.instrumentation import instrumented, record_read
 
-# Excel sheet mapping
-SHEETS = {
-    "downtime": "downtime_event_log",
-    "hourly": "hourly_operation_breakdown",
-    "daily": "daily_operation_summary",
-    "processed": "processed_hourly"
+
+# HH:MM[:SS[.fff]] anywhere in a string (also matches the clock part of
+# "YYYY-MM-DD HH:MM:SS" timestamps rendered as text)
+_CLOCK_PATTERN = r"(\d{1,2}):(\d{2})(?::(\d{2})(?:\.(\d{1,9}))?)?"
+
+# Canonical "HH:MM:SS[.fffffffff]" layout, decoded with byte arithmetic
+_CANONICAL_CLOCK_PATTERN = r"\d{2}:\d{2}:\d{2}(?:\.\d{1,9})?"
+_CANONICAL_CLOCK_WIDTH = 18  # "HH:MM:SS." + 9 fractional digits
+
+_ONE_DAY = pd.Timedelta(days=1)
+
+# Numeric columns per sheet (numeric dtypes of the ingest schema),
+# normalized before the cleanup (decimal commas, percent signs). The
+# event log has no numeric columns (downtime_time is not read).
+NUMERIC_COLUMNS = {
+    key: [col for col, dtype in SHEET_SCHEMAS[key].items() if dtype in NUMERIC_DTYPES]
+    for key in SHEETS
+    if any(dtype in NUMERIC_DTYPES for dtype in SHEET_SCHEMAS[key].values())
 }
 
 
-def _extract_clock(value):
-    if pd.isna(value):
-        return pd.NaT
+def _empty_offset(index) -> pd.Series:
+    return pd.Series(pd.NaT, index=index, dtype="timedelta64[ns]")
+
+
+def _fraction_to_offset(fractions: pd.Series) -> pd.Series:
+    # Excel stores time as fraction of a day; only the clock part is kept
+    return pd.to_timedelta(fractions.astype("float64"), unit="D") % _ONE_DAY
+
+
+def _time_objects_to_offset(times: pd.Series) -> pd.Series:
+    # datetime.time has no array representation, so read the fields once
+    # into an int64 buffer and convert the whole buffer in one go
+    micros = np.fromiter(
+        (
+            ((t.hour * 60 + t.minute) * 60 + t.second) * 1_000_000 + t.microsecond
+            for t in times.to_numpy()
+        ),
+        dtype=np.int64,
+        count=len(times),
+    )
+    return pd.Series(pd.to_timedelta(micros, unit="us"), index=times.index)
+
+
+def _canonical_strings_to_offset(texts: pd.Series) -> pd.Series:
+    # Pad every clock to "HH:MM:SS.fffffffff" and read the digits straight
+    # from a fixed-width byte buffer: no per-element parsing at all
+    padded = texts.where(texts.str.len() > 8, texts + ".").str.ljust(
+        _CANONICAL_CLOCK_WIDTH, "0"
+    )
+    digits = (
+        np.frombuffer(
+            np.array(padded.tolist(), dtype=f"S{_CANONICAL_CLOCK_WIDTH}").tobytes(),
+            dtype=np.uint8,
+        )
+        .reshape(-1, _CANONICAL_CLOCK_WIDTH)
+        .astype(np.int64)
+        - ord("0")
+    )
+
+    hours = digits[:, 0] * 10 + digits[:, 1]
+    minutes = digits[:, 3] * 10 + digits[:, 4]
+    seconds = digits[:, 6] * 10 + digits[:, 7]
+    nanos = digits[:, 9:] @ (10 ** np.arange(8, -1, -1, dtype=np.int64))
+
+    total_ns = ((hours * 60 + minutes) * 60 + seconds) * 1_000_000_000 + nanos
+    return pd.Series(pd.to_timedelta(total_ns, unit="ns"), index=texts.index)
+
+
+def _strings_to_offset(texts: pd.Series) -> pd.Series:
+    offset = _empty_offset(texts.index)
+    texts = texts.str.strip()
+
+    is_canonical = texts.str.fullmatch(_CANONICAL_CLOCK_PATTERN).fillna(False)
+    if is_canonical.any():
+        offset[is_canonical[is_canonical].index] = _canonical_strings_to_offset(
+            texts[is_canonical]
+        )
+
+    pending = texts[~is_canonical]
+    if pending.empty:
+        return offset
+
+    # numeric strings are Excel day fractions ("0.5")
+    fractions = pd.to_numeric(pending, errors="coerce")
+    is_fraction = fractions.notna()
+    if is_fraction.any():
+        offset[is_fraction[is_fraction].index] = _fraction_to_offset(fractions[is_fraction])
+
+    pending = pending[~is_fraction]
+    if pending.empty:
+        return offset
+
+    # Fallback: pull the clock out of free-form text (e.g. full timestamps)
+    parts = pending.str.extract(_CLOCK_PATTERN)
+    hours = pd.to_numeric(parts[0], errors="coerce")
+    minutes = pd.to_numeric(parts[1], errors="coerce")
+    seconds = pd.to_numeric(parts[2], errors="coerce").fillna(0)
+    # fractional digits -> nanoseconds ("777" -> 777_000_000)
+    nanos = pd.to_numeric(parts[3].str.ljust(9, "0"), errors="coerce").fillna(0)
+
+    valid = hours.notna() & minutes.notna()
+    total_ns = (((hours * 60 + minutes) * 60 + seconds) * 1_000_000_000 + nanos)[valid]
+    offset[total_ns.index] = pd.to_timedelta(total_ns.astype("int64"), unit="ns")
+
+    return offset
+
+
+def _clock_to_offset(values: pd.Series) -> pd.Series:
+    """
+    Vectorized clock parsing.
+
+    Converts a column of clock values into a timedelta offset since
+    midnight. Accepted shapes (also mixed within one object column):
+    - Excel serial floats (fraction of a day), numeric or as strings
+    - datetime.time objects
+    - pandas Timestamps / datetimes (only the clock part is kept)
+    - clock strings such as "11:58:03.777"
+    Anything else becomes NaT.
+    """
+    # Native dtypes: no per-element dispatch needed
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values - values.dt.normalize()
+
+    if pd.api.types.is_timedelta64_dtype(values):
+        return values % _ONE_DAY
+
+    if pd.api.types.is_bool_dtype(values):
+        return _empty_offset(values.index)
+
+    if pd.api.types.is_numeric_dtype(values):
+        return _fraction_to_offset(values)
+
+    if pd.api.types.is_string_dtype(values) and not pd.api.types.is_object_dtype(values):
+        return _strings_to_offset(values.dropna()).reindex(values.index)
+
+    # Object columns: split once by element type, convert each group as a block
+    offset = _empty_offset(values.index)
+    present = values.dropna()
+    kinds = present.map(type)
+
+    # classify each distinct type once, then broadcast the flags
+    distinct = kinds.unique()
+    is_time = kinds == datetime.time
+    is_datetime = kinds.map({k: issubclass(k, datetime.datetime) for k in distinct})
+    is_number = kinds.map({
+        k: issubclass(k, (int, float, np.number)) and not issubclass(k, (bool, np.bool_))
+        for k in distinct
+    })
+    is_string = kinds.map({k: issubclass(k, str) for k in distinct})
+
+    if is_time.any():
+        offset[is_time[is_time].index] = _time_objects_to_offset(present[is_time])
+
+    if is_datetime.any():
+        stamps = pd.to_datetime(present[is_datetime], errors="coerce")
+        offset[stamps.index] = stamps - stamps.dt.normalize()
+
+    if is_number.any():
+        offset[is_number[is_number].index] = _fraction_to_offset(present[is_number])
+
+    if is_string.any():
+        offset[is_string[is_string].index] = _strings_to_offset(
+            present[is_string].astype(str)
+        )
+
+    return offset
+
+
+def _round_ns_to_ms(ns: int) -> int:
+    # half to even, as Series.dt.round("ms") in to_epoch_ms
+    ms, rest = divmod(ns, 1_000_000)
+    if rest > 500_000 or (rest == 500_000 and ms % 2):
+        ms += 1
+    return ms
+
+
+def clock_to_ms(value):
+    """
+    Scalar clock parsing (one value at a time, e.g. while streaming).
+
+    Same rules as _clock_to_offset: day fractions (numbers or numeric
+    strings), datetime.time objects, Timestamps / datetimes (clock part),
+    timedeltas (modulo one day) and text holding HH:MM[:SS[.fff]].
+    Returns milliseconds since midnight rounded as to_epoch_ms does, or
+    None where the vectorized path gives NaT.
+    """
+    if value is None or isinstance(value, (bool, np.bool_)) or pd.isna(value):
+        return None
 
-    # If already pandas Timestamp
-    if isinstance(value, pd.Timestamp):
-        return value.time()
+    if isinstance(value, datetime.datetime):
+        value = pd.Timestamp(value)
+        ns = (value - value.normalize()).value
+    elif isinstance(value, datetime.time):
+        ns = (((value.hour * 60 + value.minute) * 60 + value.second) * 1_000_000 + value.microsecond) * 1_000
+    elif isinstance(value, (datetime.timedelta, np.timedelta64)):
+        ns = (pd.Timedelta(value) % _ONE_DAY).value
+    elif isinstance(value, (int, float, np.number)):
+        ns = _fraction_ns(value)
+    else:
+        ns = _text_ns(str(value).strip())
 
-    # If already datetime.time
-    if hasattr(value, "hour") and hasattr(value, "minute"):
-        return value
+    return None if ns is None else _round_ns_to_ms(ns)
 
-    # Excel serial float (fraction of day)
-    try:
-        # Excel stores time as fraction of a day
-        td = pd.to_timedelta(float(value), unit="D")
-        return (pd.Timestamp("1970-01-01") + td).time()
-    except Exception:
-        return pd.NaT
 
+def _fraction_ns(fraction) -> int:
+    offset = pd.Timedelta(float(fraction), unit="D") % _ONE_DAY
+    return None if pd.isna(offset) else offset.value
 
-def prepare_data(raw_excel_path: str, cleaned_dir: str):
+
+def _text_ns(text: str):
+    if re.fullmatch(_CANONICAL_CLOCK_PATTERN, text) is None:
+        try:
+            return _fraction_ns(float(text))
+        except (ValueError, OverflowError):
+            pass
+
+    match = re.search(_CLOCK_PATTERN, text)
+    if match is None:
+        return None
+
+    hours, minutes, seconds, fraction = match.groups()
+    nanos = int((fraction or "0").ljust(9, "0"))
+    return ((int(hours) * 60 + int(minutes)) * 60 + int(seconds or 0)) * 1_000_000_000 + nanos
+
+
+def _combine_date_clock(dates: pd.Series, clock_offset: pd.Series) -> pd.Series:
+    """
+    Vectorized date + clock -> timestamp (NaT if either side is missing).
+    """
+    return dates.dt.normalize() + clock_offset
+
+
+@instrumented
+def prepare_data(
+    raw_excel_path: str,
+    cleaned_dir: str,
+    cache_dir: str = None,
+    storage_format: str = "csv",
+    csv_export: bool = False,
+    context=None,
+    raw_sheets: dict = None
+):
 
     os.makedirs(cleaned_dir, exist_ok=True)
 
-    # Output paths
-    cleaned_paths = {
-        "downtime": os.path.join(cleaned_dir, "downtime_cleaned.csv"),
-        "hourly": os.path.join(cleaned_dir, "hourly_cleaned.csv"),
-        "daily": os.path.join(cleaned_dir, "daily_cleaned.csv"),
-        "processed": os.path.join(cleaned_dir, "processed_hourly_cleaned.csv"),
+    # Output table names
+    cleaned_tables = {
+        "downtime": "downtime_cleaned",
+        "hourly": "hourly_cleaned",
+        "daily": "daily_cleaned",
+        "processed": "processed_hourly_cleaned",
     }
 
     # -----------------------------
     # Load raw sheets
     # -----------------------------
-    downtime_df = pd.read_excel(raw_excel_path, sheet_name=SHEETS["downtime"])
-    hourly_df = pd.read_excel(raw_excel_path, sheet_name=SHEETS["hourly"])
-    daily_df = pd.read_excel(raw_excel_path, sheet_name=SHEETS["daily"])
-    processed_df = pd.read_excel(raw_excel_path, sheet_name=SHEETS["processed"])
+    # single workbook open, pruned columns, snapshot cache when cache_dir is set;
+    # raw_sheets (e.g. generated by src/data_processing/synthetic.py) skips
+    # the workbook, the frames are modified in place
+    if raw_sheets is not None:
+        raw = raw_sheets
+        record_read(sheet_rows(raw))
+    else:
+        raw = load_raw_sheets(raw_excel_path, cache_dir=cache_dir)
+
+    downtime_df = raw["downtime"]
+    hourly_df = raw["hourly"]
+    daily_df = raw["daily"]
+    processed_df = raw["processed"]
+
+    # -----------------------------
+    # Numeric columns
+    # -----------------------------
+    # columns read as numbers pass through untouched; text cells are
+    # parsed in place, unreadable ones become NaN and are reported
+    # (numeric_parse_report); then every column gets its schema dtype
+    for key, columns in NUMERIC_COLUMNS.items():
+        unparsed = normalize_numeric(raw[key], columns, SHEETS[key])
+        for col, rows in unparsed.items():
+            if rows:
+                print(f"{SHEETS[key]}.{col}: {rows} value(s) could not be parsed as numbers")
+        cast_numeric(raw[key], key)
 
     # =========================================================
     # processed_hourly — timestamp generation
@@ -58,14 +302,6 @@ def prepare_data(raw_excel_path: str, cleaned_dir: str):
 
     processed_df["date"] = pd.to_datetime(processed_df["date"], errors="coerce")
 
-    # Safer conversion
-    processed_df["hour_start"] = pd.to_numeric(
-        processed_df["hour_start"], errors="coerce"
-    )
-    processed_df["hour_end"] = pd.to_numeric(
-        processed_df["hour_end"], errors="coerce"
-    )
-
     processed_df["timestamp_start"] = (
         processed_df["date"] +
         pd.to_timedelta(processed_df["hour_start"], unit="h")
@@ -89,35 +325,25 @@ def prepare_data(raw_excel_path: str, cleaned_dir: str):
 
     daily_df["date"] = pd.to_datetime(daily_df["date"], errors="coerce")
 
-    daily_df["start_clock"] = daily_df["production_start_time"].apply(_extract_clock)
-    daily_df["end_clock"] = daily_df["production_end_time"].apply(_extract_clock)
+    start_offset = _clock_to_offset(daily_df["production_start_time"])
+    end_offset = _clock_to_offset(daily_df["production_end_time"])
 
-    daily_df["production_start_ts"] = daily_df.apply(
-        lambda row: (
-            pd.Timestamp.combine(row["date"], row["start_clock"])
-            if pd.notna(row["date"]) and pd.notna(row["start_clock"])
-            else pd.NaT
-        ),
-        axis=1
-    )
+    # clock columns keep the normalized offset (timedelta64[ms] once stored)
+    daily_df["production_start_time"] = start_offset
+    daily_df["production_end_time"] = end_offset
 
-    daily_df["production_end_ts"] = daily_df.apply(
-        lambda row: (
-            pd.Timestamp.combine(row["date"], row["end_clock"])
-            if pd.notna(row["date"]) and pd.notna(row["end_clock"])
-            else pd.NaT
-        ),
-        axis=1
-    )
+    daily_df["production_start_ts"] = _combine_date_clock(daily_df["date"], start_offset)
+    daily_df["production_end_ts"] = _combine_date_clock(daily_df["date"], end_offset)
 
-    daily_df["production_start_ts"] = daily_df["production_start_ts"].dt.floor("s")
-    daily_df["production_end_ts"] = daily_df["production_end_ts"].dt.floor("s")
+    # millisecond precision (the clocks carry milliseconds)
+    daily_df["production_start_ts"] = daily_df["production_start_ts"].dt.round("ms")
+    daily_df["production_end_ts"] = daily_df["production_end_ts"].dt.round("ms")
 
     print("daily_operation_summary timestamps preview:")
     print(
         daily_df[
-            ["date", "start_clock", "production_start_ts",
-             "end_clock", "production_end_ts"]
+            ["date", "production_start_time", "production_start_ts",
+             "production_end_time", "production_end_ts"]
         ].head()
     )
     # =========================================================
@@ -127,31 +353,22 @@ def prepare_data(raw_excel_path: str, cleaned_dir: str):
     #date->datetime
     downtime_df["date"] = pd.to_datetime(downtime_df["date"], errors="coerce")
 
-    #start/ende clock normalize
-    downtime_df["start_clock"] = downtime_df["downtime_start_time"].apply(_extract_clock)
-    downtime_df["end_clock"] = downtime_df["downtime_end_time"].apply(_extract_clock)
+    #start/ende clock normalize (vectorized)
+    start_offset = _clock_to_offset(downtime_df["downtime_start_time"])
+    end_offset = _clock_to_offset(downtime_df["downtime_end_time"])
 
-    #combine date + clock + timestamp
-    downtime_df["downtime_start_ts"] = downtime_df.apply(
-        lambda row: (
-            pd.Timestamp.combine(row["date"], row["start_clock"])
-            if pd.notna(row["date"]) and pd.notna(row["start_clock"])
-            else pd.NaT
-        ),
-        axis=1
-    )
+    downtime_df["downtime_start_time"] = start_offset
+    downtime_df["downtime_end_time"] = end_offset
 
-    downtime_df["downtime_end_ts"] = downtime_df.apply(
-        lambda row: (
-            pd.Timestamp.combine(row["date"], row["end_clock"])
-            if pd.notna(row["date"]) and pd.notna(row["end_clock"])
-            else pd.NaT
-        ),
-        axis=1
-    )
-    # floor to seconds (drop milliseconds)
-    downtime_df["downtime_start_ts"] = downtime_df["downtime_start_ts"].dt.floor("s")
-    downtime_df["downtime_end_ts"] = downtime_df["downtime_end_ts"].dt.floor("s")
+    #combine date + clock → event boundaries as int64 epoch milliseconds;
+    #features compute on these, the *_ts columns are their datetime views
+    start_ts = _combine_date_clock(downtime_df["date"], start_offset)
+    end_ts = _combine_date_clock(downtime_df["date"], end_offset)
+
+    downtime_df["downtime_start_ms"] = to_epoch_ms(start_ts)
+    downtime_df["downtime_end_ms"] = to_epoch_ms(end_ts)
+    downtime_df["downtime_start_ts"] = start_ts.dt.round("ms")
+    downtime_df["downtime_end_ts"] = end_ts.dt.round("ms")
 
     print("downtime_event_log timestamps preview:")
     print(
@@ -172,10 +389,6 @@ def prepare_data(raw_excel_path: str, cleaned_dir: str):
     # date → datetime
     hourly_df["date"] = pd.to_datetime(hourly_df["date"], errors="coerce")
 
-    # hour_start / hour_end → numeric
-    hourly_df["hour_start"] = pd.to_numeric(hourly_df["hour_start"], errors="coerce")
-    hourly_df["hour_end"] = pd.to_numeric(hourly_df["hour_end"], errors="coerce")
-
     # combine date + hour → timestamps
     hourly_df["timestamp_start"] = (
             hourly_df["date"] + pd.to_timedelta(hourly_df["hour_start"], unit="h")
@@ -188,32 +401,6 @@ def prepare_data(raw_excel_path: str, cleaned_dir: str):
     hourly_df["timestamp_start"] = hourly_df["timestamp_start"].dt.floor("s")
     hourly_df["timestamp_end"] = hourly_df["timestamp_end"].dt.floor("s")
 
-    # ---- numeric cleanup (decimal comma → dot)
-    numeric_cols = [
-        "monitored_time",
-        "operation_time",
-        "downtime",
-    ]
-
-    for col in numeric_cols:
-        if col in hourly_df.columns:
-            hourly_df[col] = (
-                hourly_df[col]
-                .astype(str)
-                .str.replace(",", ".", regex=False)
-            )
-            hourly_df[col] = pd.to_numeric(hourly_df[col], errors="coerce")
-
-
-    if "efficiency" in hourly_df.columns:
-        hourly_df["efficiency"] = (
-            hourly_df["efficiency"]
-            .astype(str)
-            .str.replace("%", "", regex=False)
-            .str.replace(",", ".", regex=False)
-        )
-        hourly_df["efficiency"] = pd.to_numeric(hourly_df["efficiency"], errors="coerce")
-
     print("hourly_operation_breakdown timestamps preview:")
     print(
         hourly_df[
@@ -224,9 +411,21 @@ def prepare_data(raw_excel_path: str, cleaned_dir: str):
     # -----------------------------
     # Save cleaned files
     # -----------------------------
-    downtime_df.to_csv(cleaned_paths["downtime"], index=False)
-    hourly_df.to_csv(cleaned_paths["hourly"], index=False)
-    daily_df.to_csv(cleaned_paths["daily"], index=False)
-    processed_df.to_csv(cleaned_paths["processed"], index=False)
+    cleaned_frames = {
+        "downtime": downtime_df,
+        "hourly": hourly_df,
+        "daily": daily_df,
+        "processed": processed_df,
+    }
+
+    for key, df in cleaned_frames.items():
+        write_table(
+            df,
+            cleaned_dir,
+            cleaned_tables[key],
+            storage_format=storage_format,
+            csv_export=csv_export,
+            context=context
+        )
 
     print("Data preparation completed.")
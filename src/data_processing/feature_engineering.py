@@ -1,79 +1,191 @@
+import json
 import os
+import numpy as np
 import pandas as pd
 
+from src.data_processing.ingest import PARTITION_KEYS
+from src.data_processing.intervals import from_epoch_ms, hour_of_day, seconds_per_hour, weekday
+from src.data_processing.storage import read_table, write_table
+from src.pipeline.instrumentation import instrumented
+from src.pipeline.partitions import partition_map
+from src.pipeline.scheduler import DagNode, run_dag
 
-# =========================================================
-# EVENT-LEVEL FEATURES
-# =========================================================
-def build_downtime_features(cleaned_dir: str, featured_dir: str):
-    os.makedirs(featured_dir, exist_ok=True)
 
-    input_path = os.path.join(cleaned_dir, "downtime_cleaned.csv")
-    output_path = os.path.join(featured_dir, "downtime_features.csv")
+"""
+Feature engineering on the cleaned tables.
 
-    df = pd.read_csv(
-        input_path,
-        parse_dates=["date", "downtime_start_ts", "downtime_end_ts"]
-    )
-
-    df = df.sort_values("downtime_start_ts").reset_index(drop=True)
+Every table is partitioned by PARTITION_KEYS (plant_id, line_id): event
+gaps, the daily rolling window and all merges / groupings stay within a
+partition. The builders compute the partitions in parallel
+(src/pipeline/partitions.py).
+"""
 
-    df["downtime_duration_sec"] = (
-        df["downtime_end_ts"] - df["downtime_start_ts"]
-    ).dt.total_seconds()
 
-    df["downtime_hour"] = df["downtime_start_ts"].dt.hour
-    df["downtime_weekday"] = df["downtime_start_ts"].dt.dayofweek
+# Events starting less than this many seconds after the previous
+# event ended are flagged as bursts
+BURST_GAP_SEC = 300
 
-    df["prev_downtime_end_ts"] = df["downtime_end_ts"].shift(1)
+# Window (in production days) of efficiency_rolling_std
+ROLLING_WINDOW_DAYS = 5
 
-    df["gap_from_prev_sec"] = (
-        df["downtime_start_ts"] - df["prev_downtime_end_ts"]
-    ).dt.total_seconds()
+# (partition, date) pairs already turned into features, per cleaned table
+# (incremental mode)
+STATE_FILE = "feature_state.json"
+STATE_VERSION = 3
 
-    df["recovery_time_sec"] = df["gap_from_prev_sec"]
+# Row order of the featured tables, shared by full and incremental runs
+# (stable sort: rows with equal keys keep the order of the cleaned sheet)
+ROW_ORDER = {
+    "downtime_features": PARTITION_KEYS + ["downtime_start_ms"],
+    "hourly_features": PARTITION_KEYS + ["timestamp_start"],
+    "daily_features": PARTITION_KEYS + ["date"],
+    "event_hour_reconciliation": PARTITION_KEYS + ["timestamp_start"],
+    "hour_day_reconciliation": PARTITION_KEYS + ["date"],
+}
 
-    df["is_burst"] = (df["gap_from_prev_sec"] < 300).astype("boolean")
+CLEANED_TABLES = {
+    "downtime": "downtime_cleaned",
+    "hourly": "hourly_cleaned",
+    "daily": "daily_cleaned",
+    "processed": "processed_hourly_cleaned",
+}
 
-    df.loc[
-        df.index == 0,
-        ["gap_from_prev_sec", "recovery_time_sec", "is_burst"]
-    ] = pd.NA
 
-    df.to_csv(output_path, index=False)
-    print("downtime_features.csv created")
+def _in_row_order(df: pd.DataFrame, name: str) -> pd.DataFrame:
+    return df.sort_values(ROW_ORDER[name], kind="stable", ignore_index=True)
 
 
 # =========================================================
-# HOURLY FEATURES
+# EVENT-LEVEL FEATURES
 # =========================================================
-def build_hourly_features(cleaned_dir: str, featured_dir: str):
+def is_burst_gap(gap_sec):
+    """
+    Burst flag of events starting gap_sec after the previous event ended
+    (arrays or scalars; a NaN gap is no burst).
+    """
+    return gap_sec < BURST_GAP_SEC
+
+
+def _compute_downtime_features(df: pd.DataFrame, prev_downtime_end_ms: dict = None):
+    """
+    Gaps are measured between consecutive events of the same partition.
+    prev_downtime_end_ms maps a partition (tuple of PARTITION_KEYS values)
+    to its last already featured event end (epoch ms); it seeds the gap of
+    the partition's first event when the frame continues an event log
+    (incremental mode).
+
+    All arithmetic runs on the int64 epoch-ms boundaries; missing
+    boundaries are tracked as masks and the datetime view
+    (prev_downtime_end_ts) is produced at the end.
+    """
+    df = df.sort_values(
+        PARTITION_KEYS + ["downtime_start_ms"], kind="stable"
+    ).reset_index(drop=True)
+
+    start_missing = df["downtime_start_ms"].isna().to_numpy()
+    end_missing = df["downtime_end_ms"].isna().to_numpy()
+    start = df["downtime_start_ms"].to_numpy(dtype="int64", na_value=0)
+    end = df["downtime_end_ms"].to_numpy(dtype="int64", na_value=0)
+
+    df["downtime_duration_sec"] = np.where(
+        start_missing | end_missing, np.nan, (end - start) / 1e3
+    )
+
+    df["downtime_hour"] = pd.Series(hour_of_day(start)).mask(start_missing)
+    df["downtime_weekday"] = pd.Series(weekday(start)).mask(start_missing)
+
+    # previous event end of the same partition; the first event of each
+    # partition has no predecessor unless seeded
+    first = ~df.duplicated(PARTITION_KEYS).to_numpy()
+    prev_end = np.roll(end, 1)
+    prev_missing = np.roll(end_missing, 1) | first
+    seeded = np.zeros(len(df), dtype=bool)
+
+    if prev_downtime_end_ms and len(df):
+        first_rows = np.flatnonzero(first)
+        seeds = [
+            prev_downtime_end_ms.get(part)
+            for part in df.loc[first_rows, PARTITION_KEYS].itertuples(index=False, name=None)
+        ]
+        has_seed = np.array([seed is not None and not pd.isna(seed) for seed in seeds])
+        prev_end[first_rows[has_seed]] = [int(seed) for seed, ok in zip(seeds, has_seed) if ok]
+        prev_missing[first_rows[has_seed]] = False
+        seeded[first_rows[has_seed]] = True
+
+    df["prev_downtime_end_ts"] = from_epoch_ms(prev_end, prev_missing)
+
+    gap = np.where(start_missing | prev_missing, np.nan, (start - prev_end) / 1e3)
+
+    df["gap_from_prev_sec"] = gap
+    df["recovery_time_sec"] = gap
+
+    # a missing gap is no burst, except for an unseeded first event (NA)
+    is_burst = pd.array(is_burst_gap(gap), dtype="boolean")
+    is_burst[first & ~seeded] = pd.NA
+    df["is_burst"] = is_burst
+
+    return df
+
+
+@instrumented
+def build_downtime_features(
+    cleaned_dir: str,
+    featured_dir: str,
+    storage_format: str = "csv",
+    csv_export: bool = False,
+    context=None,
+    max_workers: int = None
+):
     os.makedirs(featured_dir, exist_ok=True)
 
-    hourly_path = os.path.join(cleaned_dir, "hourly_cleaned.csv")
-    processed_path = os.path.join(cleaned_dir, "processed_hourly_cleaned.csv")
-    output_path = os.path.join(featured_dir, "hourly_features.csv")
+    df = read_table(cleaned_dir, "downtime_cleaned", context=context)
+    df = partition_map(
+        _compute_downtime_features, {"df": df}, PARTITION_KEYS,
+        max_workers=max_workers
+    )
 
-    hourly_df = pd.read_csv(
-        hourly_path,
-        parse_dates=["date", "timestamp_start", "timestamp_end"]
+    write_table(
+        _in_row_order(df, "downtime_features"), featured_dir, "downtime_features",
+        storage_format, csv_export, context=context
     )
+    print("downtime_features created")
+
 
-    processed_df = pd.read_csv(
-        processed_path,
-        parse_dates=["date", "timestamp_start", "timestamp_end"]
+# =========================================================
+# HOURLY FEATURES
+# =========================================================
+# Per-hour definitions, shared with the streaming processor
+# (src/streaming/processor.py); arrays or scalars
+def downtime_ratio(downtime_h, monitored_time_h):
+    # Downtime ratio expresses the share of the monitored hour lost to
+    # downtime (NaN without monitored time)
+    downtime_h = np.asarray(downtime_h, dtype="float64")
+    monitored_time_h = np.asarray(monitored_time_h, dtype="float64")
+    return np.divide(
+        downtime_h, monitored_time_h,
+        out=np.full(np.broadcast(downtime_h, monitored_time_h).shape, np.nan),
+        where=monitored_time_h > 0,
     )
 
-    # Downtime ratio expresses the share of the monitored hour lost to downtime
-    hourly_df["downtime_ratio"] = (
-            hourly_df["downtime_h"] / hourly_df["monitored_time_h"]
-    ).where(hourly_df["monitored_time_h"] > 0)
 
+def efficiency_loss(efficiency):
     # Efficiency loss complements downtime_ratio by highlighting
     # how much productive capacity was lost within the hour
-    hourly_df["efficiency_loss"] = 1 - hourly_df["efficiency"]
+    return 1 - efficiency
+
 
-    hourly_df["zero_operation_flag"] = hourly_df["operation_time_h"] == 0
+def zero_operation(operation_time_h):
+    return operation_time_h == 0
+
+
+def _compute_hourly_features(hourly_df: pd.DataFrame, processed_df: pd.DataFrame):
+
+    hourly_df["downtime_ratio"] = downtime_ratio(
+        hourly_df["downtime_h"].to_numpy("float64"),
+        hourly_df["monitored_time_h"].to_numpy("float64"),
+    )
+    hourly_df["efficiency_loss"] = efficiency_loss(hourly_df["efficiency"])
+    hourly_df["zero_operation_flag"] = zero_operation(hourly_df["operation_time_h"])
 
 
     # Throughput (processed_hourly_cleaned)
@@ -88,29 +200,57 @@ def build_hourly_features(cleaned_dir: str, featured_dir: str):
 
     hourly_df = hourly_df.merge(
         processed_df[
-            ["timestamp_start", "throughput_per_hour", "production_gallons"]
+            PARTITION_KEYS
+            + ["timestamp_start", "throughput_per_hour", "production_gallons"]
         ],
-        on="timestamp_start",
+        on=PARTITION_KEYS + ["timestamp_start"],
         how="left"
     )
 
     hourly_df["hour"] = hourly_df["timestamp_start"].dt.hour
     hourly_df["weekday"] = hourly_df["timestamp_start"].dt.dayofweek
 
-    hourly_df.to_csv(output_path, index=False)
-    print("hourly_features.csv created")
+    return hourly_df
 
 
-# =========================================================
-# DAILY FEATURES
-# =========================================================
-def build_daily_features(cleaned_dir: str, featured_dir: str):
+@instrumented
+def build_hourly_features(
+    cleaned_dir: str,
+    featured_dir: str,
+    storage_format: str = "csv",
+    csv_export: bool = False,
+    context=None,
+    max_workers: int = None
+):
     os.makedirs(featured_dir, exist_ok=True)
 
-    input_path = os.path.join(cleaned_dir, "daily_cleaned.csv")
-    output_path = os.path.join(featured_dir, "daily_features.csv")
+    hourly_df = read_table(cleaned_dir, "hourly_cleaned", context=context)
+    processed_df = read_table(cleaned_dir, "processed_hourly_cleaned", context=context)
+
+    hourly_df = partition_map(
+        _compute_hourly_features,
+        {"hourly_df": hourly_df, "processed_df": processed_df},
+        PARTITION_KEYS,
+        max_workers=max_workers
+    )
+
+    write_table(
+        _in_row_order(hourly_df, "hourly_features"), featured_dir, "hourly_features",
+        storage_format, csv_export, context=context
+    )
+    print("hourly_features created")
 
-    df = pd.read_csv(input_path, parse_dates=["date"])
+
+# =========================================================
+# DAILY FEATURES
+# =========================================================
+def _compute_daily_features(df: pd.DataFrame, efficiency_history: pd.DataFrame = None):
+    """
+    The rolling window runs over the production days of each partition.
+    efficiency_history (PARTITION_KEYS + efficiency) holds the days right
+    before df per partition (oldest first); it warms up the rolling window
+    when df continues already featured days (incremental mode).
+    """
 
     # ---------------------------------------------------------
     # Pause ratio represents the proportion of non-operational time.
@@ -128,50 +268,68 @@ def build_daily_features(cleaned_dir: str, featured_dir: str):
         df["operation_time_dec"] - df["pause_time_dec"]
     )
 
-    df = df.sort_values("date").reset_index(drop=True)
-    df["efficiency_rolling_std"] = (
-        df["efficiency"].rolling(window=5).std()
+    df = df.sort_values(PARTITION_KEYS + ["date"], kind="stable").reset_index(drop=True)
+
+    efficiency = df[PARTITION_KEYS + ["efficiency"]].assign(_warmup=False)
+    if efficiency_history is not None and len(efficiency_history):
+        efficiency = pd.concat(
+            [
+                efficiency_history[PARTITION_KEYS + ["efficiency"]].assign(_warmup=True),
+                efficiency
+            ],
+            ignore_index=True
+        )
+
+    rolling_std = (
+        efficiency
+        .groupby(PARTITION_KEYS, observed=True, sort=False)["efficiency"]
+        .rolling(window=ROLLING_WINDOW_DAYS).std()
+        .reset_index(level=list(range(len(PARTITION_KEYS))), drop=True)
+        .reindex(efficiency.index)
     )
 
-    df.to_csv(output_path, index=False)
-    print("daily_features.csv created")
+    df["efficiency_rolling_std"] = rolling_std[~efficiency["_warmup"]].to_numpy()
 
+    return df
 
-# =========================================================
-# EVENT → HOUR RECONCILIATION
-# =========================================================
-def build_event_hour_reconciliation(cleaned_dir: str, featured_dir: str):
-    os.makedirs(featured_dir, exist_ok=True)
 
-    downtime_path = os.path.join(cleaned_dir, "downtime_cleaned.csv")
-    hourly_path = os.path.join(cleaned_dir, "hourly_cleaned.csv")
-    output_path = os.path.join(featured_dir, "event_hour_reconciliation.csv")
+@instrumented
+def build_daily_features(
+    cleaned_dir: str,
+    featured_dir: str,
+    storage_format: str = "csv",
+    csv_export: bool = False,
+    context=None,
+    max_workers: int = None
+):
+    os.makedirs(featured_dir, exist_ok=True)
 
-    downtime_df = pd.read_csv(
-        downtime_path,
-        parse_dates=["downtime_start_ts", "downtime_end_ts"]
+    df = read_table(cleaned_dir, "daily_cleaned", context=context)
+    df = partition_map(
+        _compute_daily_features, {"df": df}, PARTITION_KEYS,
+        max_workers=max_workers
     )
 
-    hourly_df = pd.read_csv(
-        hourly_path,
-        parse_dates=["timestamp_start"]
+    write_table(
+        _in_row_order(df, "daily_features"), featured_dir, "daily_features",
+        storage_format, csv_export, context=context
     )
+    print("daily_features created")
 
-    downtime_df["hour_bucket"] = downtime_df["downtime_start_ts"].dt.floor("h")
 
-    event_hourly = (
-        downtime_df
-        .assign(duration_sec=lambda x: (
-            x["downtime_end_ts"] - x["downtime_start_ts"]
-        ).dt.total_seconds())
-        .groupby("hour_bucket", as_index=False)["duration_sec"]
-        .sum()
-        .rename(columns={"hour_bucket": "timestamp_start"})
+# =========================================================
+# EVENT → HOUR RECONCILIATION
+# =========================================================
+def _compute_event_hour_reconciliation(downtime_df: pd.DataFrame, hourly_df: pd.DataFrame):
+
+    # each event's seconds are split across every hour bucket it overlaps
+    event_hourly = seconds_per_hour(
+        downtime_df, "downtime_start_ms", "downtime_end_ms", by=PARTITION_KEYS
     )
 
     merged = hourly_df.merge(
         event_hourly,
-        on="timestamp_start",
+        on=PARTITION_KEYS + ["timestamp_start"],
         how="left"
     )
 
@@ -182,26 +340,45 @@ def build_event_hour_reconciliation(cleaned_dir: str, featured_dir: str):
         merged["hourly_downtime_sec"] - merged["duration_sec"]
     )
 
-    merged.to_csv(output_path, index=False)
-    print("event_hour_reconciliation.csv created")
+    return merged
 
 
-# =========================================================
-# HOUR → DAY RECONCILIATION
-# =========================================================
-def build_hour_day_reconciliation(cleaned_dir: str, featured_dir: str):
+@instrumented
+def build_event_hour_reconciliation(
+    cleaned_dir: str,
+    featured_dir: str,
+    storage_format: str = "csv",
+    csv_export: bool = False,
+    context=None,
+    max_workers: int = None
+):
     os.makedirs(featured_dir, exist_ok=True)
 
-    hourly_path = os.path.join(cleaned_dir, "hourly_cleaned.csv")
-    daily_path = os.path.join(cleaned_dir, "daily_cleaned.csv")
-    output_path = os.path.join(featured_dir, "hour_day_reconciliation.csv")
+    downtime_df = read_table(cleaned_dir, "downtime_cleaned", context=context)
+    hourly_df = read_table(cleaned_dir, "hourly_cleaned", context=context)
 
-    hourly_df = pd.read_csv(hourly_path, parse_dates=["date"])
-    daily_df = pd.read_csv(daily_path, parse_dates=["date"])
+    merged = partition_map(
+        _compute_event_hour_reconciliation,
+        {"downtime_df": downtime_df, "hourly_df": hourly_df},
+        PARTITION_KEYS,
+        max_workers=max_workers
+    )
+
+    write_table(
+        _in_row_order(merged, "event_hour_reconciliation"), featured_dir, "event_hour_reconciliation",
+        storage_format, csv_export, context=context
+    )
+    print("event_hour_reconciliation created")
+
+
+# =========================================================
+# HOUR → DAY RECONCILIATION
+# =========================================================
+def _compute_hour_day_reconciliation(hourly_df: pd.DataFrame, daily_df: pd.DataFrame):
 
     hourly_daily = (
         hourly_df
-        .groupby("date", as_index=False)
+        .groupby(PARTITION_KEYS + ["date"], as_index=False, observed=True)
         .agg(
             hourly_downtime_sum=("downtime_h", "sum"),
             hourly_operation_sum=("operation_time_h", "sum"),
@@ -209,26 +386,382 @@ def build_hour_day_reconciliation(cleaned_dir: str, featured_dir: str):
         )
     )
 
-    merged = daily_df.merge(hourly_daily, on="date", how="left")
+    merged = daily_df.merge(hourly_daily, on=PARTITION_KEYS + ["date"], how="left")
 
     merged["hour_vs_day_efficiency_diff"] = (
         merged["efficiency"] - merged["hourly_efficiency_mean"]
     )
 
-    merged.to_csv(output_path, index=False)
-    print("hour_day_reconciliation.csv created")
+    return merged
+
+
+@instrumented
+def build_hour_day_reconciliation(
+    cleaned_dir: str,
+    featured_dir: str,
+    storage_format: str = "csv",
+    csv_export: bool = False,
+    context=None,
+    max_workers: int = None
+):
+    os.makedirs(featured_dir, exist_ok=True)
+
+    hourly_df = read_table(cleaned_dir, "hourly_cleaned", context=context)
+    daily_df = read_table(cleaned_dir, "daily_cleaned", context=context)
+
+    merged = partition_map(
+        _compute_hour_day_reconciliation,
+        {"hourly_df": hourly_df, "daily_df": daily_df},
+        PARTITION_KEYS,
+        max_workers=max_workers
+    )
+
+    write_table(
+        _in_row_order(merged, "hour_day_reconciliation"), featured_dir, "hour_day_reconciliation",
+        storage_format, csv_export, context=context
+    )
+    print("hour_day_reconciliation created")
+
+
+# Independent builders: each one only reads cleaned tables
+FEATURE_BUILDERS = [
+    build_downtime_features,
+    build_hourly_features,
+    build_daily_features,
+    build_event_hour_reconciliation,
+    build_hour_day_reconciliation,
+]
+
+
+# =========================================================
+# INCREMENTAL STATE
+# =========================================================
+def _partition_dates(df: pd.DataFrame) -> set:
+    """
+    (plant_id, line_id, "YYYY-MM-DD") of every row with a date.
+    """
+    cells = df[PARTITION_KEYS + ["date"]].dropna(subset=["date"]).drop_duplicates()
+    return set(zip(
+        *(cells[col].astype(str) for col in PARTITION_KEYS),
+        cells["date"].dt.strftime("%Y-%m-%d")
+    ))
+
+
+def _write_state(featured_dir: str, cleaned: dict, context=None):
+    if context is not None and not context.persist:
+        return
+
+    state = {
+        "version": STATE_VERSION,
+        "partition_keys": PARTITION_KEYS,
+        "tables": {
+            key: sorted(_partition_dates(df)) for key, df in cleaned.items()
+        },
+    }
+
+    with open(os.path.join(featured_dir, STATE_FILE), "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+
+
+def _read_state(featured_dir: str):
+    path = os.path.join(featured_dir, STATE_FILE)
+    if not os.path.exists(path):
+        return None
+
+    with open(path, encoding="utf-8") as f:
+        state = json.load(f)
+
+    # states of older layouts / other partition keys cannot be trusted
+    if (
+        not isinstance(state, dict)
+        or state.get("version") != STATE_VERSION
+        or state.get("partition_keys") != PARTITION_KEYS
+    ):
+        return None
+
+    return {
+        key: {tuple(cell) for cell in cells}
+        for key, cells in state["tables"].items()
+    }
+
+
+def _in_dates(df: pd.DataFrame, cells: set) -> pd.Series:
+    """
+    Rows whose (partition, date) is one of cells.
+    """
+    index = pd.MultiIndex.from_arrays(
+        [df[col].astype(str) for col in PARTITION_KEYS]
+        + [df["date"].dt.strftime("%Y-%m-%d")]
+    )
+    return pd.Series(index.isin(list(cells)), index=df.index)
+
+
+def _first_new_dates(cells: set) -> pd.DataFrame:
+    """
+    First new date per partition (PARTITION_KEYS + first_new).
+    """
+    new = pd.DataFrame(sorted(cells), columns=PARTITION_KEYS + ["first_new"])
+    new["first_new"] = pd.to_datetime(new["first_new"])
+    return new.groupby(PARTITION_KEYS, as_index=False)["first_new"].min()
+
+
+def _cutoff(df: pd.DataFrame, first_new: pd.DataFrame) -> pd.Series:
+    """
+    First new date of each row's partition, NaT for untouched partitions.
+    """
+    return (
+        df[PARTITION_KEYS].astype(str)
+        .merge(first_new, on=PARTITION_KEYS, how="left")["first_new"]
+        .set_axis(df.index)
+    )
+
+
+def _partition_tuples(df: pd.DataFrame) -> list:
+    return [
+        tuple(str(value) for value in part)
+        for part in df[PARTITION_KEYS].itertuples(index=False, name=None)
+    ]
 
 
 # =========================================================
 # PIPELINE
 # =========================================================
-def run_feature_pipeline(cleaned_dir: str, featured_dir: str):
+@instrumented
+def run_feature_pipeline(
+    cleaned_dir: str,
+    featured_dir: str,
+    storage_format: str = "csv",
+    csv_export: bool = False,
+    context=None,
+    max_workers: int = None,
+    executor: str = "thread"
+):
+    """
+    The five builders only read cleaned tables, so they run in parallel
+    (max_workers, thread or process pool). Process workers cannot share
+    the in-memory context: they read and write on disk instead.
+    Within a builder, the partitions are computed on up to max_workers
+    processes.
+    """
     print("Starting feature engineering pipeline...")
 
-    build_downtime_features(cleaned_dir, featured_dir)
-    build_hourly_features(cleaned_dir, featured_dir)
-    build_daily_features(cleaned_dir, featured_dir)
-    build_event_hour_reconciliation(cleaned_dir, featured_dir)
-    build_hour_day_reconciliation(cleaned_dir, featured_dir)
+    builder_context = context
+    if executor == "process":
+        if context is not None and not context.persist:
+            raise ValueError("executor='process' needs persisted tables (no in-memory run)")
+        builder_context = None
+
+    builder_kwargs = dict(
+        cleaned_dir=cleaned_dir,
+        featured_dir=featured_dir,
+        storage_format=storage_format,
+        csv_export=csv_export,
+        context=builder_context,
+        max_workers=max_workers,
+    )
+
+    report = run_dag(
+        [
+            DagNode(builder.__name__, builder, builder_kwargs)
+            for builder in FEATURE_BUILDERS
+        ],
+        max_workers=max_workers,
+        executor=executor,
+    )
+    report.print_summary("Feature builders")
+
+    if report.failed:
+        raise RuntimeError(f"Feature builders failed: {report.failed}")
+
+    cleaned = {
+        key: read_table(cleaned_dir, name, columns=PARTITION_KEYS + ["date"], context=context)
+        for key, name in CLEANED_TABLES.items()
+    }
+    _write_state(featured_dir, cleaned, context)
 
     print("Feature engineering pipeline completed successfully.")
+
+
+@instrumented
+def run_incremental_feature_pipeline(
+    cleaned_dir: str,
+    featured_dir: str,
+    storage_format: str = "csv",
+    csv_export: bool = False,
+    context=None,
+    max_workers: int = None,
+    executor: str = "thread"
+):
+    """
+    Computes features only for (partition, production date) pairs that are
+    new in the cleaned tables and merges them into the featured tables.
+
+    A pair is new for a sheet when it was not part of the previous feature
+    run (tracked in STATE_FILE). Row-local features (hourly and both
+    reconciliations) are recomputed for the new pairs only. Event gaps and
+    the daily rolling window depend on earlier rows, so in every partition
+    with new data those tables are recomputed from its first new date
+    onwards, seeded with the last kept event end (downtime_end_ms) and
+    the last ROLLING_WINDOW_DAYS - 1 efficiencies. Partitions without new
+    data are kept as they are. Without a (compatible) previous state a full
+    run is done.
+    """
+    state = _read_state(featured_dir)
+
+    try:
+        featured = {
+            name: read_table(featured_dir, name, context=context)
+            for name in [
+                "downtime_features",
+                "hourly_features",
+                "daily_features",
+                "event_hour_reconciliation",
+                "hour_day_reconciliation",
+            ]
+        }
+    except FileNotFoundError:
+        featured = None
+
+    if state is None or featured is None:
+        print("No previous feature state found, running full feature pipeline.")
+        run_feature_pipeline(
+            cleaned_dir, featured_dir, storage_format, csv_export, context,
+            max_workers=max_workers, executor=executor
+        )
+        return
+
+    print("Starting incremental feature engineering pipeline...")
+
+    cleaned = {
+        key: read_table(cleaned_dir, name, context=context)
+        for key, name in CLEANED_TABLES.items()
+    }
+
+    new_dates = {
+        key: _partition_dates(df) - state.get(key, set())
+        for key, df in cleaned.items()
+    }
+
+    for key, cells in new_dates.items():
+        print(f"{CLEANED_TABLES[key]}: {len(cells)} new (partition, date) pair(s)")
+
+    if not any(new_dates.values()):
+        print("Featured tables are up to date.")
+        return
+
+    def _save(df, name):
+        # same row order as a full run (ROW_ORDER)
+        write_table(
+            _in_row_order(df, name), featured_dir, name,
+            storage_format, csv_export, context=context
+        )
+        print(f"{name} updated")
+
+    def _compute(func, frames, **kwargs):
+        return partition_map(func, frames, PARTITION_KEYS, kwargs, max_workers=max_workers)
+
+    # ---- events: per partition, recompute from its first new date,
+    #      seeded by the last kept event
+    if new_dates["downtime"]:
+        first_new = _first_new_dates(new_dates["downtime"])
+
+        existing = featured["downtime_features"].sort_values(
+            PARTITION_KEYS + ["downtime_start_ms"], kind="stable"
+        )
+        cut = _cutoff(existing, first_new)
+        kept = existing[cut.isna() | (existing["date"] < cut)]
+
+        last_kept = kept[_cutoff(kept, first_new).notna()].groupby(
+            PARTITION_KEYS, observed=True, sort=False
+        ).tail(1)
+        seeds = dict(zip(_partition_tuples(last_kept), last_kept["downtime_end_ms"]))
+
+        events = cleaned["downtime"]
+        cut = _cutoff(events, first_new)
+        fresh = _compute(
+            _compute_downtime_features,
+            {"df": events[cut.notna() & (events["date"] >= cut)].copy()},
+            prev_downtime_end_ms=seeds
+        )
+        _save(pd.concat([kept, fresh], ignore_index=True), "downtime_features")
+
+    # ---- hourly: row-local, replace the affected (partition, date) pairs
+    hourly_dates = new_dates["hourly"] | new_dates["processed"]
+    if hourly_dates:
+        existing = featured["hourly_features"]
+        fresh = _compute(
+            _compute_hourly_features,
+            {
+                "hourly_df": cleaned["hourly"][_in_dates(cleaned["hourly"], hourly_dates)].copy(),
+                "processed_df": cleaned["processed"][_in_dates(cleaned["processed"], hourly_dates)].copy(),
+            }
+        )
+        updated = pd.concat(
+            [existing[~_in_dates(existing, hourly_dates)], fresh],
+            ignore_index=True
+        )
+        _save(updated, "hourly_features")
+
+    # ---- daily: per partition, recompute from its first new date with a
+    #      warmed-up rolling window
+    if new_dates["daily"]:
+        first_new = _first_new_dates(new_dates["daily"])
+
+        existing = featured["daily_features"].sort_values(
+            PARTITION_KEYS + ["date"], kind="stable"
+        )
+        cut = _cutoff(existing, first_new)
+        kept = existing[cut.isna() | (existing["date"] < cut)]
+
+        history = kept[_cutoff(kept, first_new).notna()].groupby(
+            PARTITION_KEYS, observed=True, sort=False
+        ).tail(ROLLING_WINDOW_DAYS - 1)
+
+        days = cleaned["daily"]
+        cut = _cutoff(days, first_new)
+        fresh = _compute(
+            _compute_daily_features,
+            {"df": days[cut.notna() & (days["date"] >= cut)].copy()},
+            efficiency_history=history[PARTITION_KEYS + ["efficiency"]]
+        )
+        _save(pd.concat([kept, fresh], ignore_index=True), "daily_features")
+
+    # ---- event → hour: per hour bucket, replace the affected pairs
+    # (event timestamps are built from their own date, so an event never
+    # spills into the hours of another date)
+    event_hour_dates = new_dates["downtime"] | new_dates["hourly"]
+    if event_hour_dates:
+        existing = featured["event_hour_reconciliation"]
+        fresh = _compute(
+            _compute_event_hour_reconciliation,
+            {
+                "downtime_df": cleaned["downtime"][_in_dates(cleaned["downtime"], event_hour_dates)].copy(),
+                "hourly_df": cleaned["hourly"][_in_dates(cleaned["hourly"], event_hour_dates)].copy(),
+            }
+        )
+        updated = pd.concat(
+            [existing[~_in_dates(existing, event_hour_dates)], fresh],
+            ignore_index=True
+        )
+        _save(updated, "event_hour_reconciliation")
+
+    # ---- hour → day: per date, replace the affected pairs
+    hour_day_dates = new_dates["hourly"] | new_dates["daily"]
+    if hour_day_dates:
+        existing = featured["hour_day_reconciliation"]
+        fresh = _compute(
+            _compute_hour_day_reconciliation,
+            {
+                "hourly_df": cleaned["hourly"][_in_dates(cleaned["hourly"], hour_day_dates)].copy(),
+                "daily_df": cleaned["daily"][_in_dates(cleaned["daily"], hour_day_dates)].copy(),
+            }
+        )
+        updated = pd.concat(
+            [existing[~_in_dates(existing, hour_day_dates)], fresh],
+            ignore_index=True
+        )
+        _save(updated, "hour_day_reconciliation")
+
+    _write_state(featured_dir, cleaned, context)
+
+    print("Incremental feature engineering pipeline completed successfully.")
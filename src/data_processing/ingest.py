@@ -0,0 +1,216 @@
+import glob
+import hashlib
+import os
+import pickle
+
+import pandas as pd
+
+from src.pipeline.instrumentation import file_bytes, record_read, record_write
+
+
+"""
+Raw workbook ingest.
+
+- Opens the Excel workbook once and parses all sheets from that handle
+- Reads only the columns each sheet needs; text columns with explicit
+  dtypes, numeric columns as the cells come (they may hold text such as
+  "49,5%") and cast to their schema dtype after normalization
+  (cast_numeric)
+- Keeps a binary snapshot keyed by the workbook content hash, so an
+  unchanged workbook skips Excel parsing on the next run
+- Adds the partition keys (plant_id, line_id) to every sheet; sheets
+  without them belong to the default plant / line
+"""
+
+
+# Excel sheet mapping
+SHEETS = {
+    "downtime": "downtime_event_log",
+    "hourly": "hourly_operation_breakdown",
+    "daily": "daily_operation_summary",
+    "processed": "processed_hourly"
+}
+
+# Columns read per sheet and their dtypes.
+# Dates are left to the Excel engine (already datetime cells) and clock
+# columns stay as objects, they are normalized in prepare_data.
+# Numeric dtypes are the target of cast_numeric, not forced while parsing.
+# downtime_time is not read: durations are recomputed from start/end.
+SHEET_SCHEMAS = {
+    "downtime": {
+        "downtime_id": "str",
+        "date": None,
+        "downtime_start_time": "object",
+        "downtime_end_time": "object",
+    },
+    "hourly": {
+        "date": None,
+        "hour_start": "Int64",
+        "hour_end": "Int64",
+        "monitored_time_h": "float64",
+        "operation_time_h": "float64",
+        "downtime_h": "float64",
+        "efficiency": "float64",
+    },
+    "daily": {
+        "date": None,
+        "product_type_l": "Int64",
+        "production_units": "Int64",
+        "liters_produced": "Int64",
+        "production_start_time": "object",
+        "production_end_time": "object",
+        "efficiency": "float64",
+        "gallons_per_hour": "float64",
+        "monitored_time_dec": "float64",
+        "operation_time_dec": "float64",
+        "pause_time_dec": "float64",
+    },
+    "processed": {
+        "date": None,
+        "hour_start": "Int64",
+        "hour_end": "Int64",
+        "production_gallons": "Int64",
+    },
+}
+
+# Partition keys: optional in every sheet, filled with the default
+# value when a sheet does not have the column (single-line workbooks)
+PARTITION_DEFAULTS = {
+    "plant_id": "plant_1",
+    "line_id": "line_1",
+}
+
+PARTITION_KEYS = list(PARTITION_DEFAULTS)
+
+NUMERIC_DTYPES = ("Int64", "float64")
+
+SNAPSHOT_PREFIX = "raw_snapshot_"
+
+# bumped when the parsed frames change for the same workbook and schema
+SNAPSHOT_VERSION = 2
+
+
+def _file_sha256(path: str, chunk_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _schema_fingerprint() -> str:
+    # A schema change must invalidate old snapshots as well
+    payload = repr((SNAPSHOT_VERSION, sorted(SHEETS.items()), sorted(
+        (key, sorted(cols.items(), key=lambda kv: kv[0]))
+        for key, cols in SHEET_SCHEMAS.items()
+    ), sorted(PARTITION_DEFAULTS.items())))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:12]
+
+
+def _snapshot_path(cache_dir: str, workbook_hash: str) -> str:
+    return os.path.join(
+        cache_dir,
+        f"{SNAPSHOT_PREFIX}{workbook_hash[:16]}_{_schema_fingerprint()}.pkl"
+    )
+
+
+def _parse_sheet(excel_file: pd.ExcelFile, key: str) -> pd.DataFrame:
+    schema = SHEET_SCHEMAS[key]
+    dtypes = {
+        col: dtype for col, dtype in schema.items()
+        if dtype is not None and dtype not in NUMERIC_DTYPES
+    }
+
+    dtypes.update({col: "str" for col in PARTITION_KEYS})
+
+    df = excel_file.parse(
+        sheet_name=SHEETS[key],
+        usecols=lambda col: col in schema or col in PARTITION_DEFAULTS,
+        dtype=dtypes,
+    )
+
+    missing = [col for col in schema if col not in df.columns]
+    if missing:
+        raise ValueError(
+            f"Sheet '{SHEETS[key]}' is missing expected columns: {missing}"
+        )
+
+    for col, default in PARTITION_DEFAULTS.items():
+        if col not in df.columns:
+            df[col] = default
+        else:
+            df[col] = df[col].fillna(default)
+
+    return df[PARTITION_KEYS + list(schema)]
+
+
+def read_workbook(raw_excel_path: str, engine: str = None):
+    """
+    Opens the workbook once and parses every sheet in SHEETS from it.
+
+    Returns a dict keyed like SHEETS (downtime, hourly, daily, processed).
+    """
+    with pd.ExcelFile(raw_excel_path, engine=engine) as excel_file:
+        return {key: _parse_sheet(excel_file, key) for key in SHEETS}
+
+
+def cast_numeric(df: pd.DataFrame, key: str) -> pd.DataFrame:
+    """
+    Casts the numeric columns of a parsed sheet (already numbers, see
+    normalize_numeric) to their schema dtypes, in place. Integer columns
+    holding fractions stay float64.
+    """
+    for col, dtype in SHEET_SCHEMAS[key].items():
+        if dtype not in NUMERIC_DTYPES or col not in df.columns:
+            continue
+        try:
+            df[col] = df[col].astype(dtype)
+        except (TypeError, ValueError):
+            df[col] = df[col].astype("float64")
+    return df
+
+
+def sheet_rows(sheets: dict) -> int:
+    return sum(len(df) for df in sheets.values())
+
+
+def load_raw_sheets(
+    raw_excel_path: str,
+    cache_dir: str = None,
+    engine: str = None
+):
+    """
+    Loads the raw sheets, going through the binary snapshot when cache_dir
+    is given. Returned frames are fresh objects, callers may modify them.
+    """
+    if cache_dir is None:
+        sheets = read_workbook(raw_excel_path, engine=engine)
+        record_read(sheet_rows(sheets), file_bytes(raw_excel_path))
+        return sheets
+
+    os.makedirs(cache_dir, exist_ok=True)
+
+    snapshot_path = _snapshot_path(cache_dir, _file_sha256(raw_excel_path))
+
+    if os.path.exists(snapshot_path):
+        with open(snapshot_path, "rb") as f:
+            sheets = pickle.load(f)
+        record_read(sheet_rows(sheets), file_bytes(snapshot_path))
+        print(f"Raw snapshot hit: {snapshot_path}")
+        return sheets
+
+    sheets = read_workbook(raw_excel_path, engine=engine)
+    record_read(sheet_rows(sheets), file_bytes(raw_excel_path))
+
+    # Only one snapshot is kept, older workbook versions are dropped
+    for stale in glob.glob(os.path.join(cache_dir, f"{SNAPSHOT_PREFIX}*.pkl")):
+        os.remove(stale)
+
+    tmp_path = snapshot_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump(sheets, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, snapshot_path)
+    record_write(nbytes=file_bytes(snapshot_path))
+
+    print(f"Raw snapshot written: {snapshot_path}")
+    return sheets
@@ -0,0 +1,160 @@
+import numpy as np
+import pandas as pd
+
+
+"""
+Vectorized interval splitting.
+
+split_by_hour allocates the seconds of every [start, end) interval to
+each clock-hour bucket it overlaps. Each interval is expanded into one
+segment per bucket with np.repeat (no per-event Python loop), so the
+cost is linear in the number of segments; a few array passes handle tens
+of millions of events.
+
+Intervals with end <= start (e.g. clock values that wrap past midnight)
+are not split: their full (zero or negative) duration stays in the
+bucket of the start, as before.
+
+Event boundaries are int64 epoch milliseconds (downtime_start_ms /
+downtime_end_ms of the cleaned tables); to_epoch_ms / from_epoch_ms
+convert between them and datetime columns, and the splitting itself is
+plain integer arithmetic in either unit.
+"""
+
+
+HOUR_MS = 3_600 * 1_000
+HOUR_NS = HOUR_MS * 10**6
+DAY_MS = 24 * HOUR_MS
+
+# 1970-01-01 was a Thursday (Monday = 0)
+_EPOCH_WEEKDAY = 3
+
+
+def _to_ns(values) -> np.ndarray:
+    return np.asarray(values, dtype="datetime64[ns]").view("int64")
+
+
+def to_epoch_ms(values: pd.Series) -> pd.Series:
+    """
+    Datetime column → Int64 epoch milliseconds (rounded; NaT → NA).
+    """
+    ms = values.dt.round("ms").astype("datetime64[ms]")
+    return pd.Series(
+        pd.array(ms.to_numpy().view("int64"), dtype="Int64"), index=values.index
+    ).mask(values.isna())
+
+
+def from_epoch_ms(values, missing: np.ndarray = None) -> np.ndarray:
+    """
+    int64 epoch milliseconds → datetime64[ns] array; positions flagged in
+    `missing` become NaT.
+    """
+    stamps = np.asarray(values, dtype="int64").astype("datetime64[ms]").astype("datetime64[ns]")
+    if missing is not None:
+        stamps[missing] = np.datetime64("NaT")
+    return stamps
+
+
+def hour_of_day(ms: np.ndarray) -> np.ndarray:
+    return (ms // HOUR_MS) % 24
+
+
+def weekday(ms: np.ndarray) -> np.ndarray:
+    return (ms // DAY_MS + _EPOCH_WEEKDAY) % 7
+
+
+def _split(start: np.ndarray, end: np.ndarray, bucket_size: int):
+    # start / end: int64 arrays in the unit of bucket_size
+    first_bucket = start - start % bucket_size
+
+    # end is exclusive: an interval ending on the hour stays out of that hour
+    last_bucket = np.where(end > start, end - 1, start)
+    last_bucket = last_bucket - last_bucket % bucket_size
+
+    n_buckets = (last_bucket - first_bucket) // bucket_size + 1
+
+    interval_index = np.repeat(np.arange(len(start)), n_buckets)
+
+    # position of each segment within its interval: 0, 1, ..., n_buckets - 1
+    segment_starts = np.cumsum(n_buckets) - n_buckets
+    position = np.arange(len(interval_index)) - np.repeat(segment_starts, n_buckets)
+
+    bucket = first_bucket[interval_index] + position * bucket_size
+
+    seg_start = np.maximum(start[interval_index], bucket)
+    seg_end = np.minimum(end[interval_index], bucket + bucket_size)
+
+    # non-positive intervals keep their full duration in the start bucket
+    backwards = end[interval_index] <= start[interval_index]
+    seg_start = np.where(backwards, start[interval_index], seg_start)
+    seg_end = np.where(backwards, end[interval_index], seg_end)
+
+    return interval_index, bucket, seg_end - seg_start
+
+
+def split_by_hour(starts, ends):
+    """
+    Splits intervals into clock-hour segments.
+
+    starts / ends: datetime-like arrays of equal length, without NaT.
+    Returns (interval_index, bucket_start, seconds):
+    - interval_index: position of the interval each segment belongs to
+    - bucket_start:   datetime64[ns] start of the segment's hour
+    - seconds:        seconds of the interval inside that hour
+    """
+    interval_index, bucket, length = _split(_to_ns(starts), _to_ns(ends), HOUR_NS)
+    return interval_index, bucket.view("datetime64[ns]"), length / 1e9
+
+
+def split_ms_by_hour(start_ms, end_ms):
+    """
+    split_by_hour for int64 epoch milliseconds; bucket_start is returned
+    as epoch milliseconds as well.
+    """
+    start = np.asarray(start_ms, dtype="int64")
+    end = np.asarray(end_ms, dtype="int64")
+    interval_index, bucket, length = _split(start, end, HOUR_MS)
+    return interval_index, bucket, length / 1e3
+
+
+def hour_segments(start_ms: int, end_ms: int):
+    """
+    split_ms_by_hour for a single interval, without numpy (one event at a
+    time, e.g. while streaming). Yields (bucket_start_ms, seconds).
+    """
+    bucket = start_ms - start_ms % HOUR_MS
+
+    if end_ms <= start_ms:
+        yield bucket, (end_ms - start_ms) / 1e3
+        return
+
+    while bucket < end_ms:
+        yield bucket, (min(end_ms, bucket + HOUR_MS) - max(start_ms, bucket)) / 1e3
+        bucket += HOUR_MS
+
+
+def seconds_per_hour(df: pd.DataFrame, start_col: str, end_col: str, by: list = ()) -> pd.DataFrame:
+    """
+    Total interval seconds per clock hour (and per `by` columns).
+    start_col / end_col are datetime or int64 epoch-ms columns; rows with
+    a missing start or end are ignored.
+    Returns by + ["timestamp_start", "duration_sec"].
+    """
+    by = list(by)
+    valid = df[df[start_col].notna() & df[end_col].notna()]
+
+    if pd.api.types.is_integer_dtype(valid[start_col]):
+        interval_index, bucket_ms, seconds = split_ms_by_hour(valid[start_col], valid[end_col])
+        bucket_start = from_epoch_ms(bucket_ms)
+    else:
+        interval_index, bucket_start, seconds = split_by_hour(valid[start_col], valid[end_col])
+
+    segments = valid[by].iloc[interval_index].reset_index(drop=True)
+    segments["timestamp_start"] = bucket_start
+    segments["duration_sec"] = seconds
+
+    return (
+        segments
+        .groupby(by + ["timestamp_start"], as_index=False, observed=True)["duration_sec"]
+        .sum()
+    )
@@ -0,0 +1,119 @@
+import numpy as np
+import pandas as pd
+
+
+"""
+Numeric normalization of raw sheet columns.
+
+normalize_numeric converts the listed columns of a sheet to numbers
+(ingest reads them as the cells come, see cast_numeric):
+- columns already read as numbers are left untouched
+- other columns go through pd.to_numeric once; only the values it cannot
+  read take the text path, vectorized over the column:
+  - surrounding / grouping whitespace is removed
+  - "1,5" → 1.5; with both separators the last one is the decimal
+    separator ("1.234,5" → 1234.5, "1,234.5" → 1234.5)
+  - a trailing "%" divides by 100 ("49,5%" → 0.495), matching the
+    fractions the sheets store
+Blank texts count as missing. Values still unreadable become NaN and
+are counted per (sheet, column) in numeric_parse_report.
+"""
+
+
+# (sheet, column) → (rows, unparsed rows, first unparsed values) of the
+# last normalization
+_PARSE_REPORT = {}
+
+_EXAMPLES = 3
+
+
+def _to_float(text: pd.Series) -> pd.Series:
+    # a clean column casts in one pass; errors="coerce" is several times
+    # slower and only needed when something is unreadable
+    try:
+        return text.astype("float64")
+    except (TypeError, ValueError):
+        return pd.to_numeric(text, errors="coerce").astype("float64")
+
+
+def _parse_text(text: pd.Series) -> pd.Series:
+    text = text.astype("str").str.strip()
+
+    percent = text.str.endswith("%")
+    if percent.any():
+        text = text.str.rstrip("%")
+    text = text.str.replace("[\\s\u00a0']", "", regex=True)
+
+    # both separators: the last one is the decimal separator, the other
+    # one groups thousands and is dropped
+    grouped = text.str.contains(",", regex=False) & text.str.contains(".", regex=False)
+    if grouped.any():
+        both = text[grouped]
+        comma_decimal = both.str.rfind(",") > both.str.rfind(".")
+        text[grouped] = both.where(
+            ~comma_decimal, both.str.replace(".", "", regex=False)
+        ).where(comma_decimal, both.str.replace(",", "", regex=False))
+
+    values = _to_float(text.str.replace(",", ".", regex=False).mask(text == ""))
+    return values.where(~percent, values / 100)
+
+
+def parse_numeric(series: pd.Series) -> tuple:
+    """
+    Returns (numbers, unparsed): the column as numbers and the boolean
+    mask of present values that could not be read.
+    """
+    unparsed = np.zeros(len(series), dtype=bool)
+
+    if pd.api.types.is_numeric_dtype(series):
+        return series, unparsed
+
+    # all-text columns go to the text path directly, anything holding
+    # numbers is cast first and only its leftovers are read as text
+    if pd.api.types.infer_dtype(series, skipna=True) in ("string", "empty"):
+        numbers = pd.Series(np.nan, index=series.index)
+    else:
+        numbers = pd.to_numeric(series, errors="coerce")
+
+    pending = (numbers.isna() & series.notna()).to_numpy()
+    if pending.any():
+        text = series[pending].astype("str").str.strip()
+        values = _parse_text(text).to_numpy()
+
+        numbers = numbers.astype("float64")
+        numbers[pending] = values
+        unparsed[pending] = np.isnan(values) & (text != "").to_numpy()
+
+    return numbers, unparsed
+
+
+def normalize_numeric(df: pd.DataFrame, columns: list, sheet: str) -> dict:
+    """
+    Converts the present `columns` of df in place (parse_numeric) and
+    returns {column: unparsed rows}.
+    """
+    unparsed_rows = {}
+
+    for col in columns:
+        if col not in df.columns:
+            continue
+
+        numbers, unparsed = parse_numeric(df[col])
+        examples = df[col][unparsed].head(_EXAMPLES).astype("str").tolist()
+        df[col] = numbers
+
+        unparsed_rows[col] = int(unparsed.sum())
+        _PARSE_REPORT[(sheet, col)] = (len(df), unparsed_rows[col], examples)
+
+    return unparsed_rows
+
+
+def numeric_parse_report() -> pd.DataFrame:
+    """
+    Rows per normalized (sheet, column) and how many of them could not
+    be parsed, with the first unparsed raw values.
+    """
+    return pd.DataFrame(
+        [(sheet, col, *entry) for (sheet, col), entry in _PARSE_REPORT.items()],
+        columns=["sheet", "column", "rows", "unparsed_rows", "examples"],
+    )
@@ -0,0 +1,562 @@
+import os
+import re
+import numpy as np
+import pandas as pd
+
+from src.data_processing.ingest import PARTITION_KEYS
+from src.pipeline.feature_store import file_signature, frame_bytes, get_feature_store
+from src.pipeline.instrumentation import file_bytes, record_read, record_write
+
+
+"""
+Table storage for data/cleaned and data/featured.
+
+Tables are addressed by name (file stem, e.g. "downtime_features") and
+written in one of the STORAGE_FORMATS:
+- csv      → plain text, dtypes re-inferred on read
+- parquet  → typed columnar file, zstd compressed
+- feather  → Arrow IPC file, zstd compressed
+
+Each known table has an explicit schema (TABLE_SCHEMAS) which is applied
+before writing and again after reading, so readers get datetime64, bool,
+int8 and category columns without re-parsing. The partition keys
+(plant_id, line_id) are string categories in every cleaned / featured table.
+Parquet / Arrow IPC need pyarrow (optional dependency).
+
+The schemas also compact the tables written by prepare_data and the
+feature builders:
+- ID       event ids ("downtime_1248") become their integer number
+           (ID_DTYPE)
+- CLOCK    clock columns become timedelta64[ms] offsets since midnight
+- DROP     redundant columns are removed
+Count / quantity columns declare a fixed nullable width (Int32, fractions
+rounded), so a table is written with the same dtypes whatever the values
+of a run.
+write_table records each table's in-memory size before and after the
+schema (table_memory_report).
+
+Both write_table and read_table accept an optional PipelineContext
+(src/pipeline/context.py) to hand tables between stages in memory.
+Tables loaded from disk are held by the process-wide FeatureStore
+(src/pipeline/feature_store.py) until their file changes, so repeated
+reads of a table (or of the same columns) cost one load; column requests
+read only those columns from the file.
+
+iter_table streams a stored table in chunks for aggregations over tables
+that do not fit in memory; write_table_chunks writes such a stream back
+as CSV.
+
+Rows and file bytes read / written are reported to the instrumentation
+spans (src/pipeline/instrumentation.py) of the calling stage.
+"""
+
+
+STORAGE_FORMATS = {
+    "parquet": ".parquet",
+    "feather": ".arrow",
+    "csv": ".csv",
+}
+
+COMPRESSION = "zstd"
+
+# Rows per chunk of iter_table
+CHUNK_ROWS = 1_000_000
+
+DATETIME = "datetime64[ns]"
+
+# Compacting schema entries (see apply_schema)
+ID = "id"
+CLOCK = "timedelta64[ms]"
+DROP = "drop"
+
+# stored type of ID columns (nullable: ids may be missing)
+ID_DTYPE = "Int32"
+
+_PARTITION_SCHEMA = {col: "category" for col in PARTITION_KEYS}
+
+# start_clock / end_clock duplicated the normalized clock columns
+_CLOCK_COPIES = {"start_clock": DROP, "end_clock": DROP}
+
+_DOWNTIME_SCHEMA = {
+    **_PARTITION_SCHEMA,
+    "downtime_id": ID,
+    "date": DATETIME,
+    "downtime_start_time": CLOCK,
+    "downtime_end_time": CLOCK,
+    **_CLOCK_COPIES,
+    "downtime_start_ms": "int64",
+    "downtime_end_ms": "int64",
+    "downtime_start_ts": DATETIME,
+    "downtime_end_ts": DATETIME,
+}
+
+_HOURLY_SCHEMA = {
+    **_PARTITION_SCHEMA,
+    "date": DATETIME,
+    "hour_start": "int8",
+    "hour_end": "int8",
+    "timestamp_start": DATETIME,
+    "timestamp_end": DATETIME,
+}
+
+_DAILY_SCHEMA = {
+    **_PARTITION_SCHEMA,
+    "date": DATETIME,
+    "product_type_l": "category",
+    "production_units": "Int32",
+    "liters_produced": "Int32",
+    "production_start_time": CLOCK,
+    "production_end_time": CLOCK,
+    **_CLOCK_COPIES,
+    "production_start_ts": DATETIME,
+    "production_end_ts": DATETIME,
+}
+
+TABLE_SCHEMAS = {
+    # cleaned
+    "downtime_cleaned": _DOWNTIME_SCHEMA,
+    "hourly_cleaned": _HOURLY_SCHEMA,
+    "daily_cleaned": _DAILY_SCHEMA,
+    "processed_hourly_cleaned": {**_HOURLY_SCHEMA, "production_gallons": "Int32"},
+
+    # featured
+    "downtime_features": {
+        **_DOWNTIME_SCHEMA,
+        "downtime_hour": "int8",
+        "downtime_weekday": "int8",
+        "prev_downtime_end_ts": DATETIME,
+        "is_burst": "bool",
+    },
+    "hourly_features": {
+        **_HOURLY_SCHEMA,
+        "production_gallons": "Int32",
+        "zero_operation_flag": "bool",
+        "hour": "int8",
+        "weekday": "int8",
+    },
+    "daily_features": _DAILY_SCHEMA,
+    "event_hour_reconciliation": _HOURLY_SCHEMA,
+    "hour_day_reconciliation": _DAILY_SCHEMA,
+
+    # aggregates
+    "downtime_burst_episodes": {
+        **_PARTITION_SCHEMA,
+        "gap_threshold_sec": "Int32",
+        "episode_id": "Int32",
+        "episode_start_ts": DATETIME,
+        "episode_end_ts": DATETIME,
+        "event_count": "Int32",
+    },
+    "downtime_cube": {
+        "date": DATETIME,
+        "hour": "int8",
+        "weekday": "int8",
+        "product_type_l": "category",
+        # additive measures: summed by rollup, kept wide
+        "downtime_event_count": "int64",
+        "efficiency_count": "int64",
+    },
+}
+
+
+def _require_pyarrow(storage_format: str):
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError as exc:
+        raise ImportError(
+            f"storage_format='{storage_format}' requires pyarrow "
+            "(pip install pyarrow)"
+        ) from exc
+
+
+def table_path(directory: str, name: str, storage_format: str = "csv") -> str:
+    if storage_format not in STORAGE_FORMATS:
+        raise ValueError(
+            f"Unknown storage format '{storage_format}', "
+            f"expected one of {list(STORAGE_FORMATS)}"
+        )
+    return os.path.join(directory, name + STORAGE_FORMATS[storage_format])
+
+
+def find_table(directory: str, name: str) -> str:
+    """
+    Resolves the stored file for a table. Typed formats win over CSV,
+    since CSV is only kept as a side output next to them.
+    """
+    for storage_format in STORAGE_FORMATS:
+        path = table_path(directory, name, storage_format)
+        if os.path.exists(path):
+            return path
+
+    raise FileNotFoundError(
+        f"No stored table '{name}' in {directory} "
+        f"(looked for {', '.join(STORAGE_FORMATS.values())})"
+    )
+
+
+def _id_codes(series: pd.Series) -> pd.Series:
+    """
+    "<prefix><number>" ids as their number (ID_DTYPE) when all ids share
+    one prefix, distinct ids keep distinct numbers and the numbers fit
+    ID_DTYPE; anything else becomes a category.
+    """
+    if pd.api.types.is_integer_dtype(series):
+        return series.astype(ID_DTYPE)
+
+    text = series.dropna().astype("str")
+    if len(text) == 0:
+        return series.astype("category")
+
+    # the prefix of the first id must be shared by all of them
+    prefix = re.sub(r"\d+$", "", text.iloc[0])
+    digits = text.str.slice(len(prefix))
+
+    if (
+        text.str.startswith(prefix).all()
+        and digits.str.isdigit().all()
+    ):
+        codes = pd.to_numeric(digits)
+        limits = np.iinfo(ID_DTYPE.lower())
+        if (
+            codes.nunique() == text.nunique()
+            and limits.min <= codes.min() and codes.max() <= limits.max
+        ):
+            return codes.reindex(series.index).astype(ID_DTYPE)
+
+    return series.astype("category")
+
+
+def apply_schema(df: pd.DataFrame, name: str) -> pd.DataFrame:
+    """
+    Casts the columns listed in TABLE_SCHEMAS[name]; others are left as is.
+    Integer and bool columns holding missing values fall back to their
+    nullable variants (Int8 / Int64 / boolean); integral float categories are
+    restored to integers. ID, CLOCK and DROP entries compact the table
+    (module docstring).
+    """
+    schema = TABLE_SCHEMAS.get(name, {})
+
+    dropped = [col for col, dtype in schema.items() if dtype == DROP and col in df.columns]
+    if dropped:
+        df = df.drop(columns=dropped)
+
+    for col, dtype in schema.items():
+        if col not in df.columns:
+            continue
+
+        series = df[col]
+
+        if dtype == ID:
+            df[col] = _id_codes(series)
+
+        elif dtype == CLOCK:
+            if not pd.api.types.is_timedelta64_dtype(series):
+                series = _parse_clock(series)
+            df[col] = series.dt.round("ms").astype(dtype)
+
+        elif dtype.startswith("datetime64"):
+            if not pd.api.types.is_datetime64_any_dtype(series):
+                series = pd.to_datetime(series, errors="coerce")
+            df[col] = series.astype(dtype)
+
+        elif dtype.startswith("Int"):
+            # fixed-width nullable integers, whatever the values of this
+            # write (fractions from the sheet are rounded)
+            df[col] = pd.to_numeric(series, errors="coerce").round().astype(dtype)
+
+        elif dtype in ("int8", "int64", "bool"):
+            nullable = {"int8": "Int8", "int64": "Int64", "bool": "boolean"}[dtype]
+            df[col] = series.astype(nullable if series.isna().any() else dtype)
+
+        elif dtype == "category" and pd.api.types.is_float_dtype(series):
+            # CSV turns integer codes with gaps into floats (3 → 3.0)
+            values = series.dropna()
+            if (values == values.round()).all():
+                series = series.astype("Int64")
+            df[col] = series.astype(dtype)
+
+        elif str(series.dtype) != dtype:
+            df[col] = series.astype(dtype)
+
+    return df
+
+
+def _parse_clock(series: pd.Series) -> pd.Series:
+    # "HH:MM:SS[.fff]" text parses as an ISO time on the epoch day ten
+    # times faster than through to_timedelta; anything else (over 24 h,
+    # "1 days ...") takes the general parser
+    text = series.astype("str").where(series.notna())
+    stamps = pd.to_datetime("1970-01-01 " + text, format="ISO8601", errors="coerce")
+    clocks = stamps - pd.Timestamp(0)
+
+    rest = clocks.isna() & text.notna()
+    if rest.any():
+        clocks[rest] = pd.to_timedelta(text[rest], errors="coerce")
+    return clocks
+
+
+def _clock_text(series: pd.Series) -> pd.Series:
+    # "HH:MM:SS.fff"; pandas formats timedeltas for CSV one by one
+    stamps = series.to_numpy(dtype="timedelta64[ms]") + np.datetime64(0, "ms")
+    text = pd.Series(np.datetime_as_string(stamps, unit="ms"), index=series.index)
+    return text.str.slice(11).where(series.notna())
+
+
+def _to_csv(df: pd.DataFrame, path: str, name: str, append: bool = False):
+    clocks = [
+        col for col, dtype in TABLE_SCHEMAS.get(name, {}).items()
+        if dtype == CLOCK and col in df.columns
+    ]
+    if clocks:
+        df = df.assign(**{col: _clock_text(df[col]) for col in clocks})
+    df.to_csv(path, index=False, mode="a" if append else "w", header=not append)
+
+
+# name → (rows, bytes before, bytes after apply_schema) of the last write
+_TABLE_MEMORY = {}
+
+
+def table_memory_report() -> pd.DataFrame:
+    """
+    In-memory size of every table written in this process, before and
+    after its schema was applied (DataFrame.memory_usage, deep).
+    """
+    report = pd.DataFrame(
+        [(name, *sizes) for name, sizes in _TABLE_MEMORY.items()],
+        columns=["table", "rows", "before_bytes", "after_bytes"],
+    )
+    report["saved_share"] = 1 - report["after_bytes"] / report["before_bytes"]
+    return report
+
+
+def write_table(
+    df: pd.DataFrame,
+    directory: str,
+    name: str,
+    storage_format: str = "csv",
+    csv_export: bool = False,
+    context=None
+):
+    """
+    Writes a table in the requested format with its schema applied.
+    csv_export additionally writes a CSV copy next to a typed file.
+
+    With a context the typed frame is also kept in memory; nothing is
+    written when the context does not persist.
+    Returns the path of the primary file, or None if it was not written.
+    """
+    before = frame_bytes(df)
+    df = apply_schema(df.copy(), name)
+    _TABLE_MEMORY[name] = (len(df), before, frame_bytes(df))
+
+    if context is not None:
+        context.put(directory, name, df)
+        if not context.persist:
+            record_write(len(df))
+            return None
+
+    os.makedirs(directory, exist_ok=True)
+    path = table_path(directory, name, storage_format)
+    csv_copy = None
+
+    if storage_format != "csv" and csv_export:
+        csv_copy = table_path(directory, name, "csv")
+        _to_csv(df, csv_copy, name)
+
+    if storage_format == "csv":
+        _to_csv(df, path, name)
+    elif storage_format == "parquet":
+        _require_pyarrow(storage_format)
+        df.to_parquet(path, index=False, compression=COMPRESSION)
+    else:
+        _require_pyarrow(storage_format)
+        df.reset_index(drop=True).to_feather(path, compression=COMPRESSION)
+
+    # A typed file from an earlier run would shadow the fresh one
+    for other_format in STORAGE_FORMATS:
+        if other_format not in (storage_format, "csv"):
+            stale = table_path(directory, name, other_format)
+            if os.path.exists(stale):
+                os.remove(stale)
+
+    get_feature_store().invalidate(directory, name)
+    record_write(len(df), file_bytes(path, csv_copy))
+
+    return path
+
+
+def write_table_chunks(
+    chunks,
+    directory: str,
+    name: str,
+    context=None
+):
+    """
+    Writes a table given as an iterable of frames (e.g. iter_table) as
+    CSV, one chunk in memory at a time. Typed formats need the whole
+    frame for a single schema and go through write_table.
+
+    With a non-persisting context the chunks are concatenated and kept in
+    memory like write_table; a persisting context is not handed the
+    table, readers load it from disk.
+    Returns the path of the file, or None if it was not written.
+    """
+    if context is not None and not context.persist:
+        frames = list(chunks)
+        df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+        return write_table(df, directory, name, context=context)
+
+    os.makedirs(directory, exist_ok=True)
+    path = table_path(directory, name, "csv")
+    rows = before = after = 0
+    header_written = False
+
+    for chunk in chunks:
+        before += frame_bytes(chunk)
+        chunk = apply_schema(chunk.copy(), name)
+        after += frame_bytes(chunk)
+        _to_csv(chunk, path, name, append=header_written)
+        header_written = True
+        rows += len(chunk)
+
+    if not header_written:
+        pd.DataFrame().to_csv(path, index=False)
+    _TABLE_MEMORY[name] = (rows, before, after)
+
+    for other_format in STORAGE_FORMATS:
+        if other_format != "csv":
+            stale = table_path(directory, name, other_format)
+            if os.path.exists(stale):
+                os.remove(stale)
+
+    get_feature_store().invalidate(directory, name)
+    record_write(rows, file_bytes(path))
+
+    return path
+
+
+def read_table(
+    directory: str,
+    name: str,
+    columns: list = None,
+    context=None
+) -> pd.DataFrame:
+    """
+    Loads a stored table by name with its schema dtypes applied.
+    A table held by the context is served from memory; a table loaded
+    from disk in full is handed to the context for the next reader. Disk
+    loads go through the feature store; with columns only those columns
+    are read from the file (unless the store holds the whole table).
+    """
+    if context is not None:
+        df = context.get(directory, name)
+        if df is not None:
+            record_read(len(df))
+            return df if columns is None else df[columns]
+
+    path = find_table(directory, name)
+    df = get_feature_store().get(
+        directory, name, file_signature(path),
+        lambda: _load_table(directory, name, columns),
+        columns=columns
+    )
+    record_read(len(df))
+
+    if columns is not None:
+        # file order for CSV, the requested order for the caller
+        return df[columns]
+
+    if context is not None:
+        context.put(directory, name, df)
+        return df.copy(deep=False)
+
+    return df
+
+
+def _load_table(directory: str, name: str, columns: list = None) -> pd.DataFrame:
+    path = find_table(directory, name)
+
+    if path.endswith(STORAGE_FORMATS["parquet"]):
+        df = pd.read_parquet(path, columns=columns)
+    elif path.endswith(STORAGE_FORMATS["feather"]):
+        df = pd.read_feather(path, columns=columns)
+    else:
+        df = pd.read_csv(path, **_csv_read_args(path, name, columns))
+
+    record_read(nbytes=file_bytes(path))
+    return apply_schema(df, name)
+
+
+def _csv_read_args(path: str, name: str, columns: list = None) -> dict:
+    schema = TABLE_SCHEMAS.get(name, {})
+    header = pd.read_csv(path, nrows=0).columns
+    wanted = header if columns is None else [c for c in header if c in columns]
+    date_cols = [
+        col for col in wanted
+        if schema.get(col, "").startswith("datetime64")
+    ]
+    # round_trip keeps floats bit-identical to the in-memory handoff;
+    # partition ids stay strings even when they look numeric
+    return dict(
+        usecols=columns,
+        parse_dates=date_cols,
+        dtype={col: "str" for col in PARTITION_KEYS if col in wanted},
+        float_precision="round_trip"
+    )
+
+
+def iter_table(
+    directory: str,
+    name: str,
+    columns: list = None,
+    chunksize: int = CHUNK_ROWS,
+    context=None
+):
+    """
+    Yields a stored table in chunks of at most chunksize rows (schema
+    applied), so tables larger than memory can be aggregated piecewise.
+    A table held by the context is sliced from memory; a table streamed
+    from disk is not handed to the context.
+    Feather files are yielded per record batch as written.
+    """
+    if context is not None:
+        df = context.get(directory, name)
+        if df is not None:
+            df = df if columns is None else df[columns]
+            record_read(len(df))
+            for start in range(0, len(df), chunksize):
+                yield df.iloc[start:start + chunksize]
+            return
+
+    path = find_table(directory, name)
+    record_read(nbytes=file_bytes(path))
+    for chunk in _iter_file(path, name, columns, chunksize):
+        record_read(len(chunk))
+        yield chunk
+
+
+def _iter_file(path: str, name: str, columns: list, chunksize: int):
+    if path.endswith(STORAGE_FORMATS["parquet"]):
+        _require_pyarrow("parquet")
+        import pyarrow.parquet as pq
+
+        batches = pq.ParquetFile(path).iter_batches(batch_size=chunksize, columns=columns)
+        for batch in batches:
+            yield apply_schema(batch.to_pandas(), name)
+
+    elif path.endswith(STORAGE_FORMATS["feather"]):
+        _require_pyarrow("feather")
+        import pyarrow as pa
+
+        with pa.memory_map(path) as source:
+            reader = pa.ipc.open_file(source)
+            for i in range(reader.num_record_batches):
+                batch = reader.get_batch(i)
+                if columns is not None:
+                    batch = batch.select(columns)
+                yield apply_schema(batch.to_pandas(), name)
+
+    else:
+        with pd.read_csv(path, chunksize=chunksize, **_csv_read_args(path, name, columns)) as reader:
+            for chunk in reader:
+                yield apply_schema(chunk, name)
@@ -0,0 +1,221 @@
+import math
+import numpy as np
+import pandas as pd
+
+from src.data_processing.ingest import PARTITION_KEYS, SHEETS, SHEET_SCHEMAS
+from src.data_processing.intervals import HOUR_NS, split_by_hour
+
+
+"""
+Synthetic raw data for scaling tests and benchmarks.
+
+generate_raw_sheets(n_events) builds the four sheets (downtime, hourly,
+daily, processed) with the columns and dtypes of load_raw_sheets, so they
+can be passed straight to prepare_data(raw_sheets=...). Sizes from 10^4
+up to 10^8 events are generated with array operations only.
+
+Distributions follow data/raw/dataset.xlsx:
+- ~25 events per production day, strongly varying (gamma day weights)
+- event durations 30 s + lognormal (median ~90 s, heavy tail), gaps
+  15 s + lognormal (median ~120 s), both on a 15 s grid
+- the first event starts with production, production ends after the
+  last event plus a final gap; clock values carry milliseconds
+- hourly / daily operation and downtime times are derived from the
+  events, so the sheets reconcile like the real workbook
+- product types 3 / 5, ~480 gallons per operating hour
+
+Lines are added (plant_id / line_id, 10 lines per plant) as the event
+count grows, keeping every line at a few years of business days.
+Clock columns are Excel day fractions (float64), one of the clock
+shapes the workbook uses. write_workbook stores the sheets as .xlsx
+for sizes within Excel's row limit.
+"""
+
+
+EVENTS_PER_DAY = 25
+EVENTS_PER_LINE = 50_000
+LINES_PER_PLANT = 10
+START_DATE = "2022-01-03"
+
+EXCEL_MAX_ROWS = 1_048_575
+
+_DAY_SEC = 86_400
+_GRID_SEC = 15
+
+
+def _on_grid(seconds: np.ndarray) -> np.ndarray:
+    return np.round(seconds / _GRID_SEC) * _GRID_SEC
+
+
+def _conform(df: pd.DataFrame, key: str) -> pd.DataFrame:
+    # the schema dtypes prepare_data casts the raw sheets to (clock
+    # columns stay numeric)
+    schema = SHEET_SCHEMAS[key]
+    df = df[PARTITION_KEYS + list(schema)]
+    return df.astype({
+        col: dtype for col, dtype in schema.items()
+        if dtype not in (None, "object") and col in df
+    })
+
+
+def generate_raw_sheets(n_events: int, seed: int = 0, lines: int = None) -> dict:
+    """
+    Four raw sheets (keyed like SHEETS) with n_events downtime events.
+    lines defaults to one line per EVENTS_PER_LINE events.
+    """
+    rng = np.random.default_rng(seed)
+
+    lines = lines or max(1, math.ceil(n_events / EVENTS_PER_LINE))
+    days_per_line = max(1, math.ceil(n_events / (lines * EVENTS_PER_DAY)))
+    n_days = lines * days_per_line
+
+    if n_events < n_days:
+        raise ValueError(f"{n_events} events cannot cover {n_days} production days")
+
+    # ---- production days: line x business day
+    dates = pd.bdate_range(START_DATE, periods=days_per_line).to_numpy()
+    line_index = np.repeat(np.arange(lines), days_per_line)
+    day_dates = np.tile(dates, lines)
+
+    plant_ids = np.array([f"plant_{i // LINES_PER_PLANT + 1}" for i in range(lines)])
+    line_ids = np.array([f"line_{i % LINES_PER_PLANT + 1}" for i in range(lines)])
+
+    # ---- events per day: at least one, the rest spread by gamma weights
+    weights = rng.gamma(2.0, size=n_days)
+    counts = 1 + rng.multinomial(n_events - n_days, weights / weights.sum())
+    event_day = np.repeat(np.arange(n_days), counts)
+    first_event = np.cumsum(counts) - counts
+
+    duration = _on_grid(30 + rng.lognormal(math.log(60), 1.45, n_events))
+    gap = _on_grid(15 + rng.lognormal(math.log(105), 1.4, n_events))
+    # the first event starts with production
+    gap[first_event] = 0.0
+
+    # production start 06:00 - 15:00 with milliseconds
+    start_sec = np.clip(rng.normal(11 * 3600, 5400, n_days), 6 * 3600, 15 * 3600)
+    start_sec = np.round(start_sec, 3)
+
+    step = gap + duration
+    final_gap = _on_grid(15 + rng.lognormal(math.log(105), 1.4, n_days))
+    day_span = np.bincount(event_day, weights=step, minlength=n_days) + final_gap
+
+    # a day never runs past midnight: long days are compressed
+    scale = np.minimum(1.0, (_DAY_SEC - 1 - start_sec) / day_span)
+    duration *= scale[event_day]
+    gap *= scale[event_day]
+    day_span *= scale
+
+    # event end offsets: running sum of gap + duration within the day
+    elapsed = np.cumsum(gap + duration)
+    elapsed -= np.repeat(elapsed[first_event] - gap[first_event] - duration[first_event], counts)
+    event_end = start_sec[event_day] + elapsed
+    event_start = event_end - duration
+    end_sec = start_sec + day_span
+
+    # ---- hour buckets of every day (production window and downtime)
+    day_ns = day_dates.astype("datetime64[ns]").view("int64")
+    to_ts = lambda day, sec: (day_ns[day] + np.round(sec * 1e9).astype("int64")).view("datetime64[ns]")
+
+    window_day, window_bucket, monitored = split_by_hour(
+        to_ts(np.arange(n_days), start_sec), to_ts(np.arange(n_days), end_sec)
+    )
+    event_seg, event_bucket, downtime = split_by_hour(
+        to_ts(event_day, event_start), to_ts(event_day, event_end)
+    )
+
+    # cell = day * 24 + hour of day
+    hour_of = lambda day, bucket: (bucket.view("int64") - day_ns[day]) // HOUR_NS
+    window_cell = window_day * 24 + hour_of(window_day, window_bucket)
+    event_cell = event_day[event_seg] * 24 + hour_of(event_day[event_seg], event_bucket)
+
+    downtime_by_cell = np.bincount(event_cell, weights=downtime, minlength=n_days * 24)
+    monitored_h = monitored / 3600
+    downtime_h = np.minimum(downtime_by_cell[window_cell] / 3600, monitored_h)
+    operation_h = monitored_h - downtime_h
+
+    hour_day = window_cell // 24
+    hour_start = window_cell % 24
+
+    rate = rng.gamma(9.0, 480 / 9.0, n_days)
+    gallons = np.round(operation_h * rate[hour_day]).astype("int64")
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        hour_efficiency = np.where(monitored_h > 0, operation_h / monitored_h, 0.0)
+
+    # ---- daily totals
+    monitored_day = day_span / 3600
+    downtime_day = np.bincount(event_day, weights=duration, minlength=n_days) / 3600
+    operation_day = monitored_day - downtime_day
+    gallons_day = np.bincount(hour_day, weights=gallons, minlength=n_days)
+    liters = np.round(gallons_day * 3.785).astype("int64")
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        gallons_per_hour = np.where(operation_day > 0, gallons_day / operation_day, 0.0)
+
+    def partitioned(day_index: np.ndarray, columns: dict) -> pd.DataFrame:
+        owner = line_index[day_index]
+        return pd.DataFrame({
+            "plant_id": plant_ids[owner],
+            "line_id": line_ids[owner],
+            "date": day_dates[day_index],
+            **columns,
+        })
+
+    days = np.arange(n_days)
+
+    downtime_df = partitioned(event_day, {
+        "downtime_id": pd.Series(np.arange(1, n_events + 1)).astype(str).radd("downtime_").to_numpy(),
+        "downtime_start_time": event_start / _DAY_SEC,
+        "downtime_end_time": event_end / _DAY_SEC,
+    })
+
+    hourly_df = partitioned(hour_day, {
+        "hour_start": hour_start,
+        "hour_end": hour_start + 1,
+        "monitored_time_h": monitored_h,
+        "operation_time_h": operation_h,
+        "downtime_h": downtime_h,
+        "efficiency": hour_efficiency,
+    })
+
+    daily_df = partitioned(days, {
+        "product_type_l": np.where(rng.random(n_days) < 0.7, 3, 5),
+        "production_units": liters // 3,
+        "liters_produced": liters,
+        "production_start_time": start_sec / _DAY_SEC,
+        "production_end_time": end_sec / _DAY_SEC,
+        "efficiency": operation_day / monitored_day,
+        "gallons_per_hour": gallons_per_hour,
+        "monitored_time_dec": monitored_day,
+        "operation_time_dec": operation_day,
+        "pause_time_dec": downtime_day,
+    })
+
+    processed_df = partitioned(hour_day, {
+        "hour_start": hour_start,
+        "hour_end": hour_start + 1,
+        "production_gallons": gallons,
+    })
+
+    return {
+        "downtime": _conform(downtime_df, "downtime"),
+        "hourly": _conform(hourly_df, "hourly"),
+        "daily": _conform(daily_df, "daily"),
+        "processed": _conform(processed_df, "processed"),
+    }
+
+
+def write_workbook(sheets: dict, path: str):
+    """
+    Writes generated sheets as an .xlsx workbook readable by prepare_data.
+    """
+    too_large = [key for key, df in sheets.items() if len(df) > EXCEL_MAX_ROWS]
+    if too_large:
+        raise ValueError(
+            f"Sheets {too_large} exceed Excel's {EXCEL_MAX_ROWS} rows; "
+            "pass the sheets to prepare_data(raw_sheets=...) instead"
+        )
+
+    with pd.ExcelWriter(path) as writer:
+        for key, df in sheets.items():
+            df.to_excel(writer, sheet_name=SHEETS[key], index=False)
@@ -0,0 +1,269 @@
+import ast
+import hashlib
+import importlib.util
+import inspect
+import json
+import os
+import sys
+import threading
+
+import pandas as pd
+
+
+"""
+Content-fingerprinted stage cache.
+
+Each stage declares its input files (or in-memory frames), its parameters
+and the files it produces. The fingerprint of a stage is the hash of:
+- the content hash of every input file / frame
+- the parameters
+- the source code of the module defining the stage function and of every
+  project module (CODE_PACKAGE) it imports, transitively (code version)
+
+Fingerprints and the content hashes of the produced files are kept in a
+JSON manifest. A stage is skipped when its fingerprint is unchanged and
+all its outputs still exist with the recorded content. Forced stages
+always run. The cache can be shared by stages running in parallel threads.
+"""
+
+
+ALL_STAGES = "all"
+
+# top-level package of the project code followed by code_modules
+CODE_PACKAGE = "src"
+
+# module name → source files of its transitive project imports
+_CLOSURES = {}
+_CLOSURES_LOCK = threading.Lock()
+
+
+def _sha256_bytes(payload: bytes) -> str:
+    return hashlib.sha256(payload).hexdigest()
+
+
+def fingerprint_frame(df: pd.DataFrame) -> str:
+    """
+    Content hash of a DataFrame (values, index, column names and dtypes).
+    """
+    digest = hashlib.sha256()
+    digest.update(repr(list(zip(df.columns, df.dtypes.astype(str)))).encode("utf-8"))
+    digest.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def _source_file(name: str):
+    # None for packages without code, names that are not modules
+    # ("from src.x import func") and anything outside the project
+    try:
+        spec = importlib.util.find_spec(name)
+    except (ImportError, ValueError):
+        return None
+    if spec is None or not spec.has_location or not spec.origin.endswith(".py"):
+        return None
+    return spec.origin
+
+
+def _project_imports(path: str):
+    with open(path, "rb") as f:
+        tree = ast.parse(f.read(), filename=path)
+
+    # imports anywhere in the file, also the ones local to functions
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+            names = [node.module] + [f"{node.module}.{alias.name}" for alias in node.names]
+        else:
+            continue
+        for name in names:
+            if name.split(".")[0] == CODE_PACKAGE:
+                yield name
+
+
+def code_modules(module) -> list:
+    """
+    Source files of a module (or module name) and of every CODE_PACKAGE
+    module it imports, transitively. Memoized per process.
+    """
+    name = module if isinstance(module, str) else module.__name__
+
+    with _CLOSURES_LOCK:
+        if name in _CLOSURES:
+            return _CLOSURES[name]
+
+        root = (
+            inspect.getsourcefile(sys.modules[name]) if name in sys.modules
+            else _source_file(name)
+        )
+        files, pending = set(), [root]
+        while pending:
+            path = pending.pop()
+            if path is None or path in files:
+                continue
+            files.add(path)
+            pending.extend(_source_file(imported) for imported in _project_imports(path))
+
+        _CLOSURES[name] = sorted(files)
+        return _CLOSURES[name]
+
+
+def code_version(modules) -> str:
+    """
+    Hash of the source files of the given modules (or module names) and
+    of their transitive project imports (code_modules).
+    """
+    files = sorted({path for module in modules for path in code_modules(module)})
+
+    digest = hashlib.sha256()
+    for path in files:
+        with open(path, "rb") as f:
+            source = f.read()
+        digest.update(len(source).to_bytes(8, "little"))
+        digest.update(source)
+    return digest.hexdigest()
+
+
+class StageCache:
+
+    def __init__(self, manifest_path: str, force=(), enabled: bool = True):
+        self.manifest_path = manifest_path
+        self.force = set(force or ())
+        self.enabled = enabled
+        self._manifest = self._load()
+        self._lock = threading.RLock()
+
+    # -----------------------------
+    # Manifest
+    # -----------------------------
+    def _load(self):
+        if not self.enabled or not os.path.exists(self.manifest_path):
+            return {"stages": {}, "files": {}}
+
+        with open(self.manifest_path, encoding="utf-8") as f:
+            manifest = json.load(f)
+
+        manifest.setdefault("stages", {})
+        manifest.setdefault("files", {})
+        return manifest
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.manifest_path), exist_ok=True)
+
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._manifest, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.manifest_path)
+
+    # -----------------------------
+    # Fingerprints
+    # -----------------------------
+    def fingerprint_file(self, path: str):
+        """
+        Content hash of a file, None if it does not exist.
+        Hashes are memoized in the manifest by (size, mtime) so unchanged
+        files are not re-read.
+        """
+        if not os.path.exists(path):
+            return None
+
+        stat = os.stat(path)
+        key = os.path.abspath(path)
+        with self._lock:
+            known = self._manifest["files"].get(key)
+
+        if known and known["size"] == stat.st_size and known["mtime_ns"] == stat.st_mtime_ns:
+            return known["sha256"]
+
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+
+        with self._lock:
+            self._manifest["files"][key] = {
+                "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns,
+                "sha256": digest.hexdigest(),
+            }
+        return digest.hexdigest()
+
+    def stage_fingerprint(self, inputs=(), frames=None, params=None, code=()):
+        payload = {
+            "inputs": {
+                os.path.abspath(path): self.fingerprint_file(path)
+                for path in inputs
+            },
+            "frames": {
+                name: fingerprint_frame(df)
+                for name, df in (frames or {}).items()
+            },
+            "params": {key: repr(value) for key, value in (params or {}).items()},
+            "code": code_version(code),
+        }
+        return _sha256_bytes(json.dumps(payload, sort_keys=True).encode("utf-8"))
+
+    def _outputs_intact(self, recorded: dict) -> bool:
+        return all(
+            self.fingerprint_file(path) == sha256
+            for path, sha256 in recorded.items()
+        )
+
+    # -----------------------------
+    # Stage execution
+    # -----------------------------
+    def is_forced(self, name: str) -> bool:
+        return name in self.force or ALL_STAGES in self.force
+
+    def run_stage(
+        self,
+        name: str,
+        func,
+        kwargs: dict = None,
+        inputs=(),
+        outputs=(),
+        frames: dict = None,
+        params: dict = None,
+        code=()
+    ):
+        """
+        Runs func(**kwargs) unless the stage fingerprint and outputs are
+        unchanged since the recorded run. Returns True if the stage ran.
+
+        The code version covers the module of func and everything it
+        imports from the project; code lists further modules, e.g. ones
+        loaded dynamically.
+        """
+        kwargs = kwargs or {}
+
+        if not self.enabled:
+            func(**kwargs)
+            return True
+
+        modules = [sys.modules[func.__module__], *code]
+        fingerprint = self.stage_fingerprint(inputs, frames, params, modules)
+        with self._lock:
+            recorded = self._manifest["stages"].get(name)
+
+        if (
+            not self.is_forced(name)
+            and recorded is not None
+            and recorded["fingerprint"] == fingerprint
+            and self._outputs_intact(recorded["outputs"])
+        ):
+            print(f"[cache] {name}: inputs unchanged, skipped")
+            return False
+
+        func(**kwargs)
+
+        produced = {
+            os.path.abspath(path): self.fingerprint_file(path)
+            for path in outputs
+        }
+
+        with self._lock:
+            self._manifest["stages"][name] = {
+                "fingerprint": fingerprint,
+                "outputs": produced,
+            }
+            self._save()
+        return True
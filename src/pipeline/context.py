@@ -0,0 +1,54 @@
+import os
+import threading
+
+
+"""
+In-memory pipeline context.
+
+Carries the tables produced by one stage to the next stage without a
+disk round-trip. Tables are addressed like on disk, by (directory, name),
+so stages keep their usual directory arguments:
+- write_table(..., context=ctx) stores the frame in the context and only
+  writes the file when ctx.persist is True
+- read_table(..., context=ctx) serves the frame from the context and
+  falls back to disk (keeping the loaded frame for later readers)
+"""
+
+
+class PipelineContext:
+
+    def __init__(self, persist: bool = True):
+        # persist=False keeps every intermediate table in memory only
+        self.persist = persist
+        self._tables = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(directory: str, name: str):
+        return os.path.abspath(directory), name
+
+    def put(self, directory: str, name: str, df):
+        with self._lock:
+            self._tables[self._key(directory, name)] = df
+
+    def get(self, directory: str, name: str):
+        """
+        Returns the stored frame (a shallow copy, so callers can add or
+        replace columns freely) or None when the table is not held.
+        """
+        with self._lock:
+            df = self._tables.get(self._key(directory, name))
+        return None if df is None else df.copy(deep=False)
+
+    def drop(self, directory: str, name: str):
+        with self._lock:
+            self._tables.pop(self._key(directory, name), None)
+
+    def __contains__(self, key):
+        directory, name = key
+        with self._lock:
+            return self._key(directory, name) in self._tables
+
+    def table_names(self):
+        with self._lock:
+            return sorted(name for _, name in self._tables)
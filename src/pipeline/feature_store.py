@@ -0,0 +1,149 @@
+import os
+import threading
+from collections import OrderedDict
+
+
+"""
+Process-wide store of loaded tables.
+
+read_table (src/data_processing/storage.py) serves every table it loads
+from disk through the store, so analysis, plotting and dashboard code
+requesting the same table by name share one typed frame per process
+instead of re-reading the file.
+
+- Entries are keyed by (directory, name, columns) and tagged with the
+  file's signature (path, size, mtime); a changed file is reloaded on the
+  next request, and write_table drops the entries of the table it
+  rewrites. A column request is served from the held full table when
+  there is one; otherwise only those columns are loaded (pushdown).
+- The held frames stay under a byte budget (DataFrame.memory_usage with
+  deep=True); the least recently used frames are evicted first. A frame
+  larger than the whole budget is returned without being held.
+- Callers get shallow copies, so adding or replacing columns never
+  touches the stored frame.
+
+Safe to use from several threads; process pool workers have their own.
+"""
+
+
+DEFAULT_MAX_BYTES = 512 * 1024 ** 2
+
+
+def file_signature(path: str) -> tuple:
+    stat = os.stat(path)
+    return path, stat.st_size, stat.st_mtime_ns
+
+
+def frame_bytes(df) -> int:
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+class FeatureStore:
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        # key → (signature, frame, size in bytes), least recently used first
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.loads = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _key(directory: str, name: str, columns: list = None):
+        return (
+            os.path.abspath(directory), name,
+            None if columns is None else tuple(columns)
+        )
+
+    def _held(self, key, signature: tuple):
+        entry = self._entries.get(key)
+        if entry is None or entry[0] != signature:
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def get(self, directory: str, name: str, signature: tuple, load, columns: list = None):
+        """
+        The held frame of the table (or of its columns) when its signature
+        matches, otherwise load() is called and its result held (budget
+        permitting). load must read only the requested columns.
+        """
+        key = self._key(directory, name, columns)
+
+        with self._lock:
+            df = self._held(key, signature)
+            if df is None and columns is not None:
+                full = self._held(self._key(directory, name), signature)
+                df = None if full is None else full[list(columns)]
+            if df is not None:
+                self.hits += 1
+                return df.copy(deep=False)
+
+        # loaded outside the lock, so other tables can be served meanwhile
+        df = load()
+        size = frame_bytes(df)
+
+        with self._lock:
+            self.loads += 1
+            self._pop(key)
+            if size <= self.max_bytes:
+                self._entries[key] = (signature, df, size)
+                self._bytes += size
+                self._evict()
+
+        return df.copy(deep=False)
+
+    def invalidate(self, directory: str, name: str):
+        table = self._key(directory, name)[:2]
+        with self._lock:
+            for key in [key for key in self._entries if key[:2] == table]:
+                self._pop(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def resize(self, max_bytes: int):
+        with self._lock:
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def _pop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[2]
+
+    def _evict(self):
+        while self._bytes > self.max_bytes and self._entries:
+            _, (_, _, size) = self._entries.popitem(last=False)
+            self._bytes -= size
+            self.evictions += 1
+
+    @property
+    def held_bytes(self) -> int:
+        return self._bytes
+
+    def summary(self) -> str:
+        with self._lock:
+            return (
+                f"{len(self._entries)} frame(s), {self._bytes / 1024 ** 2:.1f} MB held "
+                f"(budget {self.max_bytes / 1024 ** 2:.0f} MB); "
+                f"{self.hits} hit(s), {self.loads} load(s), {self.evictions} eviction(s)"
+            )
+
+
+_STORE = FeatureStore()
+
+
+def get_feature_store() -> FeatureStore:
+    return _STORE
+
+
+def configure_feature_store(max_bytes: int):
+    """
+    Sets the byte budget of the process-wide store (evicting as needed).
+    """
+    _STORE.resize(max_bytes)
@@ -0,0 +1,263 @@
+import contextvars
+import cProfile
+import functools
+import json
+import os
+import pstats
+import resource
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+
+"""
+Per-stage instrumentation.
+
+Stage functions (prepare_data, the build_* feature builders, the
+analyze_* steps, plots and dashboard) are wrapped with @instrumented;
+each call becomes a span with:
+- wall_sec           elapsed time
+- cpu_sec            CPU time of the calling thread (work of pool threads
+                     is in their own spans, process pool workers are not
+                     measured)
+- rss_peak_mb        peak resident set size of the process at span end,
+                     rss_growth_mb how much the span raised it
+- rows_in / rows_out rows of the tables read / written (read_table,
+                     iter_table, write_table, the raw workbook)
+- bytes_read / bytes_written
+                     file bytes actually touched; tables handed over in
+                     memory or served by the feature store count rows only
+
+Spans nest along the call chain, including DAG nodes run on threads
+(run_dag copies the context into its workers), and rows / bytes are
+added to every enclosing span, so a stage span covers its builders.
+
+The process-wide recorder collects all spans; write_run_report() dumps
+them as JSON. With profiling enabled every outermost span on a thread
+runs under cProfile, and write_profile() merges the profiles into one
+pstats file (e.g. `python -m pstats outputs/pipeline.prof`).
+"""
+
+
+_current_span = contextvars.ContextVar("instrumentation_span", default=None)
+
+
+def _rss_peak_mb() -> float:
+    # ru_maxrss is in KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 ** 2 if sys.platform == "darwin" else peak / 1024
+
+
+class Span:
+
+    def __init__(self, name: str, parent: "Span" = None):
+        self.name = name
+        self.parent = parent
+        self.depth = 0 if parent is None else parent.depth + 1
+        self.thread = threading.current_thread().name
+        self.status = "running"
+        self.started = time.time()
+        self.wall_sec = 0.0
+        self.cpu_sec = 0.0
+        self.rss_peak_mb = 0.0
+        self.rss_growth_mb = 0.0
+        self.rows_in = 0
+        self.rows_out = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+
+    def to_dict(self, origin: float) -> dict:
+        return {
+            "name": self.name,
+            "parent": self.parent.name if self.parent is not None else None,
+            "depth": self.depth,
+            "thread": self.thread,
+            "status": self.status,
+            "start_sec": round(self.started - origin, 4),
+            "wall_sec": round(self.wall_sec, 4),
+            "cpu_sec": round(self.cpu_sec, 4),
+            "rss_peak_mb": round(self.rss_peak_mb, 1),
+            "rss_growth_mb": round(self.rss_growth_mb, 1),
+            "rows_in": self.rows_in,
+            "rows_out": self.rows_out,
+            "bytes_read": self.bytes_read,
+            "bytes_written": self.bytes_written,
+        }
+
+
+class RunRecorder:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.profile = False
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.spans = []
+            self._profiles = []
+            self.started = time.time()
+            self._cpu_start = time.process_time()
+
+    # -----------------------------------------------------
+    # Spans
+    # -----------------------------------------------------
+    @contextmanager
+    def span(self, name: str):
+        span = Span(name, _current_span.get())
+        token = _current_span.set(span)
+        profiler = self._start_profile()
+
+        rss_start = _rss_peak_mb()
+        cpu_start = time.thread_time()
+        wall_start = time.perf_counter()
+        try:
+            yield span
+            span.status = "ok"
+        except BaseException:
+            span.status = "failed"
+            raise
+        finally:
+            span.wall_sec = time.perf_counter() - wall_start
+            span.cpu_sec = time.thread_time() - cpu_start
+            span.rss_peak_mb = _rss_peak_mb()
+            span.rss_growth_mb = span.rss_peak_mb - rss_start
+
+            self._stop_profile(profiler)
+            _current_span.reset(token)
+            with self._lock:
+                self.spans.append(span)
+
+    def add_io(self, rows_in: int = 0, rows_out: int = 0, bytes_read: int = 0, bytes_written: int = 0):
+        """
+        Adds rows / bytes to the current span and every enclosing one.
+        """
+        span = _current_span.get()
+        if span is None:
+            return
+        with self._lock:
+            while span is not None:
+                span.rows_in += rows_in
+                span.rows_out += rows_out
+                span.bytes_read += bytes_read
+                span.bytes_written += bytes_written
+                span = span.parent
+
+    # -----------------------------------------------------
+    # Profiling
+    # -----------------------------------------------------
+    def _start_profile(self):
+        # one profiler per thread: nested spans run under the outer one
+        if not self.profile or getattr(self._local, "profiling", False):
+            return None
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # another profiler is active (interpreters with a single
+            # process-wide profiling slot)
+            return None
+        self._local.profiling = True
+        return profiler
+
+    def _stop_profile(self, profiler):
+        if profiler is None:
+            return
+        profiler.disable()
+        self._local.profiling = False
+        with self._lock:
+            self._profiles.append(profiler)
+
+    def write_profile(self, path: str):
+        """
+        Merges the collected cProfile data into one pstats file.
+        Returns the path, or None when nothing was profiled.
+        """
+        with self._lock:
+            profiles = list(self._profiles)
+        if not profiles:
+            return None
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        pstats.Stats(*profiles).dump_stats(path)
+        return path
+
+    # -----------------------------------------------------
+    # Report
+    # -----------------------------------------------------
+    def report(self, **extra) -> dict:
+        with self._lock:
+            spans = sorted(self.spans, key=lambda s: s.started)
+            return {
+                "started": datetime.fromtimestamp(self.started).isoformat(timespec="seconds"),
+                "wall_sec": round(time.time() - self.started, 4),
+                "cpu_sec": round(time.process_time() - self._cpu_start, 4),
+                "rss_peak_mb": round(_rss_peak_mb(), 1),
+                **extra,
+                "spans": [span.to_dict(self.started) for span in spans],
+            }
+
+    def write_run_report(self, path: str, **extra) -> str:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.report(**extra), f, indent=2)
+        os.replace(tmp_path, path)
+        return path
+
+    def print_summary(self, title: str = "Instrumented steps"):
+        with self._lock:
+            spans = sorted(self.spans, key=lambda s: s.started)
+        if not spans:
+            return
+
+        print(f"\n--- {title} ---")
+        print(
+            f"{'step':<40}{'wall_s':>9}{'cpu_s':>9}{'rss_mb':>9}"
+            f"{'rows_in':>11}{'rows_out':>11}{'read_mb':>9}{'write_mb':>9}"
+        )
+        for span in spans:
+            name = "  " * span.depth + span.name
+            print(
+                f"{name:<40}{span.wall_sec:9.2f}{span.cpu_sec:9.2f}{span.rss_peak_mb:9.0f}"
+                f"{span.rows_in:11d}{span.rows_out:11d}"
+                f"{span.bytes_read / 1024 ** 2:9.1f}{span.bytes_written / 1024 ** 2:9.1f}"
+            )
+
+
+_RECORDER = RunRecorder()
+
+
+def get_recorder() -> RunRecorder:
+    return _RECORDER
+
+
+def span(name: str):
+    return _RECORDER.span(name)
+
+
+def instrumented(func):
+    """
+    Records every call of func as a span named after it.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with _RECORDER.span(func.__name__):
+            return func(*args, **kwargs)
+
+    return wrapper
+
+
+def record_read(rows: int = 0, nbytes: int = 0):
+    _RECORDER.add_io(rows_in=rows, bytes_read=nbytes)
+
+
+def record_write(rows: int = 0, nbytes: int = 0):
+    _RECORDER.add_io(rows_out=rows, bytes_written=nbytes)
+
+
+def file_bytes(*paths) -> int:
+    return sum(os.path.getsize(path) for path in paths if path and os.path.exists(path))
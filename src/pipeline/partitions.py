@@ -0,0 +1,92 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+
+"""
+Parallel map over data partitions (e.g. plant_id x line_id).
+
+partition_map splits every input frame by the partition keys, calls the
+function once per partition with the matching sub-frames and concatenates
+the results. Partitions run on a process pool, so the runtime follows the
+number of cores rather than the number of partitions. A single partition
+is computed in-process without splitting, and so are inputs below
+PARALLEL_MIN_ROWS rows, where starting worker processes costs more than
+it saves.
+
+Functions must be module-level (picklable) and depend on nothing but
+their arguments.
+"""
+
+
+PARALLEL_MIN_ROWS = 100_000
+
+
+def _empty_like(df: pd.DataFrame) -> pd.DataFrame:
+    return df.iloc[:0].copy()
+
+
+def split_partitions(frames: dict, keys: list) -> dict:
+    """
+    partition (tuple of key values) → {frame name: sub-frame}.
+    A partition missing from a frame gets an empty frame with its columns.
+    """
+    parts = {}
+
+    for name, df in frames.items():
+        for part, sub in df.groupby(keys, observed=True, sort=False):
+            parts.setdefault(part, {})[name] = sub
+
+    for part, subs in parts.items():
+        for name, df in frames.items():
+            if name not in subs:
+                subs[name] = _empty_like(df)
+
+    return dict(sorted(parts.items()))
+
+
+def _call(func, frames: dict, kwargs: dict):
+    return func(**frames, **kwargs)
+
+
+def partition_map(
+    func,
+    frames: dict,
+    keys: list,
+    kwargs: dict = None,
+    max_workers: int = None
+) -> pd.DataFrame:
+    """
+    Runs func(**sub_frames, **kwargs) for every partition and returns the
+    concatenated results (partitions in key order).
+    max_workers=1 runs the partitions in-process, one after the other.
+    """
+    kwargs = kwargs or {}
+
+    parts = split_partitions(frames, keys)
+
+    if len(parts) <= 1:
+        return func(**frames, **kwargs)
+
+    max_workers = min(max_workers or os.cpu_count() or 1, len(parts))
+
+    if sum(len(df) for df in frames.values()) < PARALLEL_MIN_ROWS:
+        max_workers = 1
+
+    if max_workers == 1:
+        results = [func(**subs, **kwargs) for subs in parts.values()]
+    else:
+        # spawn: callers may run on scheduler threads, where fork is unsafe
+        with ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context("spawn")
+        ) as pool:
+            futures = [
+                pool.submit(_call, func, subs, kwargs)
+                for subs in parts.values()
+            ]
+            results = [future.result() for future in futures]
+
+    return pd.concat(results, ignore_index=True)
@@ -0,0 +1,173 @@
+import contextvars
+import os
+import time
+import traceback
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+
+
+"""
+Dependency-graph (DAG) scheduler for pipeline stages.
+
+Nodes declare the nodes they depend on; every node whose dependencies
+have succeeded is submitted to a thread or process pool, so independent
+nodes run in parallel. A failing node does not stop unrelated nodes,
+its dependents are reported as skipped.
+
+The report lists status and timing per node and the critical path,
+i.e. the chain of dependent nodes that determined the total runtime.
+
+Process pools need picklable, module-level functions and arguments;
+in-memory objects such as a PipelineContext only work with threads.
+Thread workers run in a copy of the submitting context (contextvars),
+so instrumentation spans nest across the pool.
+"""
+
+
+EXECUTORS = {
+    "thread": ThreadPoolExecutor,
+    "process": ProcessPoolExecutor,
+}
+
+SUCCEEDED = "ok"
+FAILED = "failed"
+SKIPPED = "skipped"
+
+
+class DagNode:
+
+    def __init__(self, name: str, func, kwargs: dict = None, deps=()):
+        self.name = name
+        self.func = func
+        self.kwargs = kwargs or {}
+        self.deps = list(deps)
+
+
+class DagReport:
+
+    def __init__(self):
+        self.status = {}
+        self.start = {}
+        self.end = {}
+        self.errors = {}
+        self.deps = {}
+
+    @property
+    def failed(self):
+        return [name for name, status in self.status.items() if status == FAILED]
+
+    def duration(self, name: str) -> float:
+        if name not in self.start:
+            return 0.0
+        return self.end[name] - self.start[name]
+
+    def critical_path(self):
+        """
+        Longest chain of dependent nodes by summed duration.
+        Returns (node names in run order, total seconds).
+        """
+        best = {}
+
+        def _longest(name):
+            if name not in best:
+                chains = [_longest(dep) for dep in self.deps.get(name, [])]
+                path, total = max(chains, key=lambda c: c[1], default=([], 0.0))
+                best[name] = (path + [name], total + self.duration(name))
+            return best[name]
+
+        return max(
+            (_longest(name) for name in self.status),
+            key=lambda c: c[1],
+            default=([], 0.0)
+        )
+
+    def print_summary(self, title: str = "DAG run"):
+        if not self.status:
+            return
+
+        origin = min(self.start.values(), default=0.0)
+
+        print(f"\n--- {title} ---")
+        print(f"{'node':<34}{'status':<10}{'start_s':>9}{'duration_s':>12}")
+        for name, status in self.status.items():
+            start = self.start.get(name)
+            start_txt = f"{start - origin:9.2f}" if start is not None else f"{'-':>9}"
+            print(f"{name:<34}{status:<10}{start_txt}{self.duration(name):12.2f}")
+
+        path, total = self.critical_path()
+        print(f"Critical path ({total:.2f}s): {' -> '.join(path)}")
+
+        for name, error in self.errors.items():
+            print(f"\n[{name}] failed:\n{error}")
+
+
+def _timed_call(func, kwargs):
+    # Runs inside the worker; wall clock of the worker itself
+    start = time.time()
+    func(**kwargs)
+    return start, time.time()
+
+
+def run_dag(nodes, max_workers: int = None, executor: str = "thread") -> DagReport:
+    """
+    Runs the nodes respecting their dependencies with up to max_workers
+    nodes in parallel (default: CPU count). Returns a DagReport.
+    """
+    if executor not in EXECUTORS:
+        raise ValueError(f"Unknown executor '{executor}', expected one of {list(EXECUTORS)}")
+
+    by_name = {node.name: node for node in nodes}
+    for node in nodes:
+        unknown = [dep for dep in node.deps if dep not in by_name]
+        if unknown:
+            raise ValueError(f"Node '{node.name}' depends on unknown nodes: {unknown}")
+
+    report = DagReport()
+    report.deps = {node.name: node.deps for node in nodes}
+    for node in nodes:
+        report.status[node.name] = None
+
+    pending = dict(by_name)
+    running = {}
+
+    max_workers = max_workers or os.cpu_count() or 1
+
+    with EXECUTORS[executor](max_workers=max_workers) as pool:
+        while pending or running:
+
+            # skip nodes whose upstream failed, submit the ready ones
+            for name, node in list(pending.items()):
+                dep_status = [report.status[dep] for dep in node.deps]
+
+                if any(status in (FAILED, SKIPPED) for status in dep_status):
+                    report.status[name] = SKIPPED
+                    del pending[name]
+
+                elif all(status == SUCCEEDED for status in dep_status):
+                    call = (_timed_call, node.func, node.kwargs)
+                    if executor == "thread":
+                        call = (contextvars.copy_context().run, *call)
+                    running[pool.submit(*call)] = name
+                    del pending[name]
+
+            if not running:
+                if pending:
+                    raise ValueError(f"Dependency cycle between nodes: {sorted(pending)}")
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                name = running.pop(future)
+                try:
+                    report.start[name], report.end[name] = future.result()
+                    report.status[name] = SUCCEEDED
+                except Exception:
+                    report.status[name] = FAILED
+                    report.errors[name] = traceback.format_exc()
+
+    return report
@@ -0,0 +1,392 @@
+import datetime
+import math
+import threading
+import time
+from collections import deque
+
+from src.analysis.downtime_cube import WEEKDAY_LABELS
+from src.data_processing.data_preparation import clock_to_ms
+from src.data_processing.feature_engineering import is_burst_gap
+from src.data_processing.ingest import PARTITION_DEFAULTS, PARTITION_KEYS
+from src.data_processing.intervals import DAY_MS, HOUR_MS, hour_of_day, hour_segments, weekday
+
+
+"""
+Streaming downtime event processor.
+
+Consumes downtime events one at a time (rows with the fields of the
+downtime_event_log sheet: downtime_id, date, downtime_start_time,
+downtime_end_time, optionally plant_id / line_id) and keeps, per
+partition, constant-size state:
+- the previous event end → gap_from_prev_sec and is_burst, as in
+  build_downtime_features (is_burst_gap)
+- the open clock hours of the current production date → per-hour
+  downtime seconds, split with the same [start, end) rule as the
+  event → hour reconciliation (intervals.hour_segments)
+- the last ROLLING_WINDOW_HOURS closed hours as running sums → rolling
+  uptime share mean / std (full window required, as pandas rolling)
+- the weekday x hour downtime cells of the density heatmap
+
+Events are expected in start order per partition (the order a line
+emits them). An hour closes once an event of the same partition starts
+in a later hour, or when the production date changes. Downtime of
+out-of-order events landing in already closed hours is counted as
+late_downtime_sec.
+
+The event feed carries no monitored / operation time, so closed hours
+do not get the hourly_features efficiency (operation / monitored time,
+0.0 for unmonitored hours). They get a stream-only proxy instead:
+uptime_share = 1 - event downtime / 3600, the share of the clock hour
+not covered by downtime events (1.0 for an hour without events, also
+when the line was not running). Its rolling window counts closed hours
+(ROLLING_WINDOW_HOURS), unlike the ROLLING_WINDOW_DAYS production days
+of the batch rolling statistics.
+
+Updates (closed hours, changed heatmap cells, KPI snapshot) are handed
+to the subscribers at most max_latency_sec after the first unreported
+event: either on the next event or on poll(), which event sources call
+while idle.
+"""
+
+
+# Window (in closed hours) of the streamed uptime share statistics;
+# stream-only, not the batch ROLLING_WINDOW_DAYS
+ROLLING_WINDOW_HOURS = 8
+
+# Upper bound (seconds) between an event and the update reporting it
+MAX_LATENCY_SEC = 1.0
+
+_EPOCH = datetime.date(1970, 1, 1)
+
+
+def _day_ms(value):
+    # production date ("YYYY-MM-DD...", date / datetime) → epoch ms of midnight
+    if isinstance(value, datetime.datetime):
+        value = value.date()
+    elif not isinstance(value, datetime.date):
+        value = datetime.date.fromisoformat(str(value).strip()[:10])
+    return (value - _EPOCH).days * DAY_MS
+
+
+def _clock_ms(value) -> int:
+    ms = clock_to_ms(value)
+    if ms is None:
+        raise ValueError(f"Unreadable clock value {value!r}")
+    return ms
+
+
+def parse_event(row: dict) -> dict:
+    """
+    Event row → dict with the partition keys, downtime_id, the production
+    day and downtime_start_ms / downtime_end_ms (int epoch ms). Raises
+    ValueError / TypeError for rows without a readable date or clock.
+    """
+    day = _day_ms(row["date"])
+    event = {
+        col: str(row.get(col) or default)
+        for col, default in PARTITION_DEFAULTS.items()
+    }
+    event["downtime_id"] = row.get("downtime_id")
+    event["day_ms"] = day
+    event["downtime_start_ms"] = day + _clock_ms(row["downtime_start_time"])
+    event["downtime_end_ms"] = day + _clock_ms(row["downtime_end_time"])
+    return event
+
+
+def _iso(ms: int) -> str:
+    return datetime.datetime.fromtimestamp(ms / 1e3, datetime.timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+
+class _RollingStats:
+    """
+    Mean / sample std over the last `window` values from running sums.
+    """
+
+    def __init__(self, window: int):
+        self.values = deque(maxlen=window)
+        self.total = 0.0
+        self.total_sq = 0.0
+
+    def push(self, value: float):
+        if len(self.values) == self.values.maxlen:
+            old = self.values[0]
+            self.total -= old
+            self.total_sq -= old * old
+        self.values.append(value)
+        self.total += value
+        self.total_sq += value * value
+
+    def mean(self):
+        if len(self.values) < self.values.maxlen:
+            return None
+        return self.total / len(self.values)
+
+    def std(self):
+        n = len(self.values)
+        if n < self.values.maxlen or n < 2:
+            return None
+        return math.sqrt(max(self.total_sq - self.total * self.total / n, 0.0) / (n - 1))
+
+
+class _PartitionState:
+
+    def __init__(self, window: int):
+        self.prev_end_ms = None
+        self.prev_start_ms = None
+
+        self.day_ms = None
+        self.open_hours = {}      # bucket start ms → downtime seconds
+        self.next_hour_ms = None  # first hour not yet closed
+
+        self.uptime_share = _RollingStats(window)
+        self.last_hour = None
+
+        self.events = 0
+        self.bursts = 0
+        self.burst_known = 0
+        self.duration_sum = 0.0
+        self.duration_count = 0
+        self.out_of_order = 0
+        self.late_downtime_sec = 0.0
+        self.last_event = None
+
+
+class StreamProcessor:
+    """
+    Incremental downtime features and KPIs over an event stream (module
+    docstring). Safe to feed from one thread while others read snapshots.
+    """
+
+    def __init__(
+        self,
+        window_hours: int = ROLLING_WINDOW_HOURS,
+        max_latency_sec: float = MAX_LATENCY_SEC,
+        clock=time.monotonic
+    ):
+        self.window_hours = window_hours
+        self.max_latency_sec = max_latency_sec
+        self.clock = clock
+
+        self.partitions = {}
+        self.heatmap = {}  # (weekday, hour) → downtime seconds
+        self.rejected = 0
+
+        self._subscribers = []
+        self._lock = threading.RLock()
+        self._reset_pending()
+
+    def _reset_pending(self):
+        self._pending_since = None
+        self._pending_events = 0
+        self._closed_hours = []
+        self._changed_cells = set()
+
+    # -----------------------------------------------------
+    # Subscribers
+    # -----------------------------------------------------
+    def subscribe(self, callback):
+        """
+        callback(update) is called with every emitted update.
+        """
+        with self._lock:
+            self._subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        with self._lock:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
+    # -----------------------------------------------------
+    # Events
+    # -----------------------------------------------------
+    def process(self, row: dict):
+        """
+        Adds one event row; returns its features (the downtime_features
+        columns), or None if the row was rejected.
+        """
+        try:
+            event = parse_event(row)
+        except (KeyError, TypeError, ValueError):
+            with self._lock:
+                self.rejected += 1
+            return None
+
+        with self._lock:
+            features = self._add(event)
+            self._pending_events += 1
+            if self._pending_since is None:
+                self._pending_since = self.clock()
+
+        self.poll()
+        return features
+
+    def _add(self, event: dict) -> dict:
+        part = tuple(event[col] for col in PARTITION_KEYS)
+        state = self.partitions.get(part)
+        if state is None:
+            state = self.partitions[part] = _PartitionState(self.window_hours)
+
+        start, end = event["downtime_start_ms"], event["downtime_end_ms"]
+
+        if state.day_ms is not None and event["day_ms"] != state.day_ms:
+            self._close_hours(part, state, until_ms=None)
+        if state.day_ms != event["day_ms"]:
+            state.day_ms = event["day_ms"]
+            state.next_hour_ms = start - start % HOUR_MS
+
+        # ---- event features (build_downtime_features)
+        duration = (end - start) / 1e3
+        gap = None if state.prev_end_ms is None else (start - state.prev_end_ms) / 1e3
+        is_burst = None if gap is None else bool(is_burst_gap(gap))
+
+        features = {
+            **{col: event[col] for col in PARTITION_KEYS},
+            "downtime_id": event["downtime_id"],
+            "downtime_start_ms": start,
+            "downtime_end_ms": end,
+            "downtime_duration_sec": duration,
+            "downtime_hour": int(hour_of_day(start)),
+            "downtime_weekday": int(weekday(start)),
+            "gap_from_prev_sec": gap,
+            "is_burst": is_burst,
+        }
+
+        if state.prev_start_ms is not None and start < state.prev_start_ms:
+            state.out_of_order += 1
+        else:
+            state.prev_start_ms = start
+        state.prev_end_ms = end
+
+        state.events += 1
+        state.duration_sum += duration
+        state.duration_count += 1
+        if is_burst is not None:
+            state.burst_known += 1
+            state.bursts += is_burst
+        state.last_event = features
+
+        # ---- density heatmap cell of the event start
+        cell = (features["downtime_weekday"], features["downtime_hour"])
+        self.heatmap[cell] = self.heatmap.get(cell, 0.0) + duration
+        self._changed_cells.add(cell)
+
+        # ---- per-hour downtime; hours before this start are final
+        for bucket, seconds in hour_segments(start, end):
+            if bucket < state.next_hour_ms:
+                state.late_downtime_sec += seconds
+            else:
+                state.open_hours[bucket] = state.open_hours.get(bucket, 0.0) + seconds
+
+        self._close_hours(part, state, until_ms=start - start % HOUR_MS)
+        return features
+
+    def _close_hours(self, part: tuple, state: _PartitionState, until_ms):
+        # closes [next_hour_ms, until_ms); until_ms None closes every open hour
+        if until_ms is None:
+            until_ms = max(state.open_hours, default=state.next_hour_ms - HOUR_MS) + HOUR_MS
+
+        bucket = state.next_hour_ms
+        while bucket < until_ms:
+            row = self._hour_row(part, bucket, state.open_hours.pop(bucket, 0.0))
+            state.uptime_share.push(row["uptime_share"])
+            row["uptime_share_rolling_mean"] = state.uptime_share.mean()
+            row["uptime_share_rolling_std"] = state.uptime_share.std()
+            state.last_hour = row
+            self._closed_hours.append(row)
+            bucket += HOUR_MS
+
+        state.next_hour_ms = max(state.next_hour_ms, until_ms)
+
+    @staticmethod
+    def _hour_row(part: tuple, bucket_ms: int, downtime_sec: float) -> dict:
+        # stream-only proxy, not the hourly_features efficiency (module
+        # docstring); overlapping events may cover more than the hour
+        return {
+            **dict(zip(PARTITION_KEYS, part)),
+            "timestamp_start": _iso(bucket_ms),
+            "hour": int(hour_of_day(bucket_ms)),
+            "weekday": int(weekday(bucket_ms)),
+            "downtime_sec": downtime_sec,
+            "uptime_share": max(1.0 - downtime_sec / (HOUR_MS / 1e3), 0.0),
+        }
+
+    # -----------------------------------------------------
+    # Updates
+    # -----------------------------------------------------
+    def poll(self, force: bool = False):
+        """
+        Emits the pending update when it is due (or force); returns it,
+        or None if nothing was emitted.
+        """
+        with self._lock:
+            due = self._pending_since is not None and (
+                force or self.clock() - self._pending_since >= self.max_latency_sec
+            )
+            if not due and not (force and self._closed_hours):
+                return None
+
+            update = {
+                "emitted_at": datetime.datetime.now().isoformat(timespec="milliseconds"),
+                "events": self._pending_events,
+                "hours": self._closed_hours,
+                "heatmap": [
+                    {"weekday": WEEKDAY_LABELS[day], "hour": hour, "downtime_sec": self.heatmap[(day, hour)]}
+                    for day, hour in sorted(self._changed_cells)
+                ],
+                "kpis": self.snapshot(),
+            }
+            self._reset_pending()
+            subscribers = list(self._subscribers)
+
+        for callback in subscribers:
+            callback(update)
+        return update
+
+    def flush(self):
+        """
+        Closes every open hour (end of stream) and emits the final update.
+        """
+        with self._lock:
+            for part, state in self.partitions.items():
+                if state.day_ms is not None:
+                    self._close_hours(part, state, until_ms=None)
+        return self.poll(force=True)
+
+    def snapshot(self) -> dict:
+        """
+        Current KPIs, overall and per partition.
+        """
+        with self._lock:
+            lines = {}
+            for part, state in self.partitions.items():
+                open_hour = state.open_hours.get(state.next_hour_ms, 0.0)
+                lines["/".join(part)] = {
+                    **dict(zip(PARTITION_KEYS, part)),
+                    "events": state.events,
+                    "bursts": state.bursts,
+                    "burst_share": state.bursts / state.burst_known if state.burst_known else None,
+                    "mean_duration_sec": (
+                        state.duration_sum / state.duration_count if state.duration_count else None
+                    ),
+                    "last_gap_sec": state.last_event["gap_from_prev_sec"] if state.last_event else None,
+                    "current_hour": _iso(state.next_hour_ms) if state.next_hour_ms is not None else None,
+                    "current_hour_downtime_sec": open_hour,
+                    "last_hour_uptime_share": state.last_hour["uptime_share"] if state.last_hour else None,
+                    "uptime_share_rolling_mean": state.uptime_share.mean(),
+                    "uptime_share_rolling_std": state.uptime_share.std(),
+                    "out_of_order_events": state.out_of_order,
+                    "late_downtime_sec": state.late_downtime_sec,
+                }
+
+            events = sum(state.events for state in self.partitions.values())
+            bursts = sum(state.bursts for state in self.partitions.values())
+            known = sum(state.burst_known for state in self.partitions.values())
+            durations = sum(state.duration_sum for state in self.partitions.values())
+
+            return {
+                "events": events,
+                "rejected": self.rejected,
+                "burst_share": bursts / known if known else None,
+                "mean_duration_sec": durations / events if events else None,
+                "lines": lines,
+            }
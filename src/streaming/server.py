@@ -0,0 +1,593 @@
+import asyncio
+import base64
+import hashlib
+import json
+import math
+import threading
+from collections import deque
+
+from plotly.offline import get_plotlyjs_version
+
+from src.analysis.downtime_cube import CUBE_TABLE, WEEKDAY_LABELS, rollup
+from src.data_processing.ingest import PARTITION_KEYS
+from src.data_processing.storage import read_table
+from src.streaming.processor import parse_event
+from src.visualization.dashboard import (
+    DARK_COLOR,
+    HEATMAP_COLORSCALE,
+    MAIN_COLOR,
+    _base_layout,
+    _chart_html,
+    _page_html,
+    _select_html,
+)
+
+
+"""
+Live KPI server (asyncio, standard library only).
+
+Serves the live dashboard views from in-memory aggregates (LiveViews)
+fed by the updates of a StreamProcessor:
+- GET /        page with the views (Plotly from the CDN, as the dashboard)
+- GET /state   JSON of every view
+- GET /ws      WebSocket; sends the full state once, then one delta per
+               processor update: new hourly points, changed hour-of-day
+               bars, changed heatmap cells and the KPI snapshot
+
+Browsers extend / restyle their charts in place, nothing is re-rendered
+or reloaded. Each connection has a bounded queue; a client that falls
+that far behind gets a fresh full state instead of the missed deltas.
+
+The aggregates can be seeded from the batch outputs (hourly_features and
+the downtime cube), so the live views continue the dashboard's history.
+The batch efficiency stays a separate series from the streamed uptime
+share proxy, and events already in the seeded history are skipped
+(LiveViews.unseen) so a replay does not count them twice.
+"""
+
+
+# (key, select label, chart title)
+LIVE_VIEWS = [
+    ("hourly_uptime_trend", "Hourly Uptime Share (live)",
+     "Hourly Uptime Share and Rolling Mean (live)"),
+    ("hourly_uptime", "Uptime Share by Hour-of-Day",
+     "Mean Hourly Uptime Share by Hour-of-Day"),
+    ("downtime_density", "Downtime Density Heatmap",
+     "Downtime Density Heatmap (Weekday × Hour)"),
+]
+
+# Hourly points kept per line (older points leave the trend chart)
+MAX_POINTS = 2_000
+
+# Messages queued per WebSocket client before it is resynchronized
+QUEUE_SIZE = 256
+
+# Largest frame accepted from a client (they only send control frames)
+MAX_CLIENT_FRAME = 1 << 16
+
+_WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+
+def _number(value):
+    # JSON has no NaN
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return None
+    return float(value)
+
+
+def _line_label(row: dict) -> str:
+    return "/".join(str(row[col]) for col in PARTITION_KEYS)
+
+
+# =========================================================
+# AGGREGATES
+# =========================================================
+class LiveViews:
+    """
+    In-memory state of the live views; apply() folds in a processor
+    update and returns the matching delta message.
+
+    Streamed hours carry the uptime share proxy (src/streaming/processor.py),
+    not the hourly_features efficiency, so the seeded batch efficiency is
+    kept as separate, static series next to the streamed ones. Heatmap
+    cells are event downtime seconds by start weekday / hour in both, so
+    streamed cells add to the seeded ones.
+    """
+
+    def __init__(self, max_points: int = MAX_POINTS):
+        self.max_points = max_points
+
+        # line → deque of (timestamp, uptime share, rolling mean)
+        self.points = {}
+        # line → {"x": timestamps, "y": efficiency} of hourly_features
+        self.history = {}
+
+        # hour of day → streamed uptime share sum / count
+        self.hour_sum = [0.0] * 24
+        self.hour_count = [0] * 24
+        # hour of day → batch mean efficiency (downtime cube)
+        self.history_hour_mean = [None] * 24
+
+        # (weekday, hour) → downtime seconds; streamed cells are totals
+        # since the start of the stream, added to the seeded history
+        self.seed_cells = {}
+        self.stream_cells = {}
+
+        # line → epoch ms of the last seeded event end (see unseen)
+        self.seeded_until = {}
+        self.skipped_events = 0
+
+        self.kpis = None
+
+    def seed_from_tables(self, featured_dir: str, tables_dir: str, context=None):
+        """
+        Starts the views from the batch outputs: the last hourly_features
+        points per line, the downtime cube's hour / weekday totals and the
+        end of the featured events (unseen skips events up to there).
+        """
+        hourly = read_table(
+            featured_dir, "hourly_features",
+            columns=PARTITION_KEYS + ["timestamp_start", "efficiency"], context=context
+        ).dropna(subset=["timestamp_start", "efficiency"]).sort_values("timestamp_start")
+
+        for part, rows in hourly.groupby(PARTITION_KEYS, observed=True, sort=False):
+            rows = rows.tail(self.max_points)
+            self.history["/".join(map(str, part))] = {
+                "x": rows["timestamp_start"].dt.strftime("%Y-%m-%d %H:%M:%S").tolist(),
+                "y": [_number(value) for value in rows["efficiency"]],
+            }
+
+        events = read_table(
+            featured_dir, "downtime_features",
+            columns=PARTITION_KEYS + ["downtime_end_ms"], context=context
+        )
+        last_end = events.groupby(PARTITION_KEYS, observed=True)["downtime_end_ms"].max()
+        self.seeded_until = {
+            "/".join(map(str, part)): int(end) for part, end in last_end.items()
+        }
+
+        cube = read_table(tables_dir, CUBE_TABLE, context=context)
+
+        by_hour = rollup(cube, ["hour"])
+        for hour, mean in zip(by_hour["hour"], by_hour["mean_efficiency"]):
+            self.history_hour_mean[int(hour)] = _number(mean)
+
+        cells = rollup(cube[cube["downtime_event_count"] > 0], ["weekday", "hour"])
+        for day, hour, seconds in zip(cells["weekday"], cells["hour"], cells["downtime_sec_sum"]):
+            self.seed_cells[(int(day), int(hour))] = float(seconds)
+
+    def unseen(self, rows):
+        """
+        Passes the rows of an event source on, dropping events that start
+        before the end of the seeded history of their line: replaying
+        events the batch outputs already hold would count them twice.
+        """
+        for row in rows:
+            if row is not None and self.seeded_until:
+                try:
+                    event = parse_event(row)
+                except (KeyError, TypeError, ValueError):
+                    event = None  # rejected (and counted) by the processor
+
+                if event is not None:
+                    until = self.seeded_until.get(_line_label(event))
+                    if until is not None and event["downtime_start_ms"] < until:
+                        if self.skipped_events == 0:
+                            print("Skipping events already in the seeded history")
+                        self.skipped_events += 1
+                        continue
+            yield row
+
+    # -----------------------------------------------------
+    # Views
+    # -----------------------------------------------------
+    def _mean_uptime_share(self, hour: int):
+        count = self.hour_count[hour]
+        return self.hour_sum[hour] / count if count else None
+
+    def _cell(self, day: int, hour: int):
+        if (day, hour) not in self.seed_cells and (day, hour) not in self.stream_cells:
+            return None
+        return self.seed_cells.get((day, hour), 0.0) + self.stream_cells.get((day, hour), 0.0)
+
+    @staticmethod
+    def _series(points) -> dict:
+        return {
+            "x": [ts for ts, _, _ in points],
+            "y": [_number(share) for _, share, _ in points],
+            "rolling": [_number(mean) for _, _, mean in points],
+        }
+
+    def state(self) -> dict:
+        return {
+            "type": "state",
+            "max_points": self.max_points,
+            "history": self.history,
+            "lines": {line: self._series(points) for line, points in self.points.items()},
+            "history_hour_of_day": self.history_hour_mean,
+            "hour_of_day": [self._mean_uptime_share(hour) for hour in range(24)],
+            "heatmap": [
+                [self._cell(day, hour) for hour in range(24)]
+                for day in range(len(WEEKDAY_LABELS))
+            ],
+            "kpis": self.kpis,
+        }
+
+    def apply(self, update: dict) -> dict:
+        new_points = {}
+        hours = set()
+
+        for row in update["hours"]:
+            line = _line_label(row)
+            point = (row["timestamp_start"], row["uptime_share"], row["uptime_share_rolling_mean"])
+            self.points.setdefault(line, deque(maxlen=self.max_points)).append(point)
+            new_points.setdefault(line, []).append(point)
+
+            self.hour_sum[row["hour"]] += row["uptime_share"]
+            self.hour_count[row["hour"]] += 1
+            hours.add(row["hour"])
+
+        cells = []
+        for cell in update["heatmap"]:
+            day = WEEKDAY_LABELS.index(cell["weekday"])
+            self.stream_cells[(day, cell["hour"])] = cell["downtime_sec"]
+            cells.append({"weekday": day, "hour": cell["hour"], "downtime_sec": self._cell(day, cell["hour"])})
+
+        self.kpis = update["kpis"]
+
+        return {
+            "type": "delta",
+            "lines": {line: self._series(points) for line, points in new_points.items()},
+            "hour_of_day": [
+                {"hour": hour, "mean_uptime_share": self._mean_uptime_share(hour)}
+                for hour in sorted(hours)
+            ],
+            "heatmap": cells,
+            "kpis": self.kpis,
+        }
+
+
+# =========================================================
+# PAGE
+# =========================================================
+def _live_page() -> str:
+    base_layout = _base_layout(LIVE_VIEWS[0][2])
+    layouts = [
+        dict(base_layout, yaxis=dict(base_layout["yaxis"], title="Share of Hour")),
+        dict(base_layout, title=dict(text=LIVE_VIEWS[1][2], x=0.5), barmode="group",
+             xaxis=dict(base_layout["xaxis"], title="Hour of Day", type="category"),
+             yaxis=dict(base_layout["yaxis"], title="Mean Share of Hour")),
+        dict(base_layout, title=dict(text=LIVE_VIEWS[2][2], x=0.5),
+             xaxis=dict(base_layout["xaxis"], title="Hour of Day", type="category"),
+             yaxis=dict(base_layout["yaxis"], title="Weekday", type="category")),
+    ]
+
+    charts = "\n".join(
+        f'<div id="view{i}" style="display:{"block" if i == 0 else "none"};"></div>'
+        for i in range(len(LIVE_VIEWS))
+    )
+    plot_html = (
+        f'<script src="https://cdn.plot.ly/plotly-{get_plotlyjs_version()}.min.js" '
+        'charset="utf-8"></script>\n'
+        f'<div id="kpis" style="color:{DARK_COLOR}; text-align:center; margin-bottom:10px;">'
+        'connecting…</div>\n'
+        + charts
+    )
+
+    script = f"""const LAYOUTS = {json.dumps(layouts, ensure_ascii=False)};
+const WEEKDAYS = {json.dumps(WEEKDAY_LABELS)};
+const HOURS = Array.from({{length: 24}}, (_, h) => String(h));
+const MAIN_COLOR = "{MAIN_COLOR}";
+const DARK_COLOR = "{DARK_COLOR}";
+
+let maxPoints = {MAX_POINTS};
+let lineTraces = {{}};    // line → index of its uptime share trace (rolling mean follows)
+let hourOfDay = [];
+let heatmap = [];
+
+function fmt(value, digits) {{
+    return value === null || value === undefined ? "–" : value.toFixed(digits);
+}}
+
+function showKpis(kpis) {{
+    if (!kpis) return;
+    const share = kpis.burst_share === null ? "–" : (100 * kpis.burst_share).toFixed(1) + " %";
+    const rows = [`events ${{kpis.events}} · burst share ${{share}} · ` +
+                  `mean duration ${{fmt(kpis.mean_duration_sec, 1)}} s · rejected ${{kpis.rejected}}`];
+    for (const [line, k] of Object.entries(kpis.lines)) {{
+        rows.push(`${{line}}: uptime share (last hour) ${{fmt(k.last_hour_uptime_share, 3)}}, ` +
+                  `rolling ${{fmt(k.uptime_share_rolling_mean, 3)}} ± ${{fmt(k.uptime_share_rolling_std, 3)}}, ` +
+                  `current hour downtime ${{fmt(k.current_hour_downtime_sec, 0)}} s`);
+    }}
+    // line ids come from the event feed: text nodes only, never markup
+    document.getElementById("kpis").replaceChildren(...rows.map(text => {{
+        const row = document.createElement("div");
+        row.textContent = text;
+        return row;
+    }}));
+}}
+
+function historyTrace(line, series) {{
+    return {{x: series.x, y: series.y, mode: "lines", name: line + " efficiency (batch)",
+             line: {{color: DARK_COLOR, width: 1}}, opacity: 0.4}};
+}}
+
+function lineTracePair(line, series) {{
+    return [
+        {{x: series.x, y: series.y, mode: "lines+markers", name: line + " uptime share",
+          line: {{color: MAIN_COLOR, width: 2}}}},
+        {{x: series.x, y: series.rolling, mode: "lines", name: line + " rolling mean",
+          line: {{color: DARK_COLOR, width: 2, dash: "dash"}}}},
+    ];
+}}
+
+function drawState(state) {{
+    maxPoints = state.max_points;
+    lineTraces = {{}};
+    let traces = Object.entries(state.history).map(([line, series]) => historyTrace(line, series));
+    for (const [line, series] of Object.entries(state.lines)) {{
+        lineTraces[line] = traces.length;
+        traces.push(...lineTracePair(line, series));
+    }}
+    Plotly.react("view0", traces, LAYOUTS[0], {{responsive: true}});
+
+    hourOfDay = state.hour_of_day;
+    Plotly.react("view1", [
+        {{x: HOURS, y: state.history_hour_of_day, type: "bar", marker: {{color: DARK_COLOR}},
+          opacity: 0.4, name: "Mean Efficiency (batch)"}},
+        {{x: HOURS, y: hourOfDay, type: "bar", marker: {{color: MAIN_COLOR}},
+          name: "Mean Uptime Share (stream)"}},
+    ], LAYOUTS[1], {{responsive: true}});
+
+    heatmap = state.heatmap;
+    Plotly.react("view2", [{{z: heatmap, x: HOURS, y: WEEKDAYS, type: "heatmap",
+                             colorscale: {json.dumps(HEATMAP_COLORSCALE)},
+                             colorbar: {{title: "Total Downtime (sec)"}}}}], LAYOUTS[2], {{responsive: true}});
+    showKpis(state.kpis);
+}}
+
+function applyDelta(delta) {{
+    for (const [line, series] of Object.entries(delta.lines)) {{
+        if (!(line in lineTraces)) {{
+            lineTraces[line] = document.getElementById("view0").data.length;
+            Plotly.addTraces("view0", lineTracePair(line, series));
+            continue;
+        }}
+        const i = lineTraces[line];
+        Plotly.extendTraces("view0", {{x: [series.x, series.x], y: [series.y, series.rolling]}},
+                            [i, i + 1], maxPoints);
+    }}
+
+    if (delta.hour_of_day.length) {{
+        for (const bar of delta.hour_of_day) hourOfDay[bar.hour] = bar.mean_uptime_share;
+        Plotly.restyle("view1", {{y: [hourOfDay]}}, [1]);
+    }}
+
+    if (delta.heatmap.length) {{
+        for (const cell of delta.heatmap) heatmap[cell.weekday][cell.hour] = cell.downtime_sec;
+        Plotly.restyle("view2", {{z: [heatmap]}});
+    }}
+    showKpis(delta.kpis);
+}}
+
+function updateChart() {{
+    const val = parseInt(document.getElementById("metricSelect").value);
+    LAYOUTS.forEach((_, i) => {{
+        document.getElementById("view" + i).style.display = i === val ? "block" : "none";
+    }});
+    Plotly.Plots.resize("view" + val);
+}}
+
+function connect() {{
+    const socket = new WebSocket((location.protocol === "https:" ? "wss://" : "ws://") + location.host + "/ws");
+    socket.onmessage = event => {{
+        const message = JSON.parse(event.data);
+        if (message.type === "state") drawState(message);
+        else applyDelta(message);
+    }};
+    // the server sends the full state again after a reconnect
+    socket.onclose = () => {{
+        document.getElementById("kpis").textContent = "disconnected, retrying…";
+        setTimeout(connect, 2000);
+    }};
+}}
+
+connect();"""
+
+    return _page_html(
+        _select_html("updateChart()", LIVE_VIEWS) + "\n\n" + _chart_html(plot_html),
+        script
+    )
+
+
+# =========================================================
+# SERVER
+# =========================================================
+def _frame(payload: bytes, opcode: int = 0x1) -> bytes:
+    # single unmasked server frame (FIN set)
+    size = len(payload)
+    if size < 126:
+        header = bytes([0x80 | opcode, size])
+    elif size < 1 << 16:
+        header = bytes([0x80 | opcode, 126]) + size.to_bytes(2, "big")
+    else:
+        header = bytes([0x80 | opcode, 127]) + size.to_bytes(8, "big")
+    return header + payload
+
+
+async def _read_frame(reader: asyncio.StreamReader) -> tuple:
+    first, second = await reader.readexactly(2)
+    opcode = first & 0x0F
+    size = second & 0x7F
+    if size == 126:
+        size = int.from_bytes(await reader.readexactly(2), "big")
+    elif size == 127:
+        size = int.from_bytes(await reader.readexactly(8), "big")
+    if size > MAX_CLIENT_FRAME:
+        raise ConnectionError(f"client frame of {size} bytes")
+
+    mask = await reader.readexactly(4) if second & 0x80 else None
+    payload = await reader.readexactly(size)
+    if mask:
+        payload = bytes(byte ^ mask[i % 4] for i, byte in enumerate(payload))
+    return opcode, payload
+
+
+def _http_response(status: str, body: bytes, content_type: str) -> bytes:
+    return (
+        f"HTTP/1.1 {status}\r\n"
+        f"Content-Type: {content_type}\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        "Cache-Control: no-store\r\n"
+        "Connection: close\r\n\r\n"
+    ).encode("latin-1") + body
+
+
+class LiveKpiServer:
+    """
+    HTTP / WebSocket front of a LiveViews instance (module docstring).
+    publish() may be called from any thread, e.g. as a StreamProcessor
+    subscriber.
+    """
+
+    def __init__(self, views: LiveViews, host: str = "127.0.0.1", port: int = 8050):
+        self.views = views
+        self.host = host
+        self.port = port
+
+        self._page = _live_page().encode("utf-8")
+        self._clients = set()
+        self._loop = None
+        self._server = None
+
+    async def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        print(f"Live dashboard: http://{self.host}:{self.port}/")
+
+    def close(self):
+        if self._server is not None:
+            self._server.close()
+
+    # -----------------------------------------------------
+    # Updates
+    # -----------------------------------------------------
+    def publish(self, update: dict):
+        if self._loop is None or self._loop.is_closed():
+            return
+        try:
+            self._loop.call_soon_threadsafe(self._broadcast, update)
+        except RuntimeError:
+            pass  # loop shutting down
+
+    def _broadcast(self, update: dict):
+        message = json.dumps(self.views.apply(update), separators=(",", ":"))
+
+        for queue in self._clients:
+            if queue.full():
+                # too far behind for deltas: start it over from the state
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(json.dumps(self.views.state(), separators=(",", ":")))
+            else:
+                queue.put_nowait(message)
+
+    # -----------------------------------------------------
+    # Connections
+    # -----------------------------------------------------
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request = await reader.readuntil(b"\r\n\r\n")
+            lines = request.decode("latin-1").split("\r\n")
+            method, path, _ = (lines[0].split(" ") + ["", ""])[:3]
+            headers = {
+                name.strip().lower(): value.strip()
+                for name, _, value in (line.partition(":") for line in lines[1:] if line)
+            }
+            path = path.split("?", 1)[0]
+
+            if method != "GET":
+                writer.write(_http_response("405 Method Not Allowed", b"", "text/plain"))
+            elif path == "/":
+                writer.write(_http_response("200 OK", self._page, "text/html; charset=utf-8"))
+            elif path == "/state":
+                body = json.dumps(self.views.state(), separators=(",", ":")).encode("utf-8")
+                writer.write(_http_response("200 OK", body, "application/json"))
+            elif path == "/ws" and headers.get("upgrade", "").lower() == "websocket":
+                await self._websocket(reader, writer, headers)
+            else:
+                writer.write(_http_response("404 Not Found", b"not found", "text/plain"))
+            await writer.drain()
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _websocket(self, reader, writer, headers: dict):
+        key = headers.get("sec-websocket-key", "")
+        accept = base64.b64encode(hashlib.sha1((key + _WS_GUID).encode("ascii")).digest()).decode("ascii")
+        writer.write(
+            "HTTP/1.1 101 Switching Protocols\r\n"
+            "Upgrade: websocket\r\n"
+            "Connection: Upgrade\r\n"
+            f"Sec-WebSocket-Accept: {accept}\r\n\r\n".encode("ascii")
+        )
+
+        queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        queue.put_nowait(json.dumps(self.views.state(), separators=(",", ":")))
+        self._clients.add(queue)
+
+        async def send():
+            while True:
+                message = await queue.get()
+                writer.write(_frame(message.encode("utf-8")))
+                await writer.drain()
+
+        async def receive():
+            while True:
+                opcode, payload = await _read_frame(reader)
+                if opcode == 0x8:    # close
+                    writer.write(_frame(payload[:2], opcode=0x8))
+                    return
+                if opcode == 0x9:    # ping
+                    writer.write(_frame(payload, opcode=0xA))
+
+        tasks = [asyncio.ensure_future(send()), asyncio.ensure_future(receive())]
+        try:
+            await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            self._clients.discard(queue)
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def _serve(processor, run_source, server: LiveKpiServer, stop):
+    await server.start()
+    server.views.kpis = processor.snapshot()
+    processor.subscribe(server.publish)
+
+    loop = asyncio.get_running_loop()
+    try:
+        await loop.run_in_executor(None, run_source)
+        print("Event source ended; still serving (Ctrl+C to stop)")
+        await asyncio.Event().wait()
+    finally:
+        stop.set()
+        processor.unsubscribe(server.publish)
+        server.close()
+
+
+def serve_live(processor, run_source, address: str, views: LiveViews = None, stop=None):
+    """
+    Runs run_source() (feeding processor) on a worker thread and serves
+    the live views on address ("host:port") until interrupted; stop
+    (threading.Event) is set on the way out so the source can end.
+    """
+    host, port = address.rsplit(":", 1)
+    server = LiveKpiServer(views or LiveViews(), host, int(port))
+    stop = stop or threading.Event()
+    try:
+        asyncio.run(_serve(processor, run_source, server, stop))
+    except KeyboardInterrupt:
+        stop.set()
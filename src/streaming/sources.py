@@ -0,0 +1,213 @@
+import csv
+import json
+import os
+import selectors
+import socket
+import time
+
+from src.data_processing.ingest import SHEET_SCHEMAS
+
+
+"""
+Event sources for the streaming processor.
+
+Both sources yield event rows (dicts keyed like the downtime_event_log
+sheet) and yield None whenever no event arrived for poll_sec, so the
+consumer can emit due updates while the line is quiet.
+
+Lines are either JSON objects or CSV. A CSV line naming
+downtime_start_time is taken as the header of the lines after it;
+without a header the sheet's column order (EVENT_FIELDS) applies.
+
+- tail_file    follows a file as it grows (optionally from its start),
+               reopening it when it is truncated or replaced
+- socket_lines accepts any number of local TCP producers, one event per
+               line (e.g. `nc 127.0.0.1 9009 < events.csv`)
+"""
+
+
+EVENT_FIELDS = list(SHEET_SCHEMAS["downtime"])
+
+POLL_SEC = 0.2
+
+_HEADER_MARK = "downtime_start_time"
+
+
+class _LineParser:
+    """
+    Text lines → event rows, remembering the CSV header of its stream.
+    """
+
+    def __init__(self):
+        self.fields = EVENT_FIELDS
+
+    def parse(self, line: str):
+        line = line.strip()
+        if not line:
+            return None
+
+        if line.startswith("{"):
+            try:
+                return json.loads(line)
+            except json.JSONDecodeError:
+                return {}
+
+        values = next(csv.reader([line]))
+        if _HEADER_MARK in values:
+            self.fields = [value.strip() for value in values]
+            return None
+        return {
+            field: (value.strip() or None)
+            for field, value in zip(self.fields, values)
+        }
+
+
+def _file_id(path: str):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_dev, stat.st_ino
+
+
+def tail_file(
+    path: str,
+    from_start: bool = True,
+    follow: bool = True,
+    poll_sec: float = POLL_SEC,
+    stop=None
+):
+    """
+    Yields the event rows of a growing file; None while idle.
+    follow=False stops at the end of the file (replay); stop is an
+    optional threading.Event ending the tail.
+    """
+    parser = _LineParser()
+
+    while not os.path.exists(path):
+        if not follow or (stop is not None and stop.is_set()):
+            return
+        yield None
+        time.sleep(poll_sec)
+
+    f = open(path, "r", newline="")
+    identity = _file_id(path)
+    if not from_start:
+        # keep the header of an existing file, skip its rows
+        parser.parse(f.readline())
+        f.seek(0, os.SEEK_END)
+
+    partial = ""
+    try:
+        while stop is None or not stop.is_set():
+            line = f.readline()
+
+            if line.endswith("\n"):
+                row = parser.parse(partial + line)
+                partial = ""
+                if row is not None:
+                    yield row
+                continue
+
+            # no complete line yet
+            partial += line
+            if not follow:
+                if partial:
+                    row = parser.parse(partial)
+                    if row is not None:
+                        yield row
+                return
+
+            if _file_id(path) != identity or os.path.getsize(path) < f.tell():
+                # rotated or truncated: start over with the new content
+                f.close()
+                f = open(path, "r", newline="")
+                identity = _file_id(path)
+                parser = _LineParser()
+                partial = ""
+                continue
+
+            yield None
+            time.sleep(poll_sec)
+    finally:
+        f.close()
+
+
+def socket_lines(
+    host: str = "127.0.0.1",
+    port: int = 9009,
+    poll_sec: float = POLL_SEC,
+    stop=None
+):
+    """
+    Listens on host:port and yields the event rows sent by any connected
+    producer; None while idle. Runs until stop (threading.Event) is set.
+    """
+    selector = selectors.DefaultSelector()
+    server = socket.create_server((host, port), reuse_port=False)
+    server.setblocking(False)
+    selector.register(server, selectors.EVENT_READ)
+    print(f"Listening for events on {host}:{port}")
+
+    # connection → (parser, unfinished line)
+    clients = {}
+
+    try:
+        while stop is None or not stop.is_set():
+            ready = selector.select(timeout=poll_sec)
+            if not ready:
+                yield None
+                continue
+
+            for key, _ in ready:
+                if key.fileobj is server:
+                    conn, _ = server.accept()
+                    conn.setblocking(False)
+                    selector.register(conn, selectors.EVENT_READ)
+                    clients[conn] = (_LineParser(), b"")
+                    continue
+
+                conn = key.fileobj
+                parser, buffer = clients[conn]
+                try:
+                    data = conn.recv(1 << 16)
+                except ConnectionError:
+                    data = b""
+
+                if not data:
+                    # producer closed: its last line may lack a newline
+                    selector.unregister(conn)
+                    conn.close()
+                    del clients[conn]
+                    lines = [buffer] if buffer else []
+                else:
+                    *lines, buffer = (buffer + data).split(b"\n")
+                    clients[conn] = (parser, buffer)
+
+                for line in lines:
+                    row = parser.parse(line.decode("utf-8", errors="replace"))
+                    if row is not None:
+                        yield row
+    finally:
+        for conn in clients:
+            conn.close()
+        selector.close()
+        server.close()
+
+
+def run_stream(source, processor, on_event=None):
+    """
+    Feeds the rows of a source into a StreamProcessor, polling it while
+    idle; flushes it when the source ends. on_event(features) is called
+    for every accepted event.
+    """
+    for row in source:
+        if row is None:
+            processor.poll()
+            continue
+
+        features = processor.process(row)
+        if features is not None and on_event is not None:
+            on_event(features)
+
+    processor.flush()
@@ -1,7 +1,28 @@
+import hashlib
+import json
 import os
-import pandas as pd
+import numpy as np
 import plotly.graph_objects as go
 import plotly.io as pio
+from plotly.offline import get_plotlyjs_version
+
+from src.analysis.downtime_cube import CUBE_TABLE, weekday_hour_downtime
+from src.data_processing.storage import read_table
+from src.pipeline.instrumentation import file_bytes, instrumented, record_write
+
+
+"""
+Interactive dashboard (docs/index.html).
+
+Two build modes:
+- inline (default): every view's trace and data are embedded in the page,
+  the select box toggles trace visibility.
+- lazy: each view is written to its own JSON sidecar (docs/views/<view>.json);
+  the page only holds the select box and fetches a view the first time it
+  is selected, then keeps it in a client-side cache. Sidecars are fetched
+  over HTTP, so lazy pages need to be served (e.g. GitHub Pages or
+  `python -m http.server`), not opened from the file system.
+"""
 
 
 # -----------------------------
@@ -19,140 +40,198 @@ HEATMAP_COLORSCALE = [
     [1.0, "#3E7C7C"],
 ]
 
+# -----------------------------
+# Views (select box order)
+# -----------------------------
+# (key, select label, chart title)
+VIEWS = [
+    ("daily_efficiency", "Daily Efficiency Trend",
+     "Daily Efficiency Trend"),
+    ("hourly_efficiency", "Hourly Efficiency by Hour-of-Day",
+     "Mean Hourly Efficiency by Hour-of-Day"),
+    ("throughput_vs_downtime", "Throughput vs Downtime Ratio",
+     "Throughput vs Downtime Ratio (per Hour)"),
+    ("pause_ratio", "Daily Pause Ratio Trend",
+     "Daily Pause Ratio Trend"),
+    ("downtime_duration", "Downtime Duration Statistics",
+     "Downtime Duration Statistics"),
+    ("downtime_density", "Downtime Density Heatmap",
+     "Downtime Density Heatmap (Weekday × Hour)"),
+    ("reconciliation", "Event-Level Downtime Reconciliation",
+     "Event-Level vs Hourly Downtime Reconciliation Gap"),
+]
 
-def build_manufacturing_dashboard(
-    featured_dir: str,
-    tables_dir: str,
-    output_html_path: str
-):
+HEATMAP_VIEW = 5
+
+VIEWS_DIRNAME = "views"
+
+# -----------------------------
+# Large-N point traces
+# -----------------------------
+# Up to WEBGL_MIN_POINTS points are drawn as SVG markers, up to
+# DENSITY_MIN_POINTS with WebGL; beyond that the points are binned
+# into a DENSITY_BINS x DENSITY_BINS count heatmap, so the HTML size stays
+# bounded by the grid instead of the history length.
+WEBGL_MIN_POINTS   = 5_000
+DENSITY_MIN_POINTS = 200_000
+DENSITY_BINS       = 100
+
+
+def _point_trace(x, y, name: str, marker: dict, visible: bool = False):
+
+    if len(x) <= WEBGL_MIN_POINTS:
+        return go.Scatter(
+            x=x, y=y, mode="markers", name=name, marker=marker, visible=visible
+        )
+
+    if len(x) <= DENSITY_MIN_POINTS:
+        return go.Scattergl(
+            x=x, y=y, mode="markers", name=name, marker=marker, visible=visible
+        )
+
+    counts, x_edges, y_edges = np.histogram2d(
+        np.asarray(x, dtype="float64"),
+        np.asarray(y, dtype="float64"),
+        bins=DENSITY_BINS
+    )
+    counts[counts == 0] = np.nan  # empty cells stay transparent
+
+    return go.Heatmap(
+        z=counts.T,
+        x=(x_edges[:-1] + x_edges[1:]) / 2,
+        y=(y_edges[:-1] + y_edges[1:]) / 2,
+        colorscale=HEATMAP_COLORSCALE,
+        colorbar=dict(title="Points"),
+        hovertemplate="x: %{x:.3g}<br>y: %{y:.3g}<br>points: %{z}<extra></extra>",
+        name=name,
+        visible=visible
+    )
+
+
+def view_path(output_html_path: str, key: str) -> str:
+    """
+    Sidecar JSON of a view in lazy mode (next to the dashboard HTML).
+    """
+    return os.path.join(
+        os.path.dirname(output_html_path), VIEWS_DIRNAME, f"{key}.json"
+    )
 
-    os.makedirs(os.path.dirname(output_html_path), exist_ok=True)
+
+# -----------------------------
+# Traces
+# -----------------------------
+def _build_traces(featured_dir: str, tables_dir: str, context=None) -> list:
+    """
+    One trace per entry of VIEWS, in the same order. Only the first one
+    is visible; the heatmap is placed on the dedicated x2 / y2 axes.
+    """
 
     # -----------------------------
     # Load data
     # -----------------------------
-    daily_df = pd.read_csv(
-        os.path.join(featured_dir, "daily_features.csv"),
-        parse_dates=["date"]
+    daily_df = read_table(
+        featured_dir, "daily_features", context=context
     ).sort_values("date")
 
-    hourly_density_df = pd.read_csv(
-        os.path.join(tables_dir, "hourly_downtime_density.csv")
+    hourly_density_df = read_table(
+        tables_dir, "hourly_downtime_density", context=context
     )
 
-    hourly_df = pd.read_csv(
-        os.path.join(featured_dir, "hourly_features.csv"),
-        parse_dates=["timestamp_start"]
+    hourly_df = read_table(
+        featured_dir, "hourly_features", context=context
     ).dropna(subset=["throughput_per_hour", "downtime_ratio"])
 
-    downtime_df = pd.read_csv(
-        os.path.join(featured_dir, "downtime_features.csv"),
-        parse_dates=["downtime_start_ts"]
+    downtime_dur_summary = read_table(
+        tables_dir, "downtime_duration_summary", context=context
     )
 
-    downtime_dur_summary = pd.read_csv(
-        os.path.join(tables_dir, "downtime_duration_summary.csv")
-    )
-
-    reconciliation_df = pd.read_csv(
-        os.path.join(featured_dir, "event_hour_reconciliation.csv"),
-        parse_dates=["timestamp_start"]
+    reconciliation_df = read_table(
+        featured_dir, "event_hour_reconciliation", context=context
     ).dropna(subset=["event_vs_hour_downtime_diff_sec"]).sort_values("timestamp_start")
 
     # -----------------------------
-    # Downtime density pivot (weekday x hour)
+    # Downtime density pivot (weekday x hour), from the aggregate cube
     # -----------------------------
-    downtime_df["hour"] = downtime_df["downtime_start_ts"].dt.hour
-    downtime_df["weekday"] = downtime_df["downtime_start_ts"].dt.dayofweek
-
-    pivot = (
-        downtime_df.groupby(["weekday", "hour"])["downtime_duration_sec"]
-        .sum()
-        .unstack(fill_value=0)
+    pivot = weekday_hour_downtime(
+        read_table(tables_dir, CUBE_TABLE, context=context)
     )
-    day_labels = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"][: len(pivot)]
 
-    # -----------------------------
-    # Build Figure
-    # -----------------------------
-    fig = go.Figure()
-
-    # 0 — Daily Efficiency Trend
-    fig.add_trace(go.Scatter(
-        x=daily_df["date"].astype(str),
-        y=daily_df["efficiency"],
-        mode="lines+markers",
-        name="Daily Efficiency Trend",
-        line=dict(color=MAIN_COLOR, width=3),
-        visible=True
-    ))
-
-    # 1 — Hourly Efficiency by Hour-of-Day
-    fig.add_trace(go.Bar(
-        x=hourly_density_df["hour"].astype(str),
-        y=hourly_density_df["mean_efficiency"],
-        name="Mean Hourly Efficiency",
-        marker_color=MAIN_COLOR,
-        visible=False
-    ))
-
-    # 2 — Throughput vs Downtime Ratio scatter
-    fig.add_trace(go.Scatter(
-        x=hourly_df["downtime_ratio"],
-        y=hourly_df["throughput_per_hour"],
-        mode="markers",
-        name="Throughput vs Downtime",
-        marker=dict(color=MAIN_COLOR, opacity=0.7, size=6),
-        visible=False
-    ))
-
-    # 3 — Pause Ratio Trend
-    fig.add_trace(go.Scatter(
-        x=daily_df["date"].astype(str),
-        y=daily_df["pause_ratio"],
-        mode="lines+markers",
-        name="Daily Pause Ratio",
-        line=dict(color=MAIN_COLOR, width=3),
-        visible=False
-    ))
-
-    # 4 — Downtime Duration Summary bar
-    fig.add_trace(go.Bar(
-        x=downtime_dur_summary["metric"],
-        y=downtime_dur_summary["value"],
-        name="Downtime Duration Statistics",
-        marker_color=MAIN_COLOR,
-        visible=False
-    ))
-
-    # 5 — Downtime Density Heatmap (dedicated axes)
-    fig.add_trace(go.Heatmap(
-        z=pivot.values,
-        x=pivot.columns.astype(str),
-        y=day_labels,
-        colorscale=HEATMAP_COLORSCALE,
-        colorbar=dict(title="Total Downtime (sec)"),
-        name="Downtime Density Heatmap",
-        visible=False,
-        xaxis="x2",
-        yaxis="y2"
-    ))
-
-    # 6 — Consistency Validation scatter
-    fig.add_trace(go.Scatter(
-        x=list(range(len(reconciliation_df))),
-        y=reconciliation_df["event_vs_hour_downtime_diff_sec"],
-        mode="markers",
-        name="Downtime Reconciliation Gap",
-        marker=dict(color=MAIN_COLOR, opacity=0.7, size=5),
-        visible=False
-    ))
+    return [
+        # 0 — Daily Efficiency Trend
+        go.Scatter(
+            x=daily_df["date"].astype(str),
+            y=daily_df["efficiency"],
+            mode="lines+markers",
+            name="Daily Efficiency Trend",
+            line=dict(color=MAIN_COLOR, width=3),
+            visible=True
+        ),
 
-    # -----------------------------
-    # Base Layout
-    # -----------------------------
-    fig.update_layout(
-        title=dict(text="Daily Efficiency Trend", x=0.5),
+        # 1 — Hourly Efficiency by Hour-of-Day
+        go.Bar(
+            x=hourly_density_df["hour"].astype(str),
+            y=hourly_density_df["mean_efficiency"],
+            name="Mean Hourly Efficiency",
+            marker_color=MAIN_COLOR,
+            visible=False
+        ),
+
+        # 2 — Throughput vs Downtime Ratio scatter
+        _point_trace(
+            x=hourly_df["downtime_ratio"],
+            y=hourly_df["throughput_per_hour"],
+            name="Throughput vs Downtime",
+            marker=dict(color=MAIN_COLOR, opacity=0.7, size=6)
+        ),
+
+        # 3 — Pause Ratio Trend
+        go.Scatter(
+            x=daily_df["date"].astype(str),
+            y=daily_df["pause_ratio"],
+            mode="lines+markers",
+            name="Daily Pause Ratio",
+            line=dict(color=MAIN_COLOR, width=3),
+            visible=False
+        ),
+
+        # 4 — Downtime Duration Summary bar
+        go.Bar(
+            x=downtime_dur_summary["metric"],
+            y=downtime_dur_summary["value"],
+            name="Downtime Duration Statistics",
+            marker_color=MAIN_COLOR,
+            visible=False
+        ),
+
+        # 5 — Downtime Density Heatmap (dedicated axes)
+        go.Heatmap(
+            z=pivot.values,
+            x=pivot.columns.astype(str),
+            y=pivot.index,
+            colorscale=HEATMAP_COLORSCALE,
+            colorbar=dict(title="Total Downtime (sec)"),
+            name="Downtime Density Heatmap",
+            visible=False,
+            xaxis="x2",
+            yaxis="y2"
+        ),
+
+        # 6 — Consistency Validation scatter
+        _point_trace(
+            x=np.arange(len(reconciliation_df)),
+            y=reconciliation_df["event_vs_hour_downtime_diff_sec"],
+            name="Downtime Reconciliation Gap",
+            marker=dict(color=MAIN_COLOR, opacity=0.7, size=5)
+        ),
+    ]
+
+
+# -----------------------------
+# Layout
+# -----------------------------
+def _base_layout(title: str) -> dict:
+    return dict(
+        title=dict(text=title, x=0.5),
         plot_bgcolor="white",
         paper_bgcolor="white",
         font=dict(color=DARK_COLOR),
@@ -176,6 +255,71 @@ def build_manufacturing_dashboard(
         bargap=0.4,
     )
 
+
+# -----------------------------
+# HTML
+# -----------------------------
+def _select_html(on_change: str, views: list = VIEWS) -> str:
+    options = "\n".join(
+        f'    <option value="{i}">{label}</option>'
+        for i, (_, label, _) in enumerate(views)
+    )
+    return f"""<div style="text-align:center; margin-top:20px;">
+<select id="metricSelect" style="
+    padding:10px 16px;
+    border-radius:10px;
+    border:1px solid #BFDCDC;
+    font-size:15px;
+    color:{DARK_COLOR};
+" onchange="{on_change}">
+{options}
+</select>
+</div>"""
+
+
+def _page_html(body: str, script: str) -> str:
+    return f"""
+<html>
+<head>
+<title>Manufacturing Downtime Analytics Dashboard</title>
+</head>
+
+<body style="background:#FAFEFE; font-family:Arial;">
+
+<h1 style="color:{DARK_COLOR}; text-align:center;">
+Manufacturing Downtime Analytics Dashboard
+</h1>
+
+{body}
+
+<script>
+{script}
+</script>
+
+</body>
+</html>
+"""
+
+
+def _chart_html(plot_html: str) -> str:
+    return f"""<div style="
+    max-width: 1150px;
+    margin: 25px auto;
+    padding: 30px;
+    border: 1px solid #E6F2F2;
+    border-radius: 18px;
+    box-shadow: 0 10px 25px rgba(0,0,0,0.08);
+    background-color: white;
+">
+{plot_html}
+</div>"""
+
+
+def _inline_page(traces: list) -> str:
+
+    fig = go.Figure(data=traces)
+    fig.update_layout(**_base_layout(VIEWS[0][2]))
+
     # Heatmap dedicated axes
     fig.update_layout(
         xaxis2=dict(
@@ -202,74 +346,21 @@ def build_manufacturing_dashboard(
         div_id="mfgDashboard"
     )
 
-    # -----------------------------
-    # Write HTML
-    # -----------------------------
-    with open(output_html_path, "w", encoding="utf-8") as f:
-        f.write(f"""
-<html>
-<head>
-<title>Manufacturing Downtime Analytics Dashboard</title>
-</head>
-
-<body style="background:#FAFEFE; font-family:Arial;">
-
-<h1 style="color:{DARK_COLOR}; text-align:center;">
-Manufacturing Downtime Analytics Dashboard
-</h1>
-
-<div style="text-align:center; margin-top:20px;">
-<select id="metricSelect" style="
-    padding:10px 16px;
-    border-radius:10px;
-    border:1px solid #BFDCDC;
-    font-size:15px;
-    color:{DARK_COLOR};
-" onchange="updateChart()">
-    <option value="0">Daily Efficiency Trend</option>
-    <option value="1">Hourly Efficiency by Hour-of-Day</option>
-    <option value="2">Throughput vs Downtime Ratio</option>
-    <option value="3">Daily Pause Ratio Trend</option>
-    <option value="4">Downtime Duration Statistics</option>
-    <option value="5">Downtime Density Heatmap</option>
-    <option value="6">Event-Level Downtime Reconciliation</option>
-</select>
-</div>
-
-<div style="
-    max-width: 1150px;
-    margin: 25px auto;
-    padding: 30px;
-    border: 1px solid #E6F2F2;
-    border-radius: 18px;
-    box-shadow: 0 10px 25px rgba(0,0,0,0.08);
-    background-color: white;
-">
-{plot_html}
-</div>
+    titles = json.dumps([title for _, _, title in VIEWS], ensure_ascii=False)
 
-<script>
-function updateChart() {{
+    script = f"""function updateChart() {{
     const val = parseInt(document.getElementById("metricSelect").value);
-    let visibility = [false, false, false, false, false, false, false];
+    let visibility = Array({len(VIEWS)}).fill(false);
     visibility[val] = true;
 
-    let titles = [
-        "Daily Efficiency Trend",
-        "Mean Hourly Efficiency by Hour-of-Day",
-        "Throughput vs Downtime Ratio (per Hour)",
-        "Daily Pause Ratio Trend",
-        "Downtime Duration Statistics",
-        "Downtime Density Heatmap (Weekday × Hour)",
-        "Event-Level vs Hourly Downtime Reconciliation Gap"
-    ];
+    let titles = {titles};
 
     Plotly.restyle("mfgDashboard", "visible", visibility);
     Plotly.relayout("mfgDashboard", {{
         title: {{ text: titles[val], x: 0.5 }}
     }});
 
-    if (val == 5) {{
+    if (val == {HEATMAP_VIEW}) {{
         Plotly.relayout("mfgDashboard", {{
             "xaxis2.visible": true,
             "yaxis2.visible": true,
@@ -282,11 +373,140 @@ function updateChart() {{
             "yaxis.showticklabels": true
         }});
     }}
+}}"""
+
+    return _page_html(
+        _select_html("updateChart()") + "\n\n" + _chart_html(plot_html),
+        script
+    )
+
+
+def _view_payload(trace, layout: dict) -> str:
+    """
+    Compact JSON of one view: its trace and the layout keys that differ
+    from the shared base layout. Arrays are base64 typed arrays.
+    """
+    trace = trace.to_plotly_json()
+    trace["visible"] = True
+    trace.pop("xaxis", None)
+    trace.pop("yaxis", None)
+
+    figure = json.loads(pio.to_json(go.Figure(data=[trace]), validate=False))
+    return json.dumps(
+        {"data": figure["data"], "layout": layout},
+        separators=(",", ":"),
+        ensure_ascii=False
+    )
+
+
+def _lazy_page(traces: list, output_html_path: str) -> str:
+
+    base_layout = _base_layout(VIEWS[0][2])
+
+    urls = []
+    for i, ((key, _, _), trace) in enumerate(zip(VIEWS, traces)):
+
+        layout = {}
+        if i == HEATMAP_VIEW:
+            layout = dict(
+                xaxis={**base_layout["xaxis"], "title": "Hour of Day", "type": "category"},
+                yaxis={**base_layout["yaxis"], "title": "Weekday", "type": "category"},
+            )
+
+        path = view_path(output_html_path, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        payload = _view_payload(trace, layout)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(payload)
+
+        # content hash in the URL: browsers never reuse a stale sidecar
+        version = hashlib.sha256(payload.encode("utf-8")).hexdigest()[:12]
+        urls.append(f"{VIEWS_DIRNAME}/{key}.json?v={version}")
+
+        print("Dashboard view written:", path)
+
+    # Base layout incl. the default template, shipped once with the page
+    shared_layout = json.loads(
+        pio.to_json(go.Figure(layout=base_layout), validate=False)
+    )["layout"]
+
+    plot_html = (
+        f'<script src="https://cdn.plot.ly/plotly-{get_plotlyjs_version()}.min.js" '
+        'charset="utf-8"></script>\n'
+        '<div id="mfgDashboard" style="height:100%; width:100%;"></div>'
+    )
+
+    script = f"""const VIEW_URLS = {json.dumps(urls)};
+const TITLES = {json.dumps([title for _, _, title in VIEWS], ensure_ascii=False)};
+const BASE_LAYOUT = {json.dumps(shared_layout, separators=(",", ":"), ensure_ascii=False)};
+
+// view index → Promise of the parsed sidecar, fetched at most once
+const viewCache = {{}};
+
+function loadView(val) {{
+    if (!(val in viewCache)) {{
+        viewCache[val] = fetch(VIEW_URLS[val]).then(response => {{
+            if (!response.ok) {{
+                throw new Error(VIEW_URLS[val] + ": HTTP " + response.status);
+            }}
+            return response.json();
+        }});
+    }}
+    return viewCache[val];
 }}
-</script>
 
-</body>
-</html>
-""")
+function updateChart() {{
+    const select = document.getElementById("metricSelect");
+    const val = parseInt(select.value);
+
+    loadView(val).then(view => {{
+        // a later selection may have finished first
+        if (parseInt(select.value) !== val) return;
+
+        const layout = Object.assign({{}}, BASE_LAYOUT, view.layout, {{
+            title: {{ text: TITLES[val], x: 0.5 }}
+        }});
+        Plotly.react("mfgDashboard", view.data, layout, {{ responsive: true }});
+    }}).catch(error => {{
+        delete viewCache[val];
+        console.error("Could not load dashboard view:", error);
+    }});
+}}
+
+updateChart();"""
+
+    return _page_html(
+        _select_html("updateChart()") + "\n\n" + _chart_html(plot_html),
+        script
+    )
+
+
+@instrumented
+def build_manufacturing_dashboard(
+    featured_dir: str,
+    tables_dir: str,
+    output_html_path: str,
+    context=None,
+    lazy: bool = False
+):
+
+    os.makedirs(os.path.dirname(output_html_path), exist_ok=True)
+
+    traces = _build_traces(featured_dir, tables_dir, context)
+
+    if lazy:
+        html = _lazy_page(traces, output_html_path)
+    else:
+        html = _inline_page(traces)
+
+    # -----------------------------
+    # Write HTML
+    # -----------------------------
+    with open(output_html_path, "w", encoding="utf-8") as f:
+        f.write(html)
+
+    views = [view_path(output_html_path, key) for key, _, _ in VIEWS] if lazy else []
+    record_write(nbytes=file_bytes(output_html_path, *views))
 
     print("Dashboard created at:", output_html_path)
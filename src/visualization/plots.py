@@ -1,7 +1,16 @@
+import multiprocessing
 import os
-import pandas as pd
-import matplotlib.pyplot as plt
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 from matplotlib.colors import LinearSegmentedColormap
+from matplotlib.figure import Figure
+
+from src.analysis.downtime_cube import CUBE_TABLE, weekday_hour_downtime
+from src.data_processing.storage import read_table
+from src.pipeline.context import PipelineContext
+from src.pipeline.instrumentation import file_bytes, instrumented, record_write
 
 
 # -----------------------------
@@ -31,11 +40,35 @@ FIG_SIZE = (8, 5)
 # -----------------------------
 # Shared Plot Helpers
 # -----------------------------
-def _save_bar_plot(df, x_col, y_col, title, x_label, y_label, save_path, rotate_x=0):
+# Figures are built on an explicit Agg canvas instead of pyplot, so
+# rendering never touches the caller's backend or its open figures.
+def _new_figure(figsize=FIG_SIZE):
+
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+
+    return fig, fig.add_subplot()
+
+
+def _style_axes(ax, title, x_label, y_label):
+
+    ax.set_title(title, color=THEME["dark"])
+    ax.set_xlabel(x_label, color=THEME["dark"])
+    ax.set_ylabel(y_label, color=THEME["dark"])
+    ax.tick_params(labelcolor=THEME["dark"])
+
+
+def _save_figure(fig, save_path, dpi):
+
+    fig.tight_layout()
+    fig.savefig(save_path, dpi=dpi)
+
 
-    plt.figure(figsize=FIG_SIZE)
+def _save_bar_plot(df, x_col, y_col, title, x_label, y_label, save_path, dpi, rotate_x=0):
 
-    bars = plt.bar(
+    fig, ax = _new_figure()
+
+    bars = ax.bar(
         range(len(df)),
         df[y_col],
         color=THEME["primary"],
@@ -45,23 +78,19 @@ def _save_bar_plot(df, x_col, y_col, title, x_label, y_label, save_path, rotate_
 
     x_values = df[x_col].astype(str)
 
-    plt.xticks(
-        ticks=range(len(x_values)),
+    ax.set_xticks(
+        range(len(x_values)),
         labels=x_values,
         rotation=rotate_x
     )
 
-    plt.title(title, color=THEME["dark"])
-    plt.xlabel(x_label, color=THEME["dark"])
-    plt.ylabel(y_label, color=THEME["dark"])
-    plt.grid(axis="y", color=THEME["grid"])
-    plt.xticks(color=THEME["dark"])
-    plt.yticks(color=THEME["dark"])
+    _style_axes(ax, title, x_label, y_label)
+    ax.grid(axis="y", color=THEME["grid"])
 
     for bar in bars:
         height = bar.get_height()
         x_center = bar.get_x() + bar.get_width() / 2
-        plt.text(
+        ax.text(
             x_center,
             height,
             f"{height:,.2f}",
@@ -70,16 +99,14 @@ def _save_bar_plot(df, x_col, y_col, title, x_label, y_label, save_path, rotate_
             fontsize=8
         )
 
-    plt.tight_layout()
-    plt.savefig(save_path, dpi=300)
-    plt.close()
+    _save_figure(fig, save_path, dpi)
 
 
-def _save_line_plot(df, x_col, y_col, title, x_label, y_label, save_path):
+def _save_line_plot(df, x_col, y_col, title, x_label, y_label, save_path, dpi):
 
-    plt.figure(figsize=FIG_SIZE)
+    fig, ax = _new_figure()
 
-    plt.plot(
+    ax.plot(
         df[x_col],
         df[y_col],
         marker="o",
@@ -87,22 +114,18 @@ def _save_line_plot(df, x_col, y_col, title, x_label, y_label, save_path):
         color=THEME["primary"]
     )
 
-    plt.title(title, color=THEME["dark"])
-    plt.xlabel(x_label, color=THEME["dark"])
-    plt.ylabel(y_label, color=THEME["dark"])
-    plt.grid(color=THEME["grid"])
-    plt.xticks(rotation=45, color=THEME["dark"])
-    plt.yticks(color=THEME["dark"])
-    plt.tight_layout()
-    plt.savefig(save_path, dpi=300)
-    plt.close()
+    _style_axes(ax, title, x_label, y_label)
+    ax.grid(color=THEME["grid"])
+    ax.tick_params(axis="x", labelrotation=45)
+
+    _save_figure(fig, save_path, dpi)
 
 
-def _save_scatter_plot(df, x_col, y_col, title, x_label, y_label, save_path):
+def _save_scatter_plot(df, x_col, y_col, title, x_label, y_label, save_path, dpi):
 
-    plt.figure(figsize=FIG_SIZE)
+    fig, ax = _new_figure()
 
-    plt.scatter(
+    ax.scatter(
         df[x_col],
         df[y_col],
         color=THEME["primary"],
@@ -111,58 +134,47 @@ def _save_scatter_plot(df, x_col, y_col, title, x_label, y_label, save_path):
         linewidths=0.5
     )
 
-    plt.title(title, color=THEME["dark"])
-    plt.xlabel(x_label, color=THEME["dark"])
-    plt.ylabel(y_label, color=THEME["dark"])
-    plt.grid(color=THEME["grid"])
-    plt.xticks(color=THEME["dark"])
-    plt.yticks(color=THEME["dark"])
-    plt.tight_layout()
-    plt.savefig(save_path, dpi=300)
-    plt.close()
+    _style_axes(ax, title, x_label, y_label)
+    ax.grid(color=THEME["grid"])
+
+    _save_figure(fig, save_path, dpi)
 
 
-def _save_heatmap(matrix_df, title, x_label, y_label, save_path):
+def _save_heatmap(matrix_df, title, x_label, y_label, save_path, dpi):
 
-    plt.figure(figsize=(10, 6))
+    fig, ax = _new_figure(figsize=(10, 6))
 
-    plt.imshow(
+    image = ax.imshow(
         matrix_df.values,
         aspect="auto",
         cmap=HEATMAP_CMAP
     )
 
-    plt.title(title, color=THEME["dark"])
-    plt.xlabel(x_label, color=THEME["dark"])
-    plt.ylabel(y_label, color=THEME["dark"])
+    _style_axes(ax, title, x_label, y_label)
 
-    plt.xticks(
-        ticks=range(len(matrix_df.columns)),
+    ax.set_xticks(
+        range(len(matrix_df.columns)),
         labels=matrix_df.columns.astype(str),
         rotation=45,
-        ha="right",
-        color=THEME["dark"]
+        ha="right"
     )
-    plt.yticks(
-        ticks=range(len(matrix_df.index)),
-        labels=matrix_df.index.astype(str),
-        color=THEME["dark"]
+    ax.set_yticks(
+        range(len(matrix_df.index)),
+        labels=matrix_df.index.astype(str)
     )
 
-    plt.colorbar()
-    plt.tight_layout()
-    plt.savefig(save_path, dpi=300)
-    plt.close()
+    fig.colorbar(image, ax=ax)
+    _save_figure(fig, save_path, dpi)
 
 
 # -----------------------------
 # Individual Plot Functions
 # -----------------------------
+# Each plot receives its already loaded input frame, so it can be
+# rendered in a worker process without touching the stored tables.
 
 # ---- Downtime: event duration distribution ----
-def _plot_downtime_event_distribution(tables_dir, fig_dir):
-
-    df = pd.read_csv(os.path.join(tables_dir, "downtime_duration_summary.csv"))
+def _plot_downtime_event_distribution(df, save_path, dpi):
 
     _save_bar_plot(
         df=df,
@@ -171,43 +183,27 @@ def _plot_downtime_event_distribution(tables_dir, fig_dir):
         title="Downtime Duration Statistics",
         x_label="Metric",
         y_label="Seconds",
-        save_path=os.path.join(fig_dir, "downtime_event_distribution.png"),
+        save_path=save_path,
+        dpi=dpi,
         rotate_x=15
     )
 
 
 # ---- Downtime: hourly density heatmap (hour-of-day x weekday) ----
-def _plot_downtime_density_heatmap(featured_dir, fig_dir):
-
-    df = pd.read_csv(
-        os.path.join(featured_dir, "downtime_features.csv"),
-        parse_dates=["downtime_start_ts"]
-    )
-
-    df["hour"] = df["downtime_start_ts"].dt.hour
-    df["weekday"] = df["downtime_start_ts"].dt.dayofweek
-
-    pivot = (
-        df.groupby(["weekday", "hour"])["downtime_duration_sec"]
-        .sum()
-        .unstack(fill_value=0)
-    )
-
-    pivot.index = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"][: len(pivot)]
+def _plot_downtime_density_heatmap(cube, save_path, dpi):
 
     _save_heatmap(
-        matrix_df=pivot,
+        matrix_df=weekday_hour_downtime(cube),
         title="Total Downtime by Weekday & Hour-of-Day (seconds)",
         x_label="Hour of Day",
         y_label="Weekday",
-        save_path=os.path.join(fig_dir, "downtime_density_heatmap.png")
+        save_path=save_path,
+        dpi=dpi
     )
 
 
 # ---- Hourly: efficiency trend ----
-def _plot_hourly_efficiency_trend(tables_dir, fig_dir):
-
-    df = pd.read_csv(os.path.join(tables_dir, "hourly_downtime_density.csv"))
+def _plot_hourly_efficiency_trend(df, save_path, dpi):
 
     _save_bar_plot(
         df=df,
@@ -216,14 +212,14 @@ def _plot_hourly_efficiency_trend(tables_dir, fig_dir):
         title="Mean Hourly Efficiency by Hour-of-Day",
         x_label="Hour of Day",
         y_label="Mean Efficiency",
-        save_path=os.path.join(fig_dir, "hourly_efficiency_trend.png")
+        save_path=save_path,
+        dpi=dpi
     )
 
 
 # ---- Hourly: throughput vs downtime scatter ----
-def _plot_throughput_vs_downtime(featured_dir, fig_dir):
+def _plot_throughput_vs_downtime(df, save_path, dpi):
 
-    df = pd.read_csv(os.path.join(featured_dir, "hourly_features.csv"))
     df = df[["throughput_per_hour", "downtime_ratio"]].dropna()
 
     _save_scatter_plot(
@@ -233,14 +229,14 @@ def _plot_throughput_vs_downtime(featured_dir, fig_dir):
         title="Throughput vs Downtime Ratio (per Hour)",
         x_label="Downtime Ratio",
         y_label="Throughput (gallons/hour)",
-        save_path=os.path.join(fig_dir, "throughput_vs_downtime.png")
+        save_path=save_path,
+        dpi=dpi
     )
 
 
 # ---- Daily: efficiency trend ----
-def _plot_daily_efficiency_trend(featured_dir, fig_dir):
+def _plot_daily_efficiency_trend(df, save_path, dpi):
 
-    df = pd.read_csv(os.path.join(featured_dir, "daily_features.csv"))
     df = df.sort_values("date")
 
     _save_line_plot(
@@ -250,14 +246,13 @@ def _plot_daily_efficiency_trend(featured_dir, fig_dir):
         title="Daily Efficiency Trend",
         x_label="Date",
         y_label="Efficiency",
-        save_path=os.path.join(fig_dir, "daily_efficiency_trend.png")
+        save_path=save_path,
+        dpi=dpi
     )
 
 
 # ---- Daily: pause ratio distribution ----
-def _plot_pause_ratio_distribution(tables_dir, fig_dir):
-
-    df = pd.read_csv(os.path.join(tables_dir, "pause_ratio_summary.csv"))
+def _plot_pause_ratio_distribution(df, save_path, dpi):
 
     _save_bar_plot(
         df=df,
@@ -266,18 +261,14 @@ def _plot_pause_ratio_distribution(tables_dir, fig_dir):
         title="Pause Ratio Distribution (Daily)",
         x_label="Metric",
         y_label="Ratio",
-        save_path=os.path.join(fig_dir, "pause_ratio_distribution.png"),
+        save_path=save_path,
+        dpi=dpi,
         rotate_x=15
     )
 
 
 # ---- Consistency: event vs hour downtime diff ----
-def _plot_consistency_validation(featured_dir, fig_dir):
-
-    df = pd.read_csv(
-        os.path.join(featured_dir, "event_hour_reconciliation.csv"),
-        parse_dates=["timestamp_start"]
-    )
+def _plot_consistency_validation(df, save_path, dpi):
 
     df_sample = df[["timestamp_start", "event_vs_hour_downtime_diff_sec"]].dropna()
     df_sample = df_sample.sort_values("timestamp_start").reset_index(drop=True)
@@ -290,23 +281,125 @@ def _plot_consistency_validation(featured_dir, fig_dir):
         title="Event-Level vs Hourly Downtime Reconciliation Gap (sec)",
         x_label="Hour Record Index",
         y_label="Difference (sec)",
-        save_path=os.path.join(fig_dir, "consistency_validation.png")
+        save_path=save_path,
+        dpi=dpi
     )
 
 
 # -----------------------------
-# Public Runner
+# Plot Registry
 # -----------------------------
-def generate_visualizations(featured_dir: str, tables_dir: str, fig_dir: str):
+# figure name → (plot function, source ("featured" / "tables"), table, columns)
+PLOTS = {
+    "downtime_event_distribution": (
+        _plot_downtime_event_distribution, "tables",
+        "downtime_duration_summary", ["metric", "value"],
+    ),
+    "downtime_density_heatmap": (
+        _plot_downtime_density_heatmap, "tables",
+        CUBE_TABLE, ["weekday", "hour", "downtime_sec_sum", "downtime_event_count"],
+    ),
+    "hourly_efficiency_trend": (
+        _plot_hourly_efficiency_trend, "tables",
+        "hourly_downtime_density", ["hour", "mean_efficiency"],
+    ),
+    "throughput_vs_downtime": (
+        _plot_throughput_vs_downtime, "featured",
+        "hourly_features", ["throughput_per_hour", "downtime_ratio"],
+    ),
+    "daily_efficiency_trend": (
+        _plot_daily_efficiency_trend, "featured",
+        "daily_features", ["date", "efficiency"],
+    ),
+    "pause_ratio_distribution": (
+        _plot_pause_ratio_distribution, "tables",
+        "pause_ratio_summary", ["metric", "value"],
+    ),
+    "consistency_validation": (
+        _plot_consistency_validation, "featured",
+        "event_hour_reconciliation", ["timestamp_start", "event_vs_hour_downtime_diff_sec"],
+    ),
+}
+
+FIGURE_FORMATS = ["png", "webp", "jpg", "svg", "pdf"]
+
+DEFAULT_DPI = 300
+DEFAULT_FORMAT = "png"
+
+
+def figure_path(fig_dir: str, name: str, fig_format: str = DEFAULT_FORMAT) -> str:
+    if fig_format not in FIGURE_FORMATS:
+        raise ValueError(
+            f"Unknown figure format '{fig_format}', expected one of {FIGURE_FORMATS}"
+        )
+    return os.path.join(fig_dir, f"{name}.{fig_format}")
+
 
+def _init_render_worker():
+    # Spawned workers start from a fresh interpreter: pin the
+    # non-interactive backend there (figures draw on Agg regardless)
+    matplotlib.use("Agg", force=True)
+
+
+def _render(name, df, save_path, dpi):
+    PLOTS[name][0](df, save_path, dpi)
+    return save_path
+
+
+# -----------------------------
+# Public Runner
+# -----------------------------
+@instrumented
+def generate_visualizations(
+    featured_dir: str,
+    tables_dir: str,
+    fig_dir: str,
+    context=None,
+    dpi: int = DEFAULT_DPI,
+    fig_format: str = DEFAULT_FORMAT,
+    max_workers: int = None
+):
+    """
+    Renders all PLOTS into fig_dir as <name>.<fig_format> at the given dpi.
+
+    Inputs are loaded once in this process (only the plotted columns) and
+    handed to a process pool, one figure per task. max_workers=1 renders
+    in-process without switching the caller's matplotlib backend.
+    """
     os.makedirs(fig_dir, exist_ok=True)
 
-    _plot_downtime_event_distribution(tables_dir, fig_dir)
-    _plot_downtime_density_heatmap(featured_dir, fig_dir)
-    _plot_hourly_efficiency_trend(tables_dir, fig_dir)
-    _plot_throughput_vs_downtime(featured_dir, fig_dir)
-    _plot_daily_efficiency_trend(featured_dir, fig_dir)
-    _plot_pause_ratio_distribution(tables_dir, fig_dir)
-    _plot_consistency_validation(featured_dir, fig_dir)
+    context = context if context is not None else PipelineContext()
+    source_dirs = {"featured": featured_dir, "tables": tables_dir}
+
+    tasks = [
+        (
+            name,
+            read_table(source_dirs[source], table, columns=columns, context=context),
+            figure_path(fig_dir, name, fig_format),
+        )
+        for name, (_, source, table, columns) in PLOTS.items()
+    ]
 
-    print("Visualization files created in:", fig_dir)
+    max_workers = min(max_workers or os.cpu_count() or 1, len(tasks))
+
+    if max_workers == 1:
+        for name, df, save_path in tasks:
+            _render(name, df, save_path, dpi)
+    else:
+        # spawn: the pipeline calls this from a scheduler thread, and
+        # forking a multi-threaded process is unsafe
+        with ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_render_worker
+        ) as pool:
+            futures = [
+                pool.submit(_render, name, df, save_path, dpi)
+                for name, df, save_path in tasks
+            ]
+            for future in futures:
+                future.result()
+
+    record_write(nbytes=file_bytes(*(save_path for _, _, save_path in tasks)))
+
+    print(f"Visualization files created in: {fig_dir} ({fig_format}, {dpi} dpi)")
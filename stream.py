@@ -0,0 +1,176 @@
+import argparse
+import json
+import os
+import threading
+
+from src.streaming.processor import MAX_LATENCY_SEC, ROLLING_WINDOW_HOURS, StreamProcessor
+from src.streaming.server import LiveViews, serve_live
+from src.streaming.sources import POLL_SEC, run_stream, socket_lines, tail_file
+
+from main import FEATURED_DIR, OUTPUT_DIR, TABLES_PATH
+
+
+"""
+Streaming mode: downtime KPIs from a live event feed.
+
+Events (rows of the downtime_event_log sheet, CSV or JSON lines) are
+read from a tailed file or a local socket and processed one at a time
+(src/streaming/processor.py). Every update — closed hours, changed
+heatmap cells, KPI snapshot — is appended as one JSON line to the
+updates file and summarized on stdout.
+
+With --serve the live dashboard (src/streaming/server.py) is served as
+well and every update is pushed to the connected browsers as a delta;
+--seed starts its views from the batch outputs (data/featured,
+outputs/tables) and skips events those outputs already hold, so
+replaying a featured history does not count it twice.
+
+Usage:
+    python stream.py --file data/stream/events.csv
+    python stream.py --file data/cleaned/downtime_cleaned.csv --no-follow
+    python stream.py --socket 127.0.0.1:9009 --serve 127.0.0.1:8050 --seed
+"""
+
+
+STREAM_DIR = os.path.join(OUTPUT_DIR, 'stream')
+UPDATES_PATH = os.path.join(STREAM_DIR, 'kpi_updates.jsonl')
+
+
+def _print_update(update: dict):
+    kpis = update['kpis']
+    burst_share = kpis['burst_share']
+    print(
+        f"[{update['emitted_at']}] +{update['events']} event(s), "
+        f"{len(update['hours'])} closed hour(s), {len(update['heatmap'])} heatmap cell(s) | "
+        f"events {kpis['events']:,}, "
+        f"burst share {'-' if burst_share is None else f'{burst_share:.1%}'}, "
+        f"rejected {kpis['rejected']}"
+    )
+
+
+def stream(
+    file_path: str = None,
+    address: str = None,
+    from_start: bool = True,
+    follow: bool = True,
+    max_latency_sec: float = MAX_LATENCY_SEC,
+    window_hours: int = ROLLING_WINDOW_HOURS,
+    updates_path: str = UPDATES_PATH,
+    serve: str = None,
+    seed: bool = False,
+    processor: StreamProcessor = None,
+    stop=None
+) -> StreamProcessor:
+    """
+    Runs the processor over a file or socket source until the source
+    ends (file without follow) or stop (threading.Event) is set. With
+    serve ("host:port") the live dashboard runs until interrupted.
+    """
+    processor = processor or StreamProcessor(
+        window_hours=window_hours, max_latency_sec=max_latency_sec
+    )
+    stop = stop or threading.Event()
+    # idle sources are polled at least twice per latency bound
+    poll_sec = min(POLL_SEC, max_latency_sec / 2)
+
+    if file_path is not None:
+        source = tail_file(file_path, from_start=from_start, follow=follow, poll_sec=poll_sec, stop=stop)
+    else:
+        host, port = address.rsplit(':', 1)
+        source = socket_lines(host, int(port), poll_sec=poll_sec, stop=stop)
+
+    os.makedirs(os.path.dirname(os.path.abspath(updates_path)), exist_ok=True)
+    with open(updates_path, 'a') as updates:
+
+        def write_update(update):
+            updates.write(json.dumps(update) + '\n')
+            updates.flush()
+            _print_update(update)
+
+        processor.subscribe(write_update)
+        try:
+            if serve is None:
+                run_stream(source, processor)
+            else:
+                views = LiveViews()
+                if seed:
+                    # events the batch outputs already hold are skipped
+                    views.seed_from_tables(FEATURED_DIR, TABLES_PATH)
+                    source = views.unseen(source)
+                serve_live(processor, lambda: run_stream(source, processor), serve, views, stop)
+        except KeyboardInterrupt:
+            processor.flush()
+        finally:
+            processor.unsubscribe(write_update)
+
+    print(f"Updates: {updates_path}")
+    return processor
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Process downtime events from a live feed and emit KPI updates"
+    )
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--file", help="event file to tail (CSV or JSON lines)")
+    source.add_argument(
+        "--socket",
+        metavar="HOST:PORT",
+        help="listen for events on a local TCP socket, one per line",
+    )
+    parser.add_argument(
+        "--from-end",
+        action="store_true",
+        help="only process lines appended to --file after the start",
+    )
+    parser.add_argument(
+        "--no-follow",
+        action="store_true",
+        help="stop at the end of --file instead of waiting for new lines",
+    )
+    parser.add_argument(
+        "--max-latency",
+        type=float,
+        default=MAX_LATENCY_SEC,
+        help=f"seconds at most between an event and its update (default: {MAX_LATENCY_SEC})",
+    )
+    parser.add_argument(
+        "--window-hours",
+        type=int,
+        default=ROLLING_WINDOW_HOURS,
+        help=f"closed hours in the rolling uptime share window (default: {ROLLING_WINDOW_HOURS})",
+    )
+    parser.add_argument(
+        "--serve",
+        metavar="HOST:PORT",
+        default=None,
+        help="serve the live dashboard and push updates to browsers (e.g. 127.0.0.1:8050)",
+    )
+    parser.add_argument(
+        "--seed",
+        action="store_true",
+        help="start the live dashboard from the batch outputs (data/featured, outputs/tables); "
+             "events already in them are skipped",
+    )
+    parser.add_argument(
+        "--output",
+        default=UPDATES_PATH,
+        help="JSON lines file the updates are appended to "
+             "(default: outputs/stream/kpi_updates.jsonl)",
+    )
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    stream(
+        file_path=args.file,
+        address=args.socket,
+        from_start=not args.from_end,
+        follow=not args.no_follow,
+        max_latency_sec=args.max_latency,
+        window_hours=args.window_hours,
+        updates_path=args.output,
+        serve=args.serve,
+        seed=args.seed,
+    )
@@ -0,0 +1,50 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.data_processing.data_preparation import _clock_to_offset, clock_to_ms
+
+
+"""
+Scalar clock parsing (clock_to_ms, used by the stream processor) must
+read every value as the vectorized ingest path (_clock_to_offset) does.
+"""
+
+
+VALUES = [
+    "11:58:03.777",
+    "7:05",
+    " 08:00:00 ",
+    "23:59:59.9995",
+    "2022-07-22 13:20:30.5005",
+    "0.5",
+    "0,5",
+    "abc",
+    "",
+    0.25,
+    1.75,
+    0.999999999,
+    3,
+    np.float64(0.1),
+    datetime.time(12, 15, 0, 500),
+    datetime.time(12, 15, 0, 1500),
+    datetime.datetime(2022, 7, 22, 9, 30, 1, 2500),
+    pd.Timestamp("2022-07-22 23:59:59.9996"),
+    None,
+    np.nan,
+    True,
+]
+
+
+def _vectorized_ms(values: list) -> list:
+    offsets = _clock_to_offset(pd.Series(values, dtype=object))
+    # rounded to milliseconds as to_epoch_ms does
+    ms = offsets.dt.round("ms") // pd.Timedelta(milliseconds=1)
+    return [None if pd.isna(value) else int(value) for value in ms]
+
+
+@pytest.mark.parametrize("value, expected", list(zip(VALUES, _vectorized_ms(VALUES))))
+def test_scalar_matches_vectorized(value, expected):
+    assert clock_to_ms(value) == expected
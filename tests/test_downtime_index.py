@@ -0,0 +1,113 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.analysis.downtime_index import DowntimeIndex, _SortedIntervals
+
+
+"""
+Window queries of the downtime index against a brute-force scan over
+every event, for random windows and partitions.
+"""
+
+
+HOUR_MS = 3_600_000
+
+# 2022-07-22 00:00:00 UTC in epoch milliseconds
+ORIGIN_MS = 1_658_448_000_000
+
+PARTITIONS = [("plant_1", "line_1"), ("plant_1", "line_2"), ("plant_2", "line_1")]
+
+
+@pytest.fixture(scope="module")
+def events() -> pd.DataFrame:
+    rng = np.random.default_rng(14)
+    n = 2_000
+
+    starts = ORIGIN_MS + rng.integers(0, 30 * 24 * HOUR_MS, n)
+    ends = starts + rng.integers(0, 2 * HOUR_MS, n)
+    # a few clock values wrapping past midnight: end before start
+    wrapped = rng.random(n) < 0.02
+    ends[wrapped] = starts[wrapped] - rng.integers(1, HOUR_MS, wrapped.sum())
+
+    plant, line = zip(*(PARTITIONS[i] for i in rng.integers(0, len(PARTITIONS), n)))
+
+    return pd.DataFrame({
+        "plant_id": plant,
+        "line_id": line,
+        "downtime_start_ms": pd.array(starts, dtype="Int64"),
+        "downtime_end_ms": pd.array(ends, dtype="Int64"),
+    })
+
+
+def _scan(events: pd.DataFrame, t0: int, t1: int, partition=None) -> dict:
+    if partition is not None:
+        events = events[(events["plant_id"] == partition[0]) & (events["line_id"] == partition[1])]
+
+    start = events["downtime_start_ms"].to_numpy("int64")
+    # events ending before they start are zero-length events at their start
+    end = np.maximum(events["downtime_end_ms"].to_numpy("int64"), start)
+
+    inside = np.minimum(end, t1) - np.maximum(start, t0)
+
+    return {
+        "event_count": int(((start >= t0) & (start < t1)).sum()),
+        "overlapping_event_count": int(((start < t1) & (end > t0)).sum()),
+        "downtime_sec": int(np.clip(inside, 0, None).sum()) / 1000,
+    }
+
+
+def _windows(n: int):
+    rng = np.random.default_rng(7)
+    t0 = ORIGIN_MS + rng.integers(-2 * 24 * HOUR_MS, 32 * 24 * HOUR_MS, n)
+    t1 = t0 + rng.integers(1, 5 * 24 * HOUR_MS, n)
+    return list(zip(t0.tolist(), t1.tolist()))
+
+
+def _ts(ms: int) -> pd.Timestamp:
+    return pd.Timestamp(ms, unit="ms")
+
+
+@pytest.mark.parametrize("partition", [None] + PARTITIONS)
+def test_window_queries_match_scan(events, partition):
+    index = DowntimeIndex.from_frame(events)
+
+    for t0, t1 in _windows(200):
+        expected = _scan(events, t0, t1, partition)
+        result = index.query(_ts(t0), _ts(t1), partition)
+
+        assert result["event_count"] == expected["event_count"]
+        assert result["overlapping_event_count"] == expected["overlapping_event_count"]
+        assert result["downtime_sec"] == pytest.approx(expected["downtime_sec"], abs=1e-9)
+
+
+def test_saved_index_answers_the_same(events, tmp_path):
+    index = DowntimeIndex.from_frame(events)
+    path = str(tmp_path / "downtime_index.npz")
+    index.save(path)
+    loaded = DowntimeIndex.load(path)
+
+    assert loaded.partitions == index.partitions
+    for t0, t1 in _windows(50):
+        for partition in [None] + PARTITIONS:
+            assert loaded.query(_ts(t0), _ts(t1), partition) == index.query(_ts(t0), _ts(t1), partition)
+
+
+def test_empty_or_reversed_window_has_no_downtime(events):
+    index = DowntimeIndex.from_frame(events)
+    t = _ts(ORIGIN_MS + 5 * 24 * HOUR_MS)
+
+    assert index.downtime_seconds(t, t) == 0.0
+    assert index.downtime_seconds(t, t - pd.Timedelta(hours=1)) == 0.0
+
+
+def test_prefix_sums_stay_exact_past_int64():
+    # sums of these offsets overflow a single int64 cumsum
+    starts = np.full(8, 2**61, dtype="int64") + np.arange(8, dtype="int64")
+    ends = starts + 1_000
+    intervals = _SortedIntervals(starts, ends)
+
+    t = int(ends[-1]) + 1
+    expected = sum(int(end) for end in ends) - sum(int(start) for start in starts)
+
+    assert intervals.downtime_before(t) == expected
@@ -0,0 +1,84 @@
+import os
+
+import pandas as pd
+import pytest
+
+from src.data_processing.data_preparation import prepare_data
+from src.data_processing.feature_engineering import (
+    CLEANED_TABLES,
+    run_feature_pipeline,
+    run_incremental_feature_pipeline,
+)
+from src.data_processing.storage import read_table, write_table
+
+
+"""
+Incremental feature runs: featurizing a prefix of the production dates
+and then the rest incrementally must give the tables of a full run, row
+order included.
+"""
+
+
+RAW_EXCEL_PATH = os.path.join(
+    os.path.dirname(__file__), os.pardir, "data", "raw", "dataset.xlsx"
+)
+
+FEATURED_TABLES = [
+    "downtime_features",
+    "hourly_features",
+    "daily_features",
+    "event_hour_reconciliation",
+    "hour_day_reconciliation",
+]
+
+# production dates held back from the first run
+HELD_BACK_DATES = 3
+
+
+@pytest.fixture(scope="module")
+def cleaned_dir(tmp_path_factory):
+    cleaned_dir = str(tmp_path_factory.mktemp("cleaned"))
+    prepare_data(RAW_EXCEL_PATH, cleaned_dir)
+    return cleaned_dir
+
+
+def _run(cleaned_dir: str, root, cut=None) -> str:
+    featured_dir = str(root / "featured")
+    prefix_dir = str(root / "prefix")
+
+    if cut is not None:
+        for name in CLEANED_TABLES.values():
+            df = read_table(cleaned_dir, name)
+            write_table(df[df["date"] < cut], prefix_dir, name)
+        run_feature_pipeline(prefix_dir, featured_dir, max_workers=1)
+        run_incremental_feature_pipeline(cleaned_dir, featured_dir, max_workers=1)
+    else:
+        run_feature_pipeline(cleaned_dir, featured_dir, max_workers=1)
+
+    return featured_dir
+
+
+@pytest.mark.parametrize("held_back", [1, HELD_BACK_DATES, 10])
+def test_prefix_plus_incremental_equals_full_run(cleaned_dir, tmp_path, held_back):
+    dates = sorted(read_table(cleaned_dir, CLEANED_TABLES["daily"])["date"].dropna().unique())
+    cut = dates[-held_back]
+
+    full_dir = _run(cleaned_dir, tmp_path / "full")
+    incremental_dir = _run(cleaned_dir, tmp_path / "incremental", cut=cut)
+
+    for name in FEATURED_TABLES:
+        pd.testing.assert_frame_equal(
+            read_table(incremental_dir, name),
+            read_table(full_dir, name),
+            obj=name,
+        )
+
+
+def test_up_to_date_run_changes_nothing(cleaned_dir, tmp_path):
+    featured_dir = _run(cleaned_dir, tmp_path)
+    before = {name: read_table(featured_dir, name) for name in FEATURED_TABLES}
+
+    run_incremental_feature_pipeline(cleaned_dir, featured_dir, max_workers=1)
+
+    for name in FEATURED_TABLES:
+        pd.testing.assert_frame_equal(read_table(featured_dir, name), before[name], obj=name)
@@ -0,0 +1,113 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.data_processing.intervals import (
+    DAY_MS,
+    HOUR_MS,
+    hour_segments,
+    split_by_hour,
+    split_ms_by_hour,
+)
+
+
+"""
+Hour splitting of [start, end) intervals: every split must hand each
+hour bucket exactly the seconds a per-second expansion of the interval
+puts there.
+"""
+
+
+SECOND_MS = 1_000
+
+# 2022-07-22 00:00:00 UTC in epoch milliseconds
+DAY_START_MS = 1_658_448_000_000
+
+
+def _brute_force(start_ms: int, end_ms: int) -> dict:
+    """
+    bucket_start_ms → seconds, counting the interval second by second.
+    Intervals with end <= start keep their (non-positive) duration in the
+    bucket of the start.
+    """
+    if end_ms <= start_ms:
+        return {start_ms - start_ms % HOUR_MS: (end_ms - start_ms) / 1e3}
+
+    seconds = np.arange(start_ms, end_ms, SECOND_MS)
+    buckets, counts = np.unique(seconds - seconds % HOUR_MS, return_counts=True)
+    return {int(bucket): float(count) for bucket, count in zip(buckets, counts)}
+
+
+def _intervals():
+    rng = np.random.default_rng(13)
+
+    starts = DAY_START_MS + rng.integers(0, 3 * DAY_MS // SECOND_MS, 300) * SECOND_MS
+    ends = starts + rng.integers(0, 4 * HOUR_MS // SECOND_MS, 300) * SECOND_MS
+
+    edge_cases = [
+        # crossing midnight
+        (DAY_START_MS + DAY_MS - 10 * 60 * SECOND_MS, DAY_START_MS + DAY_MS + 20 * 60 * SECOND_MS),
+        # ending exactly on midnight / on the hour
+        (DAY_START_MS + DAY_MS - 30 * SECOND_MS, DAY_START_MS + DAY_MS),
+        (DAY_START_MS + 9 * HOUR_MS, DAY_START_MS + 10 * HOUR_MS),
+        # several whole hours past midnight
+        (DAY_START_MS + DAY_MS - HOUR_MS - 5 * SECOND_MS, DAY_START_MS + DAY_MS + 2 * HOUR_MS + 5 * SECOND_MS),
+        # end <= start: clock values wrapping past midnight, empty events
+        (DAY_START_MS + DAY_MS - 5 * 60 * SECOND_MS, DAY_START_MS + 15 * 60 * SECOND_MS),
+        (DAY_START_MS + 12 * HOUR_MS, DAY_START_MS + 12 * HOUR_MS),
+        (DAY_START_MS + 12 * HOUR_MS + SECOND_MS, DAY_START_MS + 11 * HOUR_MS),
+    ]
+
+    edge_starts, edge_ends = zip(*edge_cases)
+    return (
+        np.concatenate([starts, edge_starts]).astype("int64"),
+        np.concatenate([ends, edge_ends]).astype("int64"),
+    )
+
+
+def _grouped(interval_index, bucket, seconds) -> list:
+    split = {}
+    for i, b, s in zip(interval_index, bucket, seconds):
+        split.setdefault(int(i), {})[int(b)] = float(s)
+    return [split.get(i, {}) for i in range(max(split) + 1)]
+
+
+def test_split_ms_by_hour_matches_per_second_expansion():
+    starts, ends = _intervals()
+
+    split = _grouped(*split_ms_by_hour(starts, ends))
+
+    assert len(split) == len(starts)
+    for start, end, buckets in zip(starts, ends, split):
+        assert buckets == _brute_force(int(start), int(end))
+
+
+def test_split_by_hour_matches_split_ms_by_hour():
+    starts, ends = _intervals()
+
+    interval_index, bucket, seconds = split_by_hour(
+        starts.astype("datetime64[ms]"), ends.astype("datetime64[ms]")
+    )
+    expected = split_ms_by_hour(starts, ends)
+
+    np.testing.assert_array_equal(interval_index, expected[0])
+    np.testing.assert_array_equal(bucket.astype("datetime64[ms]").view("int64"), expected[1])
+    np.testing.assert_allclose(seconds, expected[2])
+
+
+def test_hour_segments_matches_per_second_expansion():
+    starts, ends = _intervals()
+
+    for start, end in zip(starts.tolist(), ends.tolist()):
+        assert dict(hour_segments(start, end)) == _brute_force(start, end)
+
+
+@pytest.mark.parametrize("start, end", [
+    (DAY_START_MS + DAY_MS - 10 * 60 * SECOND_MS, DAY_START_MS + DAY_MS + 20 * 60 * SECOND_MS),
+    (DAY_START_MS + DAY_MS - 5 * 60 * SECOND_MS, DAY_START_MS + 15 * 60 * SECOND_MS),
+])
+def test_seconds_are_conserved(start, end):
+    _, bucket, seconds = split_ms_by_hour([start], [end])
+
+    assert seconds.sum() == pytest.approx((end - start) / 1e3)
+    assert pd.Series(bucket).is_monotonic_increasing
@@ -0,0 +1,108 @@
+import datetime
+
+import pandas as pd
+import pytest
+
+from src.data_processing.data_preparation import prepare_data
+from src.data_processing.numeric import parse_numeric
+from src.pipeline.context import PipelineContext
+
+
+"""
+Ingest of workbooks whose numeric columns hold text cells (decimal
+commas, percent values): prepare_data must parse them, not abort.
+"""
+
+
+DAY = datetime.datetime(2022, 7, 22)
+
+
+def _clock(text: str) -> datetime.time:
+    return datetime.time.fromisoformat(text)
+
+
+def _write_workbook(path):
+    sheets = {
+        "downtime_event_log": pd.DataFrame({
+            "downtime_id": ["downtime_001", "downtime_002"],
+            "date": [DAY, DAY],
+            "downtime_start_time": [_clock("12:10:00"), _clock("13:05:00")],
+            "downtime_end_time": [_clock("12:15:00"), _clock("13:20:30.500")],
+            "downtime_time": [_clock("00:05:00"), _clock("00:15:30.500")],
+        }),
+        "hourly_operation_breakdown": pd.DataFrame({
+            "date": [DAY, DAY, DAY],
+            "hour_start": [12, 13, 14],
+            "hour_end": [13, 14, 15],
+            "monitored_time_h": [1.0, 1.0, "0,5"],
+            "operation_time_h": [0.916667, "0,741528", 0.5],
+            "downtime_h": [0.083333, "0,258472", 0.0],
+            "efficiency": ["91,6667%", 0.741528, "100%"],
+        }),
+        "daily_operation_summary": pd.DataFrame({
+            "date": [DAY],
+            "product_type_l": [3],
+            "production_units": ["1.234"],
+            "liters_produced": [3702],
+            "production_start_time": [_clock("12:00:00")],
+            "production_end_time": [_clock("14:30:00")],
+            "efficiency": ["82,9%"],
+            "gallons_per_hour": ["1.231,5"],
+            "monitored_time_dec": [2.5],
+            "operation_time_dec": ["2,07"],
+            "pause_time_dec": [0.43],
+        }),
+        "processed_hourly": pd.DataFrame({
+            "date": [DAY, DAY, DAY],
+            "hour_start": [12, 13, 14],
+            "hour_end": [13, 14, 15],
+            "production_gallons": [425, "312", 6],
+        }),
+    }
+
+    with pd.ExcelWriter(path) as writer:
+        for sheet, df in sheets.items():
+            df.to_excel(writer, sheet_name=sheet, index=False)
+
+
+@pytest.fixture
+def cleaned(tmp_path):
+    workbook = tmp_path / "dataset.xlsx"
+    _write_workbook(workbook)
+
+    context = PipelineContext(persist=False)
+    cleaned_dir = str(tmp_path / "cleaned")
+    prepare_data(str(workbook), cleaned_dir, context=context)
+
+    return lambda name: context.get(cleaned_dir, name)
+
+
+def test_text_cells_are_parsed(cleaned):
+    hourly = cleaned("hourly_cleaned").sort_values("hour_start")
+
+    assert hourly["efficiency"].tolist() == pytest.approx([0.916667, 0.741528, 1.0])
+    assert hourly["monitored_time_h"].tolist() == pytest.approx([1.0, 1.0, 0.5])
+    assert hourly["downtime_h"].tolist() == pytest.approx([0.083333, 0.258472, 0.0])
+
+    daily = cleaned("daily_cleaned").iloc[0]
+    assert daily["efficiency"] == pytest.approx(0.829)
+    assert daily["gallons_per_hour"] == pytest.approx(1231.5)
+    assert daily["operation_time_dec"] == pytest.approx(2.07)
+
+
+def test_numeric_dtypes_after_parsing(cleaned):
+    hourly = cleaned("hourly_cleaned")
+    assert hourly["efficiency"].dtype == "float64"
+
+    processed = cleaned("processed_hourly_cleaned").sort_values("hour_start")
+    assert pd.api.types.is_integer_dtype(processed["production_gallons"])
+    assert processed["production_gallons"].tolist() == [425, 312, 6]
+
+
+def test_unreadable_values_are_reported():
+    numbers, unparsed = parse_numeric(pd.Series(["1,5", "n/a", "", None, "12%"]))
+
+    assert numbers.tolist()[:1] == [1.5]
+    assert numbers.iloc[4] == pytest.approx(0.12)
+    assert numbers.iloc[1:4].isna().all()
+    assert unparsed.tolist() == [False, True, False, False, False]
@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+from src.analysis.quantile_sketch import DEFAULT_RELATIVE_ACCURACY, QuantileSketch
+
+
+"""
+Quantile sketches against exact quantiles: single sketches and sketches
+merged from chunks must stay within the stated relative error of the
+data value of rank floor(q * (n - 1)).
+"""
+
+
+QUANTILES = [0.0, 0.01, 0.05, 0.25, 0.5, 0.75, 0.9, 0.95, 0.99, 1.0]
+
+
+def _samples() -> dict:
+    rng = np.random.default_rng(16)
+    return {
+        # downtime durations in seconds: heavy right tail
+        "lognormal": rng.lognormal(mean=5, sigma=1.5, size=20_000),
+        # ratios in [0, 1] with exact zeros
+        "ratios": np.where(rng.random(20_000) < 0.1, 0.0, rng.beta(2, 5, 20_000)),
+        # negative and positive values (reconciliation gaps)
+        "signed": rng.normal(0, 300, 20_000),
+    }
+
+
+def _assert_within_accuracy(sketch: QuantileSketch, values: np.ndarray):
+    bound = DEFAULT_RELATIVE_ACCURACY * (1 + 1e-9)
+
+    for q in QUANTILES:
+        # rank floor(q * (n - 1)), the rank the guarantee is stated for
+        exact = np.quantile(values, q, method="lower")
+        assert abs(sketch.quantile(q) - exact) <= bound * abs(exact), f"q={q}"
+
+
+@pytest.mark.parametrize("name", list(_samples()))
+def test_quantiles_within_relative_accuracy(name):
+    values = _samples()[name]
+
+    sketch = QuantileSketch().add(values)
+
+    assert sketch.count == len(values)
+    _assert_within_accuracy(sketch, values)
+
+
+@pytest.mark.parametrize("name", list(_samples()))
+def test_merged_chunks_within_relative_accuracy(name):
+    values = _samples()[name]
+    chunks = np.array_split(values, [1_000, 1_500, 9_000, 15_000])
+
+    merged = QuantileSketch()
+    for chunk in chunks:
+        merged.merge(QuantileSketch().add(chunk))
+
+    whole = QuantileSketch().add(values)
+
+    assert merged.count == whole.count
+    assert merged.sum == pytest.approx(values.sum())
+    for q in QUANTILES:
+        assert merged.quantile(q) == whole.quantile(q)
+    _assert_within_accuracy(merged, values)
+
+
+def test_nan_values_are_ignored():
+    sketch = QuantileSketch().add([1.0, np.nan, None, 3.0])
+
+    assert sketch.count == 2
+    assert np.isnan(QuantileSketch().quantile(0.5))
+
+
+def test_merge_requires_same_accuracy():
+    with pytest.raises(ValueError):
+        QuantileSketch(relative_accuracy=0.01).merge(QuantileSketch(relative_accuracy=0.02))